@@ -0,0 +1,192 @@
+"""Per-customer outstanding AR balance and credit exposure, maintained incrementally.
+
+A customer's outstanding balance is the grand total of their issued and
+partially paid AR invoices, less the payments allocated to those invoices.
+This is what `CustomerViewSet.balance` used to aggregate on every request.
+ARInvoice and ARPaymentAllocation saves and deletes (and ARPayment deletes,
+whose allocations go with them) now push the signed change into
+CustomerExposure through `adjust_outstanding`, so reading balances for many
+customers is a single keyed read. `rebuild_exposure`
+recomputes the rows from the source tables. Use it for recovery after
+queryset-level writes, which bypass the model hooks.
+
+The same rows carry `open_orders`, the total of confirmed sales orders. It is
+kept by sales.credit under the row locks taken by `lock_exposure`.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from sales.models import SalesOrder
+
+from .models import ARInvoice, ARPaymentAllocation, CustomerExposure
+
+MONEY_PLACES = Decimal('0.01')
+OPEN_STATUSES = frozenset({ARInvoice.Status.ISSUED, ARInvoice.Status.PARTIAL})
+
+# (customer_id, counts towards the balance, grand_total) of an invoice
+InvoiceState = tuple[int, bool, Decimal]
+
+
+def invoice_state(invoice: ARInvoice) -> InvoiceState | None:
+    """The exposure-relevant fields of `invoice`, or None when some were deferred."""
+    values = invoice.__dict__
+    if not {'customer_id', 'status', 'grand_total'} <= values.keys():
+        return None
+    return values['customer_id'], values['status'] in OPEN_STATUSES, Decimal(str(values['grand_total'] or 0))
+
+
+def stored_invoice_state(invoice_id) -> InvoiceState | None:
+    """The exposure-relevant fields of invoice `invoice_id` as currently stored."""
+    row = ARInvoice.objects.filter(pk=invoice_id).values_list('customer_id', 'status', 'grand_total').first()
+    if row is None:
+        return None
+    return row[0], row[1] in OPEN_STATUSES, row[2]
+
+
+def lock_exposure(customer_ids: Iterable[int]) -> dict[int, CustomerExposure]:
+    """Lock the exposure rows of `customer_ids`, creating missing ones, in customer id order.
+
+    Each row is annotated with its customer's `credit_limit`.
+    """
+    customer_ids = sorted(set(customer_ids))
+    if not customer_ids:
+        return {}
+    CustomerExposure.objects.bulk_create(
+        [CustomerExposure(customer_id=cid) for cid in customer_ids], ignore_conflicts=True, batch_size=1000,
+    )
+    rows = (
+        CustomerExposure.objects.select_for_update(of=('self',)).filter(pk__in=customer_ids)
+        .annotate(credit_limit=F('customer__credit_limit')).order_by('pk')
+    )
+    return {row.pk: row for row in rows}
+
+
+def adjust_outstanding(changes: dict[int, Decimal]) -> None:
+    """Add `changes` (customer id -> signed amount) to the customers' outstanding balance.
+
+    Missing exposure rows are created first; each balance is then moved with
+    an `outstanding = outstanding + delta` UPDATE so concurrent writers do not
+    overwrite each other.
+    """
+    changes = {cid: amount for cid, amount in changes.items() if amount}
+    if not changes:
+        return
+    now = timezone.now()
+    with transaction.atomic():
+        CustomerExposure.objects.bulk_create(
+            [CustomerExposure(customer_id=cid) for cid in sorted(changes)], ignore_conflicts=True,
+        )
+        for cid in sorted(changes):
+            CustomerExposure.objects.filter(pk=cid).update(outstanding=F('outstanding') + changes[cid], updated_at=now)
+
+
+def record_invoice_change(invoice_id, before: InvoiceState | None, after: InvoiceState | None) -> None:
+    """Apply the balance change of an invoice going from `before` to `after` (None: absent/new)."""
+    changes: dict[int, Decimal] = defaultdict(Decimal)
+    if before and after and before[1] and after[1] and before[0] == after[0]:
+        # Still open for the same customer: allocations are unchanged, only the total moves
+        changes[after[0]] += after[2] - before[2]
+    else:
+        allocated = Decimal('0')
+        if before is not None and (before[1] or (after and after[1])):
+            allocated = ARPaymentAllocation.objects.filter(invoice_id=invoice_id).aggregate(
+                total=Sum('amount_applied'))['total'] or Decimal('0')
+        if before and before[1]:
+            changes[before[0]] -= before[2] - allocated
+        if after and after[1]:
+            changes[after[0]] += after[2] - allocated
+    adjust_outstanding(changes)
+
+
+def record_allocation_change(before, after) -> None:
+    """Apply the balance change of an allocation going from `before` to `after`.
+
+    Both are (invoice_id, amount_applied) or None; only allocations against
+    open invoices count towards the balance.
+    """
+    states = [state for state in (before, after) if state and None not in state]
+    if not states:
+        return
+    open_invoices = dict(
+        ARInvoice.objects.filter(pk__in={invoice_id for invoice_id, _ in states}, status__in=OPEN_STATUSES)
+        .values_list('pk', 'customer_id')
+    )
+    changes: dict[int, Decimal] = defaultdict(Decimal)
+    for state, sign in ((before, 1), (after, -1)):
+        if state in states and state[0] in open_invoices:
+            changes[open_invoices[state[0]]] += sign * Decimal(str(state[1]))
+    adjust_outstanding(changes)
+
+
+def record_payment_deletion(payment_id) -> None:
+    """Give back the allocations of payment `payment_id`, which its delete cascades away without their delete()."""
+    allocations = (
+        ARPaymentAllocation.objects.filter(payment_id=payment_id, invoice__status__in=OPEN_STATUSES).order_by()
+        .values('invoice__customer').annotate(total=Sum('amount_applied')).values_list('invoice__customer', 'total')
+    )
+    adjust_outstanding(dict(allocations))
+
+
+def outstanding_by_customer(customer_ids: Iterable[int] | None = None) -> dict[int, Decimal]:
+    """Outstanding balance per customer aggregated from invoices and allocations (customers with open invoices)."""
+    invoices = ARInvoice.objects.filter(status__in=OPEN_STATUSES)
+    if customer_ids is not None:
+        invoices = invoices.filter(customer_id__in=list(customer_ids))
+    totals: dict[int, Decimal] = defaultdict(Decimal)
+    for cid, total in invoices.order_by().values('customer').annotate(total=Sum('grand_total')).values_list(
+            'customer', 'total'):
+        totals[cid] += total
+    allocations = (
+        ARPaymentAllocation.objects.filter(invoice__in=invoices).order_by()
+        .values('invoice__customer').annotate(total=Sum('amount_applied'))
+        .values_list('invoice__customer', 'total')
+    )
+    for cid, total in allocations:
+        totals[cid] -= total
+    return {cid: total.quantize(MONEY_PLACES) for cid, total in totals.items()}
+
+
+def open_orders_by_customer(customer_ids: Iterable[int] | None = None) -> dict[int, Decimal]:
+    """Total of confirmed sales orders per customer (customers with any)."""
+    orders = SalesOrder.objects.filter(status=SalesOrder.Status.CONFIRMED)
+    if customer_ids is not None:
+        orders = orders.filter(customer_id__in=list(customer_ids))
+    return dict(
+        orders.order_by().values('customer').annotate(total=Sum('total_amount')).values_list('customer', 'total')
+    )
+
+
+@transaction.atomic
+def rebuild_exposure(customer_ids: Iterable[int] | None = None) -> int:
+    """Recompute CustomerExposure from the source tables; returns the number of rows written."""
+    if customer_ids is not None:
+        customer_ids = list(customer_ids)
+    stored = CustomerExposure.objects.select_for_update()
+    if customer_ids is not None:
+        stored = stored.filter(pk__in=customer_ids)
+    stored = set(stored.values_list('pk', flat=True))
+    totals = outstanding_by_customer(customer_ids)
+    open_orders = open_orders_by_customer(customer_ids)
+    targets = stored | totals.keys() | open_orders.keys()
+    now = timezone.now()
+    CustomerExposure.objects.bulk_create(
+        [
+            CustomerExposure(
+                customer_id=cid, outstanding=totals.get(cid, Decimal('0')),
+                open_orders=open_orders.get(cid, Decimal('0')), updated_at=now,
+            )
+            for cid in sorted(targets)
+        ],
+        update_conflicts=True,
+        unique_fields=['customer'],
+        update_fields=['outstanding', 'open_orders', 'updated_at'],
+        batch_size=1000,
+    )
+    return len(targets)
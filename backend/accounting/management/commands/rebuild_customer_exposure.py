@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from accounting.exposure import rebuild_exposure
+
+
+class Command(BaseCommand):
+    help = "Recompute the maintained per-customer AR balance and open order total from the source tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--customer', type=int, action='append', dest='customers',
+                            help='Only rebuild this customer id (repeatable; default: all customers).')
+
+    def handle(self, *args, **options):
+        written = rebuild_exposure(options['customers'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt exposure for {written} customers.'))
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:29
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+
+OPEN_STATUSES = ('ISSUED', 'PARTIAL')
+
+
+def seed_customer_exposure(apps, schema_editor):
+    """Aggregate the outstanding balance of every customer with open AR invoices."""
+    ARInvoice = apps.get_model('accounting', 'ARInvoice')
+    ARPaymentAllocation = apps.get_model('accounting', 'ARPaymentAllocation')
+    CustomerExposure = apps.get_model('accounting', 'CustomerExposure')
+    invoices = ARInvoice.objects.filter(status__in=OPEN_STATUSES)
+    totals = dict(invoices.order_by().values('customer').annotate(total=Sum('grand_total')).values_list('customer', 'total'))
+    allocated = (
+        ARPaymentAllocation.objects.filter(invoice__in=invoices).order_by()
+        .values('invoice__customer').annotate(total=Sum('amount_applied')).values_list('invoice__customer', 'total')
+    )
+    for customer_id, total in allocated:
+        totals[customer_id] -= total
+    CustomerExposure.objects.bulk_create(
+        [CustomerExposure(customer_id=cid, outstanding=total.quantize(Decimal('0.01'))) for cid, total in totals.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0005_invoice_balance_amount_invoice_paid_amount_and_more'),
+        ('sales', '0004_salesordertransition'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerExposure',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='exposure', serialize=False, to='sales.customer')),
+                ('outstanding', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(seed_customer_exposure, migrations.RunPython.noop),
+    ]
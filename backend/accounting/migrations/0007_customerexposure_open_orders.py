@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:32
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def seed_open_orders(apps, schema_editor):
+    """Total the confirmed sales orders of every customer into its exposure row."""
+    CustomerExposure = apps.get_model('accounting', 'CustomerExposure')
+    SalesOrder = apps.get_model('sales', 'SalesOrder')
+    totals = (
+        SalesOrder.objects.filter(status='confirmed').order_by()
+        .values('customer').annotate(total=Sum('total_amount')).values_list('customer', 'total')
+    )
+    CustomerExposure.objects.bulk_create(
+        [CustomerExposure(customer_id=cid, open_orders=total) for cid, total in totals],
+        update_conflicts=True,
+        unique_fields=['customer'],
+        update_fields=['open_orders'],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0006_customerexposure'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customerexposure',
+            name='open_orders',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=16),
+        ),
+        migrations.RunPython(seed_open_orders, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,6 @@
 from decimal import Decimal
 
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 from core.models import BaseModel
@@ -36,6 +36,36 @@ class ARInvoice(BaseModel):
     def __str__(self):
         return f"ARInvoice {self.id} - {self.customer} ({self.grand_total} {self.currency_code})"
 
+    # Every save and delete keeps CustomerExposure.outstanding in step (see
+    # accounting.exposure); queryset update()/bulk writes bypass it and need
+    # `rebuild_customer_exposure` afterwards.
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        from .exposure import invoice_state
+
+        instance = super().from_db(db, field_names, values)
+        instance._exposure_state = invoice_state(instance)
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .exposure import invoice_state, record_invoice_change, stored_invoice_state
+
+        before = None
+        if not self._state.adding:
+            before = getattr(self, '_exposure_state', None) or stored_invoice_state(self.pk)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            after = invoice_state(self)
+            record_invoice_change(self.pk, before, after)
+        self._exposure_state = after
+
+    def delete(self, *args, **kwargs):
+        from .exposure import record_invoice_change, stored_invoice_state
+
+        with transaction.atomic():
+            record_invoice_change(self.pk, stored_invoice_state(self.pk), None)
+            return super().delete(*args, **kwargs)
+
 
 class ARPayment(BaseModel):
     customer = models.ForeignKey(Customer, on_delete=models.RESTRICT, related_name="payments")
@@ -54,6 +84,14 @@ class ARPayment(BaseModel):
     def __str__(self):
         return f"ARPayment {self.id} - {self.customer} ({self.amount} {self.currency_code})"
 
+    def delete(self, *args, **kwargs):
+        from .exposure import record_payment_deletion
+
+        # The allocations are removed by the cascade, which does not call their delete()
+        with transaction.atomic():
+            record_payment_deletion(self.pk)
+            return super().delete(*args, **kwargs)
+
 
 class ARPaymentAllocation(models.Model):
     payment = models.ForeignKey(ARPayment, on_delete=models.CASCADE, related_name="allocations")
@@ -71,6 +109,56 @@ class ARPaymentAllocation(models.Model):
     def __str__(self):
         return f"Allocation {self.id}: {self.amount_applied} to invoice {self.invoice_id}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._exposure_state = (instance.__dict__.get('invoice_id'), instance.__dict__.get('amount_applied'))
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .exposure import record_allocation_change
+
+        before = None if self._state.adding else getattr(self, '_exposure_state', None)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            after = (self.invoice_id, self.amount_applied)
+            record_allocation_change(before, after)
+        self._exposure_state = after
+
+    def delete(self, *args, **kwargs):
+        from .exposure import record_allocation_change
+
+        with transaction.atomic():
+            record_allocation_change((self.invoice_id, self.amount_applied), None)
+            return super().delete(*args, **kwargs)
+
+
+class CustomerExposure(models.Model):
+    """
+    Credit exposure per customer, maintained incrementally.
+
+    `outstanding` is the sum over the customer's issued and partially paid
+    AR invoices of grand_total less the payments allocated to them: the
+    figure the balance endpoint used to aggregate on every request.
+    Invoice and allocation saves/deletes adjust it (accounting.exposure).
+    `open_orders` is the total of the customer's confirmed sales orders,
+    adjusted by the order transitions (sales.credit). Their sum is checked
+    against Customer.credit_limit when orders are confirmed;
+    `rebuild_customer_exposure` recomputes both from the source tables.
+    """
+
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name="exposure")
+    outstanding = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    open_orders = models.DecimalField(max_digits=16, decimal_places=2, default=Decimal("0.00"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"Exposure {self.customer_id}: {self.outstanding} + {self.open_orders}"
+
+    @property
+    def total(self) -> Decimal:
+        return self.outstanding + self.open_orders
+
 
 class Invoice(BaseModel):
     """
@@ -0,0 +1,97 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounting.exposure import outstanding_by_customer
+from accounting.models import ARInvoice, ARPayment, ARPaymentAllocation, CustomerExposure
+from sales.models import Customer
+
+
+@pytest.fixture
+def client(db):
+    User = get_user_model()
+    api = APIClient()
+    api.force_authenticate(User.objects.create_user(username='collector', password='x', role=User.Roles.ADMIN))
+    return api
+
+
+def _outstanding(customer):
+    return CustomerExposure.objects.get(customer=customer).outstanding
+
+
+@pytest.mark.django_db
+def test_exposure_follows_invoices_and_allocations(client):
+    acme = Customer.objects.create(customer_code='EX-1', name='Acme')
+    invoice = ARInvoice.objects.create(customer=acme, grand_total=Decimal('100.00'))
+    assert not CustomerExposure.objects.filter(customer=acme).exists()  # drafts do not count
+
+    invoice.status = ARInvoice.Status.ISSUED
+    invoice.save()
+    second = ARInvoice.objects.create(customer=acme, grand_total=Decimal('50.00'), status=ARInvoice.Status.ISSUED)
+    assert _outstanding(acme) == Decimal('150.00')
+
+    payment = ARPayment.objects.create(customer=acme, amount=Decimal('70.00'))
+    allocation = ARPaymentAllocation.objects.create(payment=payment, invoice=invoice, amount_applied=Decimal('60.00'))
+    ARPaymentAllocation.objects.create(payment=payment, invoice=second, amount_applied=Decimal('10.00'))
+    assert _outstanding(acme) == Decimal('80.00')
+
+    allocation.amount_applied = Decimal('40.00')
+    allocation.save()
+    assert _outstanding(acme) == Decimal('100.00')
+
+    # Cancelling drops the invoice with its allocations; a reloaded invoice keeps tracking
+    second = ARInvoice.objects.get(pk=second.pk)
+    second.status = ARInvoice.Status.CANCELLED
+    second.save()
+    assert _outstanding(acme) == Decimal('60.00')
+    invoice = ARInvoice.objects.get(pk=invoice.pk)
+    invoice.status = ARInvoice.Status.PARTIAL
+    invoice.grand_total = Decimal('120.00')
+    invoice.save()
+    assert _outstanding(acme) == Decimal('80.00')
+    assert outstanding_by_customer([acme.id]) == {acme.id: Decimal('80.00')}
+
+    data = client.get(reverse('customer-balance', args=[acme.id])).data
+    assert (data['customer_code'], data['balance']) == ('EX-1', Decimal('80.00'))
+
+
+@pytest.mark.django_db
+def test_deleting_a_payment_gives_back_its_allocations():
+    acme = Customer.objects.create(customer_code='EX-3', name='Acme')
+    invoice = ARInvoice.objects.create(customer=acme, grand_total=Decimal('100.00'), status=ARInvoice.Status.ISSUED)
+    payment = ARPayment.objects.create(customer=acme, amount=Decimal('60.00'))
+    ARPaymentAllocation.objects.create(payment=payment, invoice=invoice, amount_applied=Decimal('60.00'))
+    assert _outstanding(acme) == Decimal('40.00')
+
+    payment.delete()
+    assert not ARPaymentAllocation.objects.filter(invoice=invoice).exists()
+    assert _outstanding(acme) == Decimal('100.00') == outstanding_by_customer([acme.id])[acme.id]
+
+
+@pytest.mark.django_db
+def test_batch_balances_are_one_read_and_rebuild_repairs_drift(client):
+    customers = Customer.objects.bulk_create([Customer(customer_code=f'EB-{i}', name=f'Buyer {i}') for i in range(40)])
+    for i, customer in enumerate(customers[:30]):
+        ARInvoice.objects.create(customer=customer, grand_total=Decimal(i + 1), status=ARInvoice.Status.ISSUED)
+    ids = ','.join(str(c.id) for c in customers)
+
+    with CaptureQueriesContext(connection) as ctx:
+        rows = client.get(reverse('customer-balances'), {'ids': ids}).data
+    assert len(rows) == 40
+    assert [row['balance'] for row in rows[:3]] == [Decimal('1.00'), Decimal('2.00'), Decimal('3.00')]
+    assert rows[-1]['balance'] == Decimal('0.00')
+    assert sum('sales_customer' in q['sql'] for q in ctx.captured_queries) == 2  # scope count + the read
+    assert client.get(reverse('customer-balances'), {'ids': '1,x'}).status_code == 400
+
+    # Queryset writes bypass the hooks; the rebuild command recomputes the rows
+    ARInvoice.objects.filter(customer=customers[0]).update(grand_total=Decimal('9.00'))
+    CustomerExposure.objects.filter(customer=customers[1]).update(outstanding=Decimal('999.00'))
+    call_command('rebuild_customer_exposure')
+    assert _outstanding(customers[0]) == Decimal('9.00')
+    assert _outstanding(customers[1]) == Decimal('2.00')
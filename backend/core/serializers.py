@@ -0,0 +1,37 @@
+"""Serializer helpers shared by the document (header + lines) APIs."""
+from rest_framework import serializers
+
+
+class PrefetchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField that reads from objects the parent serializer fetched in bulk.
+
+    Nested line serializers would otherwise look up every line's related rows
+    one query at a time. See `prefetch_line_relations`.
+    """
+
+    def to_internal_value(self, data):
+        prefetched = self.context.get('prefetched', {}).get(self.get_queryset().model, {})
+        try:
+            return prefetched[int(data)]
+        except (KeyError, TypeError, ValueError):
+            return super().to_internal_value(data)
+
+
+def prefetch_line_relations(context: dict, lines, fields: dict) -> None:
+    """Fetch the rows referenced by raw `lines` data with one query per model.
+
+    `fields` maps a line field name to its model; the objects are stored in
+    `context` for PrefetchedPrimaryKeyRelatedField. Malformed input is left
+    for normal validation to report.
+    """
+    if not isinstance(lines, list):
+        return
+    ids = {model: set() for model in fields.values()}
+    for line in lines:
+        if not isinstance(line, dict):
+            continue
+        for field, model in fields.items():
+            value = line.get(field)
+            if isinstance(value, int) or (isinstance(value, str) and value.isdigit()):
+                ids[model].add(int(value))
+    context['prefetched'] = {model: model.objects.in_bulk(pks) for model, pks in ids.items() if pks}
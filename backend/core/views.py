@@ -9,7 +9,7 @@ import logging
 
 from sales.models import SalesOrder, Customer
 from accounting.models import Invoice
-from inventory.models import Product, Inventory
+from inventory.models import Product, Inventory, LowStockAlert
 
 from authentication.mixins import scope_queryset_for_user
 
@@ -50,7 +50,7 @@ def dashboard_metrics(request):
     products_qs = scope_queryset_for_user(user, Product.objects.all())
     total_products = products_qs.count()
     inventory_qs = scope_queryset_for_user(user, Inventory.objects.select_related('product').all())
-    low_stock = inventory_qs.filter(on_hand__lte=F('reorder_level')).count()
+    low_stock = scope_queryset_for_user(user, LowStockAlert.objects.all(), owner_field='inventory__created_by').count()
     inv_value = inventory_qs.aggregate(val=Sum(F('on_hand') * F('product__cost_price')))['val'] or Decimal('0')
 
     # Customer metrics
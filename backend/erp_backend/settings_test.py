@@ -6,6 +6,12 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "test_db.sqlite3",
+        # File-backed test database so multi-threaded tests share real SQLite locking
+        # (the default in-memory test DB uses shared-cache table locks instead).
+        "TEST": {"NAME": BASE_DIR / "test_db_pytest.sqlite3"},
+        # SQLite ignores SELECT ... FOR UPDATE; taking the write lock at BEGIN makes
+        # read-check-write transactions (credit checks) queue instead of failing.
+        "OPTIONS": {"transaction_mode": "IMMEDIATE", "timeout": 20},
     }
 }
 
@@ -0,0 +1,139 @@
+"""Bulk stock adjustments (cycle counts) posted as one multi-line ADJUST entry.
+
+Rows arrive as dicts, from a JSON body or streamed from an uploaded CSV with
+columns `product` (id) or `sku`, `quantity` (signed) and optional `rate`.
+They are validated and written in chunks: one product lookup and one
+`bulk_create` per chunk, then a single set-based posting for the whole entry.
+"""
+from __future__ import annotations
+
+import csv
+import io
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Iterable, Iterator
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Product, StockEntry, StockEntryLine
+from .pricing import PRICE_MAX, clean_price
+
+CHUNK_SIZE = 1000
+QTY_PLACES = Decimal('0.001')
+QTY_MAX = Decimal('9999999999999.999')  # max_digits=16, decimal_places=3
+
+
+def csv_rows(upload) -> Iterator[dict]:
+    """Stream rows from an uploaded CSV file without reading it into memory."""
+    return csv.DictReader(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''))
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[list[tuple[int, dict]]]:
+    numbered = enumerate(rows, start=1)
+    while chunk := list(islice(numbered, size)):
+        yield chunk
+
+
+def _decimal(value, default=None):
+    if value in (None, ''):
+        return default
+    try:
+        parsed = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        return None
+    return parsed if parsed.is_finite() else None
+
+
+def _validate_chunk(chunk: list[tuple[int, dict]], errors: list[dict]) -> list[tuple[int, Decimal, Decimal]]:
+    """Resolve products for a chunk in one query; return (product_id, quantity, rate) tuples."""
+    for number, row in chunk:
+        if not isinstance(row, dict):
+            errors.append({'row': number, 'error': 'Row must be an object'})
+    chunk = [(number, row) for number, row in chunk if isinstance(row, dict)]
+    ids = {str(row.get('product')).strip() for _, row in chunk if row.get('product') not in (None, '')}
+    skus = {str(row.get('sku')).strip() for _, row in chunk if row.get('sku')}
+    numeric_ids = {int(pid) for pid in ids if pid.isdigit()}
+    found_ids, by_sku = set(), {}
+    if numeric_ids or skus:
+        matches = Product.objects.filter(Q(id__in=numeric_ids) | Q(sku__in=skus)).order_by()
+        for pid, sku in matches.values_list('id', 'sku'):
+            found_ids.add(pid)
+            by_sku[sku] = pid
+
+    valid = []
+    for number, row in chunk:
+        product_ref = row.get('product')
+        if product_ref not in (None, ''):
+            ref = str(product_ref).strip()
+            product_id = int(ref) if ref.isdigit() and int(ref) in found_ids else None
+        else:
+            product_id = by_sku.get(str(row.get('sku') or '').strip())
+        if product_id is None:
+            errors.append({'row': number, 'error': 'Unknown product'})
+            continue
+        quantity = _decimal(row.get('quantity'))
+        rate = _decimal(row.get('rate'), default=Decimal('0.00'))
+        if quantity is None:
+            errors.append({'row': number, 'error': 'Quantity must be a number'})
+            continue
+        if abs(quantity) > QTY_MAX:
+            errors.append({'row': number, 'error': 'Quantity is out of range'})
+            continue
+        if quantity != quantity.quantize(QTY_PLACES):
+            errors.append({'row': number, 'error': 'Quantity allows at most 3 decimal places'})
+            continue
+        if rate is None or rate < 0:
+            errors.append({'row': number, 'error': 'Rate must be a non-negative number'})
+            continue
+        rate = clean_price(rate)
+        if rate is None or abs(quantity * rate) > PRICE_MAX:
+            errors.append({'row': number, 'error': 'Rate or amount is out of range'})
+            continue
+        if quantity == 0:
+            continue
+        valid.append((product_id, quantity, rate))
+    return valid
+
+
+@transaction.atomic
+def post_adjustments(rows: Iterable[dict], *, user, remarks: str = 'Bulk adjustment',
+                     warehouse_id: int | None = None) -> tuple[StockEntry | None, int, list[dict]]:
+    """Validate `rows` and post the valid ones as a single ADJUST entry.
+
+    All lines are counted at `warehouse_id` (None = the unassigned location).
+
+    Returns (entry, line_count, errors); entry is None when no row was valid.
+    Errors carry the 1-based row number so a count sheet can be corrected.
+    """
+    errors: list[dict] = []
+    entry = None
+    line_count = 0
+    for chunk in _chunks(rows, CHUNK_SIZE):
+        valid = _validate_chunk(chunk, errors)
+        if not valid:
+            continue
+        if entry is None:
+            entry = StockEntry.objects.create(
+                entry_type=StockEntry.EntryType.ADJUST,
+                remarks=remarks,
+                created_by=user,
+                updated_by=user,
+            )
+        StockEntryLine.objects.bulk_create([
+            StockEntryLine(
+                stock_entry=entry,
+                product_id=product_id,
+                warehouse_id=warehouse_id,
+                quantity=quantity,
+                rate=rate,
+                amount=quantity * rate,
+                created_by=user,
+                updated_by=user,
+            )
+            for product_id, quantity, rate in valid
+        ])
+        line_count += len(valid)
+    if entry is not None:
+        entry.apply_to_inventory()
+    return entry, line_count, errors
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Product, Inventory
+from .models import (
+    Product, Inventory, PriceList, PriceListItem, ProductCost, ReplenishmentSuggestion, StockLot, Warehouse,
+)
 
 
 @admin.register(Product)
@@ -10,8 +12,53 @@ class ProductAdmin(admin.ModelAdmin):
     readonly_fields = ('created_at', 'updated_at', 'created_by', 'updated_by')
 
 
+@admin.register(Warehouse)
+class WarehouseAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'city', 'state', 'is_active')
+    search_fields = ('code', 'name', 'city')
+    list_filter = ('is_active',)
+    readonly_fields = ('created_at', 'updated_at', 'created_by', 'updated_by')
+
+
 @admin.register(Inventory)
 class InventoryAdmin(admin.ModelAdmin):
-    list_display = ('product', 'on_hand', 'reorder_level', 'created_at')
+    list_display = ('product', 'warehouse', 'on_hand', 'reorder_level', 'created_at')
     search_fields = ('product__sku', 'product__name')
+    list_filter = ('warehouse',)
     readonly_fields = ('created_at', 'updated_at', 'created_by', 'updated_by')
+
+
+class PriceListItemInline(admin.TabularInline):
+    model = PriceListItem
+    extra = 0
+    raw_id_fields = ('product',)
+
+
+@admin.register(PriceList)
+class PriceListAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'effective_from', 'status', 'activated_at', 'created_at')
+    list_filter = ('status',)
+    inlines = [PriceListItemInline]
+    readonly_fields = ('activated_at', 'created_at', 'updated_at', 'created_by', 'updated_by')
+
+
+@admin.register(ReplenishmentSuggestion)
+class ReplenishmentSuggestionAdmin(admin.ModelAdmin):
+    list_display = ('product', 'velocity', 'forecast', 'reorder_point', 'reorder_qty', 'computed_at')
+    search_fields = ('product__sku', 'product__name')
+    readonly_fields = ('computed_at',)
+
+
+@admin.register(StockLot)
+class StockLotAdmin(admin.ModelAdmin):
+    list_display = ('product', 'warehouse', 'lot_number', 'expiry_date', 'qty', 'updated_at')
+    search_fields = ('lot_number', 'product__sku', 'product__name')
+    list_filter = ('warehouse',)
+    readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(ProductCost)
+class ProductCostAdmin(admin.ModelAdmin):
+    list_display = ('product', 'avg_cost', 'updated_at')
+    search_fields = ('product__sku', 'product__name')
+    readonly_fields = ('avg_cost', 'updated_at')
@@ -0,0 +1,69 @@
+"""Incrementally maintained low-stock alerts.
+
+An Inventory row is low when it has a positive reorder level and on_hand is
+at or below it. LowStockAlert holds exactly the low rows, and is written only
+when a row crosses its reorder level, so most postings cost no extra query
+and low-stock lists and counts never scan Inventory.
+
+Receivers of `low_stock_changed` are notified after the transaction commits
+with the product ids that went low and those that recovered.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import transaction
+from django.dispatch import Signal
+
+from .models import Inventory, LowStockAlert
+
+# Sent with sender=Inventory and kwargs `went_low` and `recovered` (product id lists).
+low_stock_changed = Signal()
+
+
+def is_low(on_hand, reorder_level) -> bool:
+    return bool(reorder_level) and reorder_level > 0 and (on_hand or Decimal('0')) <= reorder_level
+
+
+def sync_low_stock_alerts(inventories: Iterable[Inventory], previous_on_hand: dict[int, Decimal] | None = None) -> None:
+    """Create or drop alerts for `inventories` whose low state changed.
+
+    With `previous_on_hand` (inventory pk -> on_hand before the change) the
+    crossing is detected in memory; otherwise the current alert rows are read
+    in one query.
+    """
+    inventories = list(inventories)
+    if not inventories:
+        return
+    if previous_on_hand is None:
+        alerted = set(
+            LowStockAlert.objects.filter(inventory__in=[inv.pk for inv in inventories]).values_list('inventory_id', flat=True)
+        )
+    went_low, recovered = [], []
+    for inv in inventories:
+        if previous_on_hand is None:
+            was_low = inv.pk in alerted
+        else:
+            was_low = is_low(previous_on_hand.get(inv.pk), inv.reorder_level)
+        now_low = is_low(inv.on_hand, inv.reorder_level)
+        if now_low and not was_low:
+            went_low.append(inv)
+        elif was_low and not now_low:
+            recovered.append(inv)
+    if not (went_low or recovered):
+        return
+
+    if went_low:
+        LowStockAlert.objects.bulk_create(
+            [LowStockAlert(inventory=inv, product_id=inv.product_id) for inv in went_low],
+            ignore_conflicts=True,
+        )
+    if recovered:
+        LowStockAlert.objects.filter(inventory__in=[inv.pk for inv in recovered]).delete()
+
+    low_ids = [inv.product_id for inv in went_low]
+    recovered_ids = [inv.product_id for inv in recovered]
+    transaction.on_commit(
+        lambda: low_stock_changed.send(sender=Inventory, went_low=low_ids, recovered=recovered_ids)
+    )
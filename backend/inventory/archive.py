@@ -0,0 +1,109 @@
+"""Move closed StockLedger periods out of the hot table.
+
+The hot StockLedger table only needs the open period: balances come from
+the latest checkpoint plus the rows after it, and list views show recent
+movements. `archive_closed_periods` first checkpoints every month up to the
+cutoff, then moves rows older than the cutoff into StockLedgerArchive in
+short id-range batches, so no long transaction or table lock is held.
+
+On PostgreSQL the archive is range-partitioned by month and the partitions a
+batch needs are created first (rows that landed in the DEFAULT partition for
+that month move into the new one); readers that filter on movement_date
+(as_of balances, planning windows) only touch the partitions in range.
+Invariant relied on by readers: the archive only ever holds checkpointed
+months.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, time
+
+from django.db import connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .balances import build_checkpoints, last_closed_period, month_start, next_month, period_end
+from .models import StockLedger, StockLedgerArchive
+
+BATCH_SIZE = 5000
+ARCHIVE_FIELDS = [
+    'id', 'product_id', 'warehouse_id', 'stock_entry_id', 'lot_id', 'movement_date', 'qty_change', 'balance_qty', 'rate',
+    'created_at', 'created_by_id',
+]
+
+
+def ensure_partitions(first: date, through: date) -> None:
+    """Create the monthly archive partitions from `first` to `through` (PostgreSQL only)."""
+    if connection.vendor != 'postgresql':
+        return
+    table = StockLedgerArchive._meta.db_table
+    period = month_start(first)
+    with connection.cursor() as cursor:
+        while period <= through:
+            name = f'{table}_p{period:%Y%m}'
+            cursor.execute('SELECT to_regclass(%s)', [name])
+            if cursor.fetchone()[0] is None:
+                _create_partition(cursor, table, name, period)
+            period = next_month(period)
+
+
+def _create_partition(cursor, table: str, name: str, period: date) -> None:
+    """Create partition `name` for month `period`, taking over the DEFAULT partition's rows in range.
+
+    PostgreSQL refuses a new partition while the DEFAULT partition holds rows
+    for its range, so the partition is built as a plain table, those rows are
+    moved into it and it is then attached, all in one transaction. The DEFAULT
+    partition is locked first so concurrent archivers create it only once.
+    """
+    quote = connection.ops.quote_name
+    default = f'{table}_default'
+    start = timezone.make_aware(datetime.combine(period, time.min))
+    end = period_end(period)
+    with transaction.atomic():
+        cursor.execute(f'LOCK TABLE {quote(default)} IN SHARE ROW EXCLUSIVE MODE')
+        cursor.execute('SELECT to_regclass(%s)', [name])
+        if cursor.fetchone()[0] is not None:
+            return
+        cursor.execute(f'CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS)')
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {quote(default)} WHERE movement_date >= %s AND movement_date < %s RETURNING *) '
+            f'INSERT INTO {quote(name)} SELECT * FROM moved',
+            [start, end],
+        )
+        # Partition bounds are DDL and cannot be bound parameters; both are generated datetimes
+        cursor.execute(
+            f'ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} '
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+
+
+def archive_closed_periods(through: date | None = None, batch_size: int = BATCH_SIZE) -> int:
+    """Checkpoint and archive every ledger row before the end of month `through`.
+
+    `through` defaults to the last fully ended month. Returns the number of
+    rows moved.
+    """
+    through = month_start(through or last_closed_period())
+    if through > last_closed_period():
+        raise ValueError('Only fully ended months can be archived.')
+    build_checkpoints(through)
+    cutoff = period_end(through)
+    first = StockLedger.objects.aggregate(first=Min('movement_date'))['first']
+    if first is None or first >= cutoff:
+        return 0
+    ensure_partitions(timezone.localtime(first).date(), through)
+
+    closed = StockLedger.objects.filter(movement_date__lt=cutoff)
+    moved = 0
+    while True:
+        with transaction.atomic():
+            ids = list(closed.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            batch = closed.filter(id__gte=ids[0], id__lte=ids[-1])
+            StockLedgerArchive.objects.bulk_create(
+                [StockLedgerArchive(**row) for row in batch.values(*ARCHIVE_FIELDS)],
+                batch_size=1000,
+            )
+            batch.delete()
+        moved += len(ids)
+    return moved
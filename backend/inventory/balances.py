@@ -0,0 +1,139 @@
+"""Stock balances read from monthly checkpoints plus the ledger tail.
+
+`SUM(qty_change)` over the whole StockLedger grows with history. Instead,
+`build_checkpoints` closes each month into one StockCheckpoint row per
+(product, warehouse), and balance reads combine the latest checkpoint with the ledger
+rows after it, so their cost depends on the size of the open period only.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Max, Min, Q, Sum
+from django.utils import timezone
+
+from .models import StockCheckpoint, StockLedger, StockLedgerArchive
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def period_end(period: date) -> datetime:
+    """Exclusive upper bound of `period` (midnight starting the next month)."""
+    return timezone.make_aware(datetime.combine(next_month(period), time.min))
+
+
+def last_closed_period(today: date | None = None) -> date:
+    """The most recent month that has fully ended."""
+    today = today or timezone.localdate()
+    first = month_start(today)
+    return month_start(date.fromordinal(first.toordinal() - 1))
+
+
+def _product_sums(qs, product_ids=None, field: str = 'qty_change') -> dict[int, Decimal]:
+    if product_ids is not None:
+        qs = qs.filter(product_id__in=product_ids)
+    rows = qs.order_by().values('product').annotate(total=Sum(field)).values_list('product', 'total')
+    return {pid: total for pid, total in rows}
+
+
+def _pair_sums(qs) -> dict[tuple[int, int | None], Decimal]:
+    rows = qs.order_by().values('product', 'warehouse').annotate(total=Sum('qty_change'))
+    return {(row['product'], row['warehouse']): row['total'] for row in rows}
+
+
+@transaction.atomic
+def build_checkpoints(through: date | None = None) -> int:
+    """Close every month after the latest checkpoint up to `through` (inclusive).
+
+    Each month costs one aggregate over that month's ledger rows plus a bulk
+    insert; balances of products without movements are carried forward.
+    Returns the number of checkpoint rows created.
+    """
+    through = month_start(through or last_closed_period())
+    last_period = StockCheckpoint.objects.aggregate(last=Max('period'))['last']
+    if last_period:
+        period = next_month(last_period)
+        carried = {
+            (pid, wid): qty
+            for pid, wid, qty in StockCheckpoint.objects.filter(period=last_period)
+            .values_list('product_id', 'warehouse_id', 'balance_qty')
+        }
+        start = period_end(last_period)
+    else:
+        first_movement = StockLedger.objects.aggregate(first=Min('movement_date'))['first']
+        if first_movement is None:
+            return 0
+        period = month_start(timezone.localtime(first_movement).date())
+        carried = {}
+        start = None
+
+    created = 0
+    while period <= through:
+        end = period_end(period)
+        rows = StockLedger.objects.filter(movement_date__lt=end)
+        if start is not None:
+            rows = rows.filter(movement_date__gte=start)
+        for key, total in _pair_sums(rows).items():
+            carried[key] = carried.get(key, Decimal('0')) + total
+        StockCheckpoint.objects.bulk_create(
+            [
+                StockCheckpoint(product_id=pid, warehouse_id=wid, period=period, balance_qty=qty)
+                for (pid, wid), qty in carried.items()
+            ],
+            batch_size=1000,
+        )
+        created += len(carried)
+        period, start = next_month(period), end
+    return created
+
+
+def ledger_balances(product_ids=None, as_of: datetime | None = None, warehouse_id: int | None = None) -> dict[int, Decimal]:
+    """Ledger balance per product: nearest checkpoint plus the ledger tail after it.
+
+    Without `as_of` the latest checkpoint is used and the tail runs to the end
+    of the ledger. With `as_of` (inclusive) the checkpoint is the last month
+    closed before `as_of`, and the tail is the bounded range between that
+    month's end and `as_of`, which the (product, movement_date) and
+    movement_date indexes serve directly. Only an `as_of` tail that falls in a
+    checkpointed month can reach into archived rows, so only then is
+    StockLedgerArchive read (for that range alone).
+
+    `product_ids` may be an iterable or a queryset of ids; None means all products.
+    With `warehouse_id` only that site's checkpoints and ledger rows are read
+    (through the warehouse-leading indexes); otherwise sites are summed.
+    """
+    checkpoints = StockCheckpoint.objects.all()
+    tail_filter = {}
+    if warehouse_id is not None:
+        checkpoints = checkpoints.filter(warehouse_id=warehouse_id)
+        tail_filter['warehouse_id'] = warehouse_id
+    tails = [StockLedger]
+    if as_of is None:
+        period = checkpoints.aggregate(last=Max('period'))['last']
+    else:
+        as_of_month = month_start(timezone.localtime(as_of).date())
+        periods = checkpoints.aggregate(last=Max('period', filter=Q(period__lt=as_of_month)), newest=Max('period'))
+        period = periods['last']
+        checkpoints = checkpoints.filter(period__lt=as_of_month)
+        tail_filter['movement_date__lte'] = as_of
+        # Only checkpointed months are ever archived, so the archive can only
+        # hold tail rows when the month of `as_of` is itself checkpointed.
+        if periods['newest'] is not None and periods['newest'] >= as_of_month:
+            tails.insert(0, StockLedgerArchive)
+
+    balances: dict[int, Decimal] = {}
+    if period:
+        balances.update(_product_sums(checkpoints.filter(period=period), product_ids, field='balance_qty'))
+        tail_filter['movement_date__gte'] = period_end(period)
+    for model in tails:
+        for pid, total in _product_sums(model.objects.filter(**tail_filter), product_ids).items():
+            balances[pid] = balances.get(pid, Decimal('0')) + total
+    return balances
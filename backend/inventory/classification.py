@@ -0,0 +1,136 @@
+"""ABC/XYZ classification of products from StockLedger consumption.
+
+One streaming aggregate query returns consumption (the outgoing quantity and
+value of OUT entries, see replenishment.consumption) per product and week,
+netted against what later edits of those entries gave back;
+ranking is then done with NumPy over all products at once:
+
+- ABC ranks products by consumption value (qty x ledger rate, falling back to
+  the product cost price for rows posted without a rate). Products making up
+  the first `a_share` of total value are A, up to `b_share` are B, the rest C.
+- XYZ uses the coefficient of variation of weekly quantity: up to `x_cv` is X,
+  up to `y_cv` is Y, above that (or no demand at all) is Z.
+
+Products without consumption in the window are classed C/Z. Classes are
+written in product id chunks, each in its own short transaction, so the job
+never holds locks on the whole product table.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Case, DateField, DecimalField, F, Sum, When
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .models import Product, StockLedger, StockLedgerArchive
+from .replenishment import compensations, consumption
+
+BATCH_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class ClassificationParams:
+    history_weeks: int = 52
+    a_share: float = 0.80
+    b_share: float = 0.95
+    x_cv: float = 0.5
+    y_cv: float = 1.0
+
+
+def weekly_consumption(history_weeks: int, today: date | None = None) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return (product ids, weekly qty matrix, total value per product)."""
+    today = today or timezone.localdate()
+    first_week = today - timedelta(days=today.weekday(), weeks=history_weeks - 1)
+    since = timezone.make_aware(datetime.combine(first_week, time.min))
+    unit_cost = Case(When(rate__gt=0, then=F('rate')), default=F('product__cost_price'))
+    row_value = Sum(F('qty_change') * unit_cost, output_field=DecimalField(max_digits=20, decimal_places=2))
+    pids, weeks, qtys, values = [], [], [], []
+    first_ordinal = first_week.toordinal()
+    for model in (StockLedgerArchive, StockLedger):
+        rows = (
+            consumption(model, since)
+            .annotate(week=TruncWeek('movement_date', output_field=DateField()))
+            .order_by()
+            .values('product_id', 'week')
+            .annotate(
+                qty=Sum('qty_change'),
+                value=row_value,
+            )
+            .values_list('product_id', 'week', 'qty', 'value')
+        )
+        for pid, week, qty, value in rows.iterator(chunk_size=10000):
+            pids.append(pid)
+            weeks.append((week.toordinal() - first_ordinal) // 7)
+            qtys.append(-float(qty))
+            values.append(-float(value or 0))
+    for pid, _, week, qty, value in compensations(since, value=row_value):
+        pids.append(pid)
+        weeks.append((week.toordinal() - first_ordinal) // 7)
+        qtys.append(-float(qty))
+        values.append(-float(value))
+    if not pids:
+        return np.empty(0, dtype=np.int64), np.zeros((0, history_weeks)), np.zeros(0)
+
+    product_ids, row_idx = np.unique(np.asarray(pids, dtype=np.int64), return_inverse=True)
+    demand = np.zeros((len(product_ids), history_weeks))
+    np.add.at(demand, (row_idx, np.clip(np.asarray(weeks), 0, history_weeks - 1)), np.asarray(qtys))
+    np.maximum(demand, 0.0, out=demand)
+    value = np.maximum(np.bincount(row_idx, weights=np.asarray(values), minlength=len(product_ids)), 0.0)
+    return product_ids, demand, value
+
+
+def abc_classes(value: np.ndarray, a_share: float, b_share: float) -> np.ndarray:
+    """Classes by cumulative share of value, highest value first."""
+    classes = np.full(len(value), Product.ABCClass.C.value, dtype='<U1')
+    total = value.sum()
+    if total <= 0:
+        return classes
+    order = np.argsort(-value, kind='stable')
+    share_before = (np.cumsum(value[order]) - value[order]) / total
+    ranked = np.where(share_before < a_share, 'A', np.where(share_before < b_share, 'B', 'C'))
+    ranked[value[order] <= 0] = 'C'
+    classes[order] = ranked
+    return classes
+
+
+def xyz_classes(demand: np.ndarray, x_cv: float, y_cv: float) -> np.ndarray:
+    """Classes by coefficient of variation of weekly demand."""
+    mean = demand.mean(axis=1)
+    std = demand.std(axis=1)
+    cv = np.divide(std, mean, out=np.full(len(mean), np.inf), where=mean > 0)
+    return np.where(cv <= x_cv, 'X', np.where(cv <= y_cv, 'Y', 'Z'))
+
+
+def _id_chunks(size: int):
+    """Product ids in ascending chunks of `size`, read by keyset so writes between chunks are safe."""
+    last = 0
+    while chunk := list(Product.objects.filter(id__gt=last).order_by('id').values_list('id', flat=True)[:size]):
+        yield chunk
+        last = chunk[-1]
+
+
+def classify_products(params: ClassificationParams | None = None, today: date | None = None) -> dict[str, int]:
+    """Classify every product; returns the number of products per ABC/XYZ pair."""
+    params = params or ClassificationParams()
+    product_ids, demand, value = weekly_consumption(params.history_weeks, today)
+    abc = abc_classes(value, params.a_share, params.b_share)
+    xyz = xyz_classes(demand, params.x_cv, params.y_cv)
+    classes = {pid: a + x for pid, a, x in zip(product_ids.tolist(), abc.tolist(), xyz.tolist())}
+
+    now = timezone.now()
+    counts = {'CZ': 0}
+    # Products without consumption default to C/Z; each chunk is one UPDATE per class pair
+    for chunk in _id_chunks(BATCH_SIZE):
+        groups: dict[str, list[int]] = {}
+        for pid in chunk:
+            groups.setdefault(classes.get(pid, 'CZ'), []).append(pid)
+        with transaction.atomic():
+            for pair, ids in groups.items():
+                Product.objects.filter(id__in=ids).update(abc_class=pair[0], xyz_class=pair[1], classified_at=now)
+        for pair, ids in groups.items():
+            counts[pair] = counts.get(pair, 0) + len(ids)
+    return counts
@@ -0,0 +1,160 @@
+"""Ledger / inventory consistency checks and repair.
+
+Three figures are kept per (product, warehouse) and must agree:
+
+- `SUM(StockLedger.qty_change)`,
+- the running `StockLedger.balance_qty` of each row (and the StockBalance head),
+- `Inventory.on_hand`.
+
+`check_chunk` verifies a batch of products with one ordered pass over their
+ledger rows plus two small lookups, so work is split by product and chunks
+can run in separate processes. Repair happens per chunk inside its own short
+transaction that locks only that chunk's heads and Inventory rows, the same
+locks a posting takes, so the rest of the ledger stays writable.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Iterator
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .alerts import sync_low_stock_alerts
+from .models import Inventory, Product, StockBalance, StockLedger, StockLedgerArchive
+from .posting import Key, _lock_balance_heads, _lock_inventory, sorted_keys
+
+ZERO = Decimal('0')
+
+
+@dataclass(frozen=True)
+class Mismatch:
+    product_id: int
+    warehouse_id: int | None
+    ledger_sum: Decimal
+    on_hand: Decimal | None
+    head_balance: Decimal | None
+    broken_rows: int
+
+    def describe(self) -> str:
+        problems = []
+        if self.on_hand != self.ledger_sum:
+            problems.append(f'on_hand={self.on_hand}')
+        if self.head_balance != self.ledger_sum:
+            problems.append(f'head={self.head_balance}')
+        if self.broken_rows:
+            problems.append(f'{self.broken_rows} running balance rows off')
+        where = f' @ warehouse {self.warehouse_id}' if self.warehouse_id else ''
+        return f'product {self.product_id}{where}: ledger sum {self.ledger_sum}, ' + ', '.join(problems)
+
+
+def product_chunks(size: int) -> Iterator[list[int]]:
+    """Yield product ids in ascending chunks of `size`."""
+    ids = Product.objects.order_by('id').values_list('id', flat=True)
+    chunk = []
+    for pid in ids.iterator(chunk_size=5000):
+        chunk.append(pid)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _scan_ledger(product_ids: list[int]) -> tuple[dict[Key, Decimal], list[tuple[type, int, Key, Decimal]]]:
+    """One ordered pass: per-key sums and the rows whose balance_qty is off.
+
+    Archived rows all precede the hot ones of the same key, so the archive is
+    scanned first and the running sums carry over into the hot ledger.
+    """
+    sums: dict[Key, Decimal] = {}
+    broken: list[tuple[type, int, Key, Decimal]] = []  # (ledger model, row id, key, expected balance)
+    for model in (StockLedgerArchive, StockLedger):
+        rows = (
+            model.objects.filter(product_id__in=product_ids)
+            .order_by('product_id', 'warehouse_id', 'movement_date', 'id')
+            .values_list('id', 'product_id', 'warehouse_id', 'qty_change', 'balance_qty')
+        )
+        for row_id, pid, wid, qty_change, balance_qty in rows.iterator(chunk_size=5000):
+            key = (pid, wid)
+            running = sums.get(key, ZERO) + qty_change
+            sums[key] = running
+            if balance_qty != running:
+                broken.append((model, row_id, key, running))
+    return sums, broken
+
+
+def _find_mismatches(product_ids: list[int]) -> tuple[list[Mismatch], list[tuple[type, int, Key, Decimal]], dict[Key, Decimal]]:
+    sums, broken = _scan_ledger(product_ids)
+    inventory = Inventory.objects.filter(product_id__in=product_ids)
+    on_hand = {(pid, wid): qty for pid, wid, qty in inventory.values_list('product_id', 'warehouse_id', 'on_hand')}
+    balances = StockBalance.objects.filter(product_id__in=product_ids)
+    heads = {(pid, wid): qty for pid, wid, qty in balances.values_list('product_id', 'warehouse_id', 'balance_qty')}
+    broken_count: dict[Key, int] = {}
+    for _, _, key, _ in broken:
+        broken_count[key] = broken_count.get(key, 0) + 1
+
+    mismatches = []
+    for key in sorted_keys(sums.keys() | on_hand.keys() | heads.keys()):
+        total = sums.get(key, ZERO)
+        inv_qty = on_hand.get(key)
+        head = heads.get(key)
+        inventory_ok = inv_qty == total or (inv_qty is None and not total)
+        head_ok = head == total or (head is None and key not in sums)
+        if inventory_ok and head_ok and not broken_count.get(key):
+            continue
+        mismatches.append(Mismatch(key[0], key[1], total, inv_qty, head, broken_count.get(key, 0)))
+    return mismatches, broken, sums
+
+
+@transaction.atomic
+def _repair(keys: list[Key]) -> list[Mismatch]:
+    """Lock the drifted heads and Inventory rows, re-check, and rewrite what is off."""
+    heads = _lock_balance_heads(keys)
+    inventory = _lock_inventory(keys, None)
+    mismatches, broken, sums = _find_mismatches(sorted({pid for pid, _ in keys}))
+    bad = {(m.product_id, m.warehouse_id) for m in mismatches} & set(keys)
+    mismatches = [m for m in mismatches if (m.product_id, m.warehouse_id) in bad]
+    if not mismatches:
+        return []
+
+    for model in (StockLedgerArchive, StockLedger):
+        fixes = [model(id=row_id, balance_qty=expected) for row_model, row_id, key, expected in broken
+                 if row_model is model and key in bad]
+        model.objects.bulk_update(fixes, ['balance_qty'], batch_size=1000)
+    now = timezone.now()
+    changed_heads = [heads[key] for key in bad]
+    for head in changed_heads:
+        head.balance_qty = sums.get((head.product_id, head.warehouse_id), ZERO)
+        head.updated_at = now
+    StockBalance.objects.bulk_update(changed_heads, ['balance_qty', 'updated_at'])
+
+    changed_inventory = [inventory[key] for key in bad]
+    previous_on_hand = {inv.pk: inv.on_hand for inv in changed_inventory}
+    for inv in changed_inventory:
+        inv.on_hand = sums.get((inv.product_id, inv.warehouse_id), ZERO)
+        inv.updated_at = now
+    Inventory.objects.bulk_update(changed_inventory, ['on_hand', 'updated_at'])
+    sync_low_stock_alerts(changed_inventory, previous_on_hand)
+    return mismatches
+
+
+def check_chunk(product_ids: list[int], repair: bool = False) -> list[Mismatch]:
+    """Return the mismatches for `product_ids`, repairing them when asked.
+
+    Without `repair` nothing is locked; mismatches seen by the read-only pass
+    are re-checked under lock before being rewritten.
+    """
+    mismatches, _, _ = _find_mismatches(product_ids)
+    if mismatches and repair:
+        return _repair(sorted_keys((m.product_id, m.warehouse_id) for m in mismatches))
+    return mismatches
+
+
+def init_worker() -> None:
+    """ProcessPoolExecutor initializer: set up Django and drop inherited connections."""
+    import django
+
+    django.setup()
+    connections.close_all()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from inventory.pricing import activate_due_price_lists
+
+
+class Command(BaseCommand):
+    help = "Apply every scheduled price list whose effective date has been reached (run daily)."
+
+    def handle(self, *args, **options):
+        activated, repriced = activate_due_price_lists()
+        self.stdout.write(self.style.SUCCESS(f'Activated {len(activated)} price lists, repriced {repriced} products.'))
@@ -0,0 +1,32 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.archive import BATCH_SIZE, archive_closed_periods
+from inventory.balances import last_closed_period
+
+
+class Command(BaseCommand):
+    help = "Checkpoint closed months and move their StockLedger rows into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--through',
+            help='Last month to archive, as YYYY-MM (default: the most recent fully ended month).',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows moved per transaction.')
+
+    def handle(self, *args, **options):
+        through = last_closed_period()
+        if options['through']:
+            try:
+                through = datetime.strptime(options['through'], '%Y-%m').date()
+            except ValueError as exc:
+                raise CommandError('--through must look like YYYY-MM') from exc
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        try:
+            moved = archive_closed_periods(through, batch_size=options['batch_size'])
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} ledger rows through {through:%Y-%m}.'))
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.balances import build_checkpoints, last_closed_period
+
+
+class Command(BaseCommand):
+    help = "Close monthly StockLedger balances into StockCheckpoint rows (run after each month end)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--through',
+            help='Last month to close, as YYYY-MM (default: the most recent fully ended month).',
+        )
+
+    def handle(self, *args, **options):
+        through = last_closed_period()
+        if options['through']:
+            try:
+                through = datetime.strptime(options['through'], '%Y-%m').date()
+            except ValueError as exc:
+                raise CommandError('--through must look like YYYY-MM') from exc
+            if through > last_closed_period():
+                raise CommandError('Only fully ended months can be checkpointed.')
+        created = build_checkpoints(through)
+        self.stdout.write(self.style.SUCCESS(f'Created {created} checkpoint rows through {through:%Y-%m}.'))
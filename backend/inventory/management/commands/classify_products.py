@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.classification import ClassificationParams, classify_products
+
+
+class Command(BaseCommand):
+    help = "Assign ABC (consumption value) and XYZ (demand variability) classes to every product."
+
+    def add_arguments(self, parser):
+        defaults = ClassificationParams()
+        parser.add_argument('--history-weeks', type=int, default=defaults.history_weeks)
+        parser.add_argument('--a-share', type=float, default=defaults.a_share,
+                            help='Cumulative value share covered by class A (default 0.80).')
+        parser.add_argument('--b-share', type=float, default=defaults.b_share,
+                            help='Cumulative value share covered by classes A and B (default 0.95).')
+        parser.add_argument('--x-cv', type=float, default=defaults.x_cv, help='Max coefficient of variation for X.')
+        parser.add_argument('--y-cv', type=float, default=defaults.y_cv, help='Max coefficient of variation for Y.')
+
+    def handle(self, *args, **options):
+        params = ClassificationParams(
+            history_weeks=options['history_weeks'],
+            a_share=options['a_share'],
+            b_share=options['b_share'],
+            x_cv=options['x_cv'],
+            y_cv=options['y_cv'],
+        )
+        if params.history_weeks < 1:
+            raise CommandError('--history-weeks must be positive.')
+        if not 0 < params.a_share <= params.b_share <= 1 or not 0 <= params.x_cv <= params.y_cv:
+            raise CommandError('Expected 0 < a-share <= b-share <= 1 and 0 <= x-cv <= y-cv.')
+        counts = classify_products(params)
+        summary = ', '.join(f'{pair}={count}' for pair, count in sorted(counts.items()))
+        self.stdout.write(self.style.SUCCESS(f'Classified products: {summary}'))
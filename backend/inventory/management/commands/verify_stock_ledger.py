@@ -0,0 +1,51 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from inventory.consistency import check_chunk, init_worker, product_chunks
+
+
+class Command(BaseCommand):
+    help = (
+        "Check that Inventory.on_hand, running StockLedger balances and SUM(qty_change) agree "
+        "for every product, optionally repairing the products that drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help='Rewrite balance_qty, heads and on_hand from the ledger.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes (1 = run inline).')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Products checked per chunk.')
+
+    def handle(self, *args, **options):
+        workers, chunk_size = options['workers'], options['chunk_size']
+        if workers < 1 or chunk_size < 1:
+            raise CommandError('--workers and --chunk-size must be positive.')
+        check = partial(check_chunk, repair=options['repair'])
+        chunks = product_chunks(chunk_size)
+
+        if workers == 1:
+            results = map(check, chunks)
+            found = self._report(results)
+        else:
+            # Children must open their own connections
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+                found = self._report(pool.map(check, chunks))
+
+        if not found:
+            self.stdout.write(self.style.SUCCESS('Ledger and inventory are consistent.'))
+        elif options['repair']:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {found} products.'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{found} products out of balance; rerun with --repair to fix.'))
+
+    def _report(self, results) -> int:
+        found = 0
+        for mismatches in results:
+            for mismatch in mismatches:
+                self.stdout.write(mismatch.describe())
+            found += len(mismatches)
+        return found
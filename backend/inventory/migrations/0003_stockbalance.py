@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:42
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def seed_balance_heads(apps, schema_editor):
+    """Start every head from the product's latest running ledger balance."""
+    Product = apps.get_model('inventory', 'Product')
+    StockLedger = apps.get_model('inventory', 'StockLedger')
+    StockBalance = apps.get_model('inventory', 'StockBalance')
+    latest = (
+        StockLedger.objects.filter(product=models.OuterRef('pk'))
+        .order_by('-movement_date', '-id')
+        .values('balance_qty')[:1]
+    )
+    rows = (
+        Product.objects.filter(stock_ledger__isnull=False).distinct()
+        .annotate(last_balance=models.Subquery(latest))
+        .values_list('id', 'last_balance')
+    )
+    StockBalance.objects.bulk_create(
+        [StockBalance(product_id=pid, balance_qty=balance or Decimal('0.000')) for pid, balance in rows.iterator()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_stockentry_stockentryline_stockledger_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('balance_qty', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stock_balance', to='inventory.product')),
+            ],
+        ),
+        migrations.RunPython(seed_balance_heads, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_low_stock_alerts(apps, schema_editor):
+    Inventory = apps.get_model('inventory', 'Inventory')
+    LowStockAlert = apps.get_model('inventory', 'LowStockAlert')
+    low = Inventory.objects.filter(reorder_level__gt=0, on_hand__lte=models.F('reorder_level'))
+    LowStockAlert.objects.bulk_create(
+        [LowStockAlert(inventory_id=pk, product_id=pid) for pk, pid in low.values_list('pk', 'product_id')],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_pricelist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LowStockAlert',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('since', models.DateTimeField(auto_now_add=True)),
+                ('inventory', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='low_stock_alert', to='inventory.inventory')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='low_stock_alerts', to='inventory.product')),
+            ],
+            options={
+                'ordering': ('since',),
+                'indexes': [models.Index(fields=['product'], name='inventory_l_product_952907_idx')],
+            },
+        ),
+        migrations.RunPython(seed_low_stock_alerts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,122 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_lowstockalert'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Warehouse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('code', models.CharField(max_length=20, unique=True)),
+                ('name', models.CharField(max_length=255)),
+                ('address_line1', models.CharField(blank=True, max_length=255)),
+                ('city', models.CharField(blank=True, max_length=100)),
+                ('state', models.CharField(blank=True, max_length=100)),
+                ('postal_code', models.CharField(blank=True, max_length=12)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'ordering': ('code',),
+            },
+        ),
+        migrations.RemoveConstraint(
+            model_name='stockcheckpoint',
+            name='uniq_stock_checkpoint_product_period',
+        ),
+        migrations.AlterUniqueTogether(
+            name='inventory',
+            unique_together=set(),
+        ),
+        migrations.AlterField(
+            model_name='stockbalance',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_balances', to='inventory.product'),
+        ),
+        migrations.AddField(
+            model_name='warehouse',
+            name='created_by',
+            field=models.ForeignKey(blank=True, help_text='User who initially created this record.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='created_%(class)ss', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='warehouse',
+            name='updated_by',
+            field=models.ForeignKey(blank=True, help_text='User who last updated this record.', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='updated_%(class)ss', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='inventory',
+            name='warehouse',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='inventory', to='inventory.warehouse'),
+        ),
+        migrations.AddField(
+            model_name='stockbalance',
+            name='warehouse',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stock_balances', to='inventory.warehouse'),
+        ),
+        migrations.AddField(
+            model_name='stockcheckpoint',
+            name='warehouse',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stock_checkpoints', to='inventory.warehouse'),
+        ),
+        migrations.AddField(
+            model_name='stockentryline',
+            name='warehouse',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stock_entry_lines', to='inventory.warehouse'),
+        ),
+        migrations.AddField(
+            model_name='stockledger',
+            name='warehouse',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stock_ledger', to='inventory.warehouse'),
+        ),
+        migrations.AddIndex(
+            model_name='inventory',
+            index=models.Index(fields=['warehouse', 'product'], name='inventory_i_warehou_5a1f66_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockbalance',
+            index=models.Index(fields=['warehouse', 'product'], name='inventory_s_warehou_a3b8bc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockcheckpoint',
+            index=models.Index(fields=['warehouse', 'period'], name='inventory_s_warehou_588849_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockledger',
+            index=models.Index(fields=['warehouse', 'product', 'movement_date'], name='inventory_s_warehou_41ee98_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='inventory',
+            constraint=models.UniqueConstraint(fields=('product', 'warehouse'), name='uniq_inventory_product_warehouse'),
+        ),
+        migrations.AddConstraint(
+            model_name='inventory',
+            constraint=models.UniqueConstraint(condition=models.Q(('warehouse__isnull', True)), fields=('product',), name='uniq_inventory_product_unassigned'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockbalance',
+            constraint=models.UniqueConstraint(fields=('product', 'warehouse'), name='uniq_stock_balance_product_warehouse'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockbalance',
+            constraint=models.UniqueConstraint(condition=models.Q(('warehouse__isnull', True)), fields=('product',), name='uniq_stock_balance_product_unassigned'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockcheckpoint',
+            constraint=models.UniqueConstraint(fields=('product', 'warehouse', 'period'), name='uniq_stock_checkpoint_product_warehouse_period'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockcheckpoint',
+            constraint=models.UniqueConstraint(condition=models.Q(('warehouse__isnull', True)), fields=('product', 'period'), name='uniq_stock_checkpoint_product_unassigned_period'),
+        ),
+    ]
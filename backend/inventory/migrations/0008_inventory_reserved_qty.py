@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:58
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_warehouse'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventory',
+            name='reserved_qty',
+            field=models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=16),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:00
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_inventory_reserved_qty'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReplenishmentSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('velocity', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=16)),
+                ('forecast', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=16)),
+                ('safety_stock', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=16)),
+                ('reorder_point', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=16)),
+                ('reorder_qty', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=16)),
+                ('computed_at', models.DateTimeField()),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='replenishment', to='inventory.product')),
+            ],
+            options={
+                'ordering': ('product',),
+                'indexes': [models.Index(fields=['computed_at'], name='inventory_r_compute_58f17a_idx')],
+            },
+        ),
+    ]
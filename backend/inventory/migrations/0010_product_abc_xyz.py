@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_replenishmentsuggestion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='abc_class',
+            field=models.CharField(blank=True, choices=[('A', 'A - high consumption value'), ('B', 'B - medium consumption value'), ('C', 'C - low consumption value')], max_length=1),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='classified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='xyz_class',
+            field=models.CharField(blank=True, choices=[('X', 'X - steady demand'), ('Y', 'Y - variable demand'), ('Z', 'Z - erratic or no demand')], max_length=1),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['abc_class', 'xyz_class'], name='inventory_p_abc_cla_c9eae7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['xyz_class'], name='inventory_p_xyz_cla_a34f93_idx'),
+        ),
+    ]
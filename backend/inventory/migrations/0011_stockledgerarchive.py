@@ -0,0 +1,77 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:04
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+POSTGRES_TABLE = '''
+CREATE TABLE inventory_stockledgerarchive (
+    id bigint NOT NULL,
+    product_id bigint NOT NULL,
+    warehouse_id bigint NULL,
+    stock_entry_id bigint NULL,
+    movement_date timestamp with time zone NOT NULL,
+    qty_change numeric(16, 3) NOT NULL,
+    balance_qty numeric(16, 3) NOT NULL,
+    rate numeric(14, 2) NOT NULL,
+    created_at timestamp with time zone NOT NULL,
+    created_by_id bigint NULL,
+    PRIMARY KEY (id, movement_date)
+) PARTITION BY RANGE (movement_date)
+'''
+
+
+def create_archive_table(apps, schema_editor):
+    model = apps.get_model('inventory', 'StockLedgerArchive')
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.create_model(model)
+        return
+    # Monthly partitions are attached by inventory.archive before rows are moved in
+    schema_editor.execute(POSTGRES_TABLE)
+    schema_editor.execute(
+        'CREATE TABLE inventory_stockledgerarchive_default PARTITION OF inventory_stockledgerarchive DEFAULT'
+    )
+    for index in model._meta.indexes:
+        schema_editor.add_index(model, index)
+
+
+def drop_archive_table(apps, schema_editor):
+    schema_editor.delete_model(apps.get_model('inventory', 'StockLedgerArchive'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0010_product_abc_xyz'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # The table itself is created by create_archive_table (partitioned on PostgreSQL)
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='StockLedgerArchive',
+                    fields=[
+                        ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                        ('movement_date', models.DateTimeField()),
+                        ('qty_change', models.DecimalField(decimal_places=3, max_digits=16)),
+                        ('balance_qty', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=16)),
+                        ('rate', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                        ('created_at', models.DateTimeField()),
+                        ('created_by', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                        ('product', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='inventory.product')),
+                        ('stock_entry', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='inventory.stockentry')),
+                        ('warehouse', models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='inventory.warehouse')),
+                    ],
+                    options={
+                        'ordering': ('-movement_date', '-id'),
+                        'indexes': [models.Index(fields=['product', 'movement_date'], name='inventory_s_product_fb33f3_idx'), models.Index(fields=['movement_date'], name='inventory_s_movemen_7e3411_idx'), models.Index(fields=['warehouse', 'product', 'movement_date'], name='inventory_s_warehou_745647_idx')],
+                    },
+                ),
+            ],
+        ),
+        migrations.RunPython(create_archive_table, drop_archive_table),
+    ]
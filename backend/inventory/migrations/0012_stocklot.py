@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:09
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0011_stockledgerarchive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockentryline',
+            name='expiry_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='stockentryline',
+            name='lot_number',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.CreateModel(
+            name='StockLot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lot_number', models.CharField(max_length=64)),
+                ('expiry_date', models.DateField(blank=True, null=True)),
+                ('qty', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lots', to='inventory.product')),
+                ('warehouse', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='lots', to='inventory.warehouse')),
+            ],
+            options={
+                'ordering': ('product', 'expiry_date', 'id'),
+            },
+        ),
+        migrations.AddField(
+            model_name='stockledger',
+            name='lot',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='ledger_rows', to='inventory.stocklot'),
+        ),
+        migrations.AddField(
+            model_name='stockledgerarchive',
+            name='lot',
+            field=models.ForeignKey(db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='inventory.stocklot'),
+        ),
+        migrations.AddIndex(
+            model_name='stocklot',
+            index=models.Index(fields=['product', 'expiry_date'], name='inventory_s_product_5d5f26_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stocklot',
+            index=models.Index(fields=['warehouse', 'product', 'expiry_date'], name='inventory_s_warehou_17fba6_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='stocklot',
+            constraint=models.UniqueConstraint(fields=('product', 'warehouse', 'lot_number'), name='uniq_stock_lot_product_warehouse'),
+        ),
+        migrations.AddConstraint(
+            model_name='stocklot',
+            constraint=models.UniqueConstraint(condition=models.Q(('warehouse__isnull', True)), fields=('product', 'lot_number'), name='uniq_stock_lot_product_unassigned'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:12
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_stocklot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventory',
+            name='in_transit_qty',
+            field=models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=16),
+        ),
+        migrations.AddField(
+            model_name='stockentry',
+            name='received_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='stockentryline',
+            name='to_warehouse',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='incoming_stock_entry_lines', to='inventory.warehouse'),
+        ),
+        migrations.AlterField(
+            model_name='stockentry',
+            name='entry_type',
+            field=models.CharField(choices=[('IN', 'Stock In'), ('OUT', 'Stock Out'), ('ADJUST', 'Adjustment'), ('TRANSFER', 'Transfer')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:17
+
+import heapq
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+COST_PLACES = Decimal('0.000001')
+
+
+def seed_product_costs(apps, schema_editor):
+    """Replay the ledger (archive and hot table) into one moving-average cost per product.
+
+    Transfer legs are skipped, and products never received at a price get no
+    row (they stay valued at their cost_price).
+    """
+    ProductCost = apps.get_model('inventory', 'ProductCost')
+    streams = [
+        apps.get_model('inventory', name).objects.exclude(stock_entry__entry_type='TRANSFER')
+        .order_by('product_id', 'movement_date', 'id')
+        .values_list('product_id', 'movement_date', 'id', 'qty_change', 'rate').iterator(chunk_size=5000)
+        for name in ('StockLedgerArchive', 'StockLedger')
+    ]
+    batch = []
+    for product_id, rows in groupby(heapq.merge(*streams, key=itemgetter(0, 1, 2)), key=itemgetter(0)):
+        qty = value = avg = Decimal('0')
+        for *_, qty_change, rate in rows:
+            value += qty_change * ((rate or avg) if qty_change > 0 else avg)
+            qty += qty_change
+            if qty > 0:
+                avg = value / qty
+            else:
+                value = qty * avg
+        if avg:
+            batch.append(ProductCost(product_id=product_id, avg_cost=avg.quantize(COST_PLACES)))
+        if len(batch) >= 1000:
+            ProductCost.objects.bulk_create(batch)
+            batch = []
+    ProductCost.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0013_stock_transfer'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductCost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('avg_cost', models.DecimalField(decimal_places=6, default=Decimal('0'), max_digits=20)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cost', to='inventory.product')),
+            ],
+        ),
+        migrations.RunPython(seed_product_costs, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from decimal import Decimal
 
+from django.conf import settings
 from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
 from django.db import models
 
@@ -35,35 +36,221 @@ class Product(BaseModel):
                                    validators=[MinValueValidator(Decimal("0.00")), MaxValueValidator(Decimal("100.00"))])
     is_active = models.BooleanField(default=True)
 
+    class ABCClass(models.TextChoices):
+        A = "A", "A - high consumption value"
+        B = "B", "B - medium consumption value"
+        C = "C", "C - low consumption value"
+
+    class XYZClass(models.TextChoices):
+        X = "X", "X - steady demand"
+        Y = "Y", "Y - variable demand"
+        Z = "Z", "Z - erratic or no demand"
+
+    # Set by the classify_products batch job (inventory.classification)
+    abc_class = models.CharField(max_length=1, choices=ABCClass.choices, blank=True)
+    xyz_class = models.CharField(max_length=1, choices=XYZClass.choices, blank=True)
+    classified_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         ordering = ("name",)
         indexes = [
             models.Index(fields=["sku"]),
             models.Index(fields=["name"]),
+            models.Index(fields=["abc_class", "xyz_class"]),
+            models.Index(fields=["xyz_class"]),
         ]
 
     def __str__(self) -> str:  # pragma: no cover
         return f"{self.sku} - {self.name}"
 
 
+class Warehouse(BaseModel):
+    """
+    A stock-holding site.
+
+    Inventory, StockEntryLine, StockLedger, balance heads and checkpoints carry
+    an optional warehouse; a null warehouse is the unassigned (default)
+    location, which is where all stock lived before warehouses existed.
+    """
+
+    code = models.CharField(max_length=20, unique=True)
+    name = models.CharField(max_length=255)
+    address_line1 = models.CharField(max_length=255, blank=True)
+    city = models.CharField(max_length=100, blank=True)
+    state = models.CharField(max_length=100, blank=True)
+    postal_code = models.CharField(max_length=12, blank=True)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ("code",)
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.code} - {self.name}"
+
+
+class PriceList(BaseModel):
+    """
+    A batch of staged selling prices that become active together.
+
+    Lists are created as SCHEDULED with an `effective_from` date and applied to
+    Product.selling_price in one batch once that date is reached
+    (see inventory.pricing.activate_due_price_lists).
+    """
+
+    class Status(models.TextChoices):
+        SCHEDULED = "SCHEDULED", "Scheduled"
+        ACTIVE = "ACTIVE", "Active"
+        CANCELLED = "CANCELLED", "Cancelled"
+
+    name = models.CharField(max_length=100, blank=True)
+    effective_from = models.DateField()
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.SCHEDULED)
+    activated_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("-effective_from", "-id")
+        indexes = [
+            models.Index(fields=["status", "effective_from"]),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"PriceList {self.id} {self.name} from {self.effective_from}"
+
+
+class PriceListItem(models.Model):
+    price_list = models.ForeignKey(PriceList, on_delete=models.CASCADE, related_name="items")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="price_list_items")
+    selling_price = models.DecimalField(max_digits=14, decimal_places=2,
+                                        validators=[MinValueValidator(Decimal("0.00"))])
+
+    class Meta:
+        unique_together = ("price_list", "product")
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.product_id} @ {self.selling_price}"
+
+
 class Inventory(BaseModel):
     """
-    Simple inventory snapshot per product.
-    For multi-warehouse support, extend this with a Warehouse FK later.
+    Inventory snapshot per product and warehouse (null = unassigned location).
+
+    reserved_qty is stock promised to confirmed sales orders shipping from this
+    site (maintained by sales.reservations) and in_transit_qty is stock dispatched to this site by
+    a TRANSFER entry that has not been received yet; both are part of on_hand
+    but not available, so available_qty is a read of this row alone.
     """
 
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="inventory")
+    warehouse = models.ForeignKey(Warehouse, null=True, blank=True, on_delete=models.PROTECT, related_name="inventory")
     on_hand = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal("0.000"))
     reorder_level = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal("0.000"))
+    reserved_qty = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal("0.000"))
+    in_transit_qty = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal("0.000"))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "warehouse"], name="uniq_inventory_product_warehouse"),
+            models.UniqueConstraint(
+                fields=["product"], condition=models.Q(warehouse__isnull=True), name="uniq_inventory_product_unassigned"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["product"]),
+            models.Index(fields=["warehouse", "product"]),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"Stock {self.product.sku} @ {self.warehouse_id or '-'}: {self.on_hand} {self.product.unit}"
+
+    @property
+    def available_qty(self) -> Decimal:
+        return (self.on_hand or Decimal("0")) - (self.reserved_qty or Decimal("0")) - (self.in_transit_qty or Decimal("0"))
+
+
+class LowStockAlert(models.Model):
+    """
+    Inventory rows currently at or below their reorder level.
+
+    Maintained by inventory.alerts when a posting or an edit moves a row across
+    its reorder level, so low-stock lists and counts are plain index reads.
+    Rows with a zero reorder level never raise an alert.
+    """
+
+    inventory = models.OneToOneField(Inventory, on_delete=models.CASCADE, related_name="low_stock_alert")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="low_stock_alerts")
+    since = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        unique_together = ("product",)
+        ordering = ("since",)
         indexes = [
             models.Index(fields=["product"]),
         ]
 
     def __str__(self) -> str:  # pragma: no cover
-        return f"Stock {self.product.sku}: {self.on_hand} {self.product.unit}"
+        return f"Low stock {self.product_id} since {self.since}"
+
+
+class ReplenishmentSuggestion(models.Model):
+    """
+    Latest replenishment plan per product (see inventory.replenishment).
+
+    Quantities are per day for velocity/forecast and in stock units for the
+    reorder point and suggested order quantity; each planning run overwrites
+    the product's row.
+    """
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name="replenishment")
+    velocity = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal("0.000"))
+    forecast = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal("0.000"))
+    safety_stock = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal("0.000"))
+    reorder_point = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal("0.000"))
+    reorder_qty = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal("0.000"))
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ("product",)
+        indexes = [
+            models.Index(fields=["computed_at"]),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"Replenish {self.product_id}: ROP {self.reorder_point}, qty {self.reorder_qty}"
+
+
+class StockLot(models.Model):
+    """
+    Lot (batch) balance per product and warehouse.
+
+    Created when a stock entry line names a lot and kept current by the
+    posting engine, which also draws lot-less outgoing movements from the
+    earliest-expiring lots first (FEFO). The (product, expiry_date) index
+    serves FEFO picking as one ordered range read.
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="lots")
+    warehouse = models.ForeignKey(Warehouse, null=True, blank=True, on_delete=models.PROTECT, related_name="lots")
+    lot_number = models.CharField(max_length=64)
+    expiry_date = models.DateField(null=True, blank=True)
+    qty = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal("0.000"))
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("product", "expiry_date", "id")
+        constraints = [
+            models.UniqueConstraint(fields=["product", "warehouse", "lot_number"], name="uniq_stock_lot_product_warehouse"),
+            models.UniqueConstraint(
+                fields=["product", "lot_number"], condition=models.Q(warehouse__isnull=True),
+                name="uniq_stock_lot_product_unassigned",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["product", "expiry_date"]),
+            models.Index(fields=["warehouse", "product", "expiry_date"]),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"Lot {self.lot_number} of {self.product_id}: {self.qty} (exp {self.expiry_date or '-'})"
 
 
 class StockEntry(BaseModel):
@@ -71,11 +258,14 @@ class StockEntry(BaseModel):
         IN = "IN", "Stock In"
         OUT = "OUT", "Stock Out"
         ADJUST = "ADJUST", "Adjustment"
+        TRANSFER = "TRANSFER", "Transfer"
 
     reference_number = models.CharField(max_length=50, blank=True)
     entry_type = models.CharField(max_length=10, choices=EntryType.choices)
     entry_date = models.DateField(auto_now_add=True)
     remarks = models.TextField(blank=True)
+    # TRANSFER only: set once the destination confirms receipt (clears in-transit qty)
+    received_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         indexes = [
@@ -87,33 +277,35 @@ class StockEntry(BaseModel):
     def __str__(self):  # pragma: no cover
         return f"StockEntry {self.id} {self.entry_type} {self.reference_number}"  # type: ignore[str-format]
 
-    def apply_to_inventory(self):
-        for line in self.lines.all():
-            inv, _ = Inventory.objects.get_or_create(product=line.product, defaults={"on_hand": Decimal("0.000"), "created_by": self.created_by, "updated_by": self.created_by})
-            if self.entry_type == self.EntryType.IN:
-                inv.on_hand = (inv.on_hand or Decimal('0')) + line.quantity
-            elif self.entry_type == self.EntryType.OUT:
-                inv.on_hand = (inv.on_hand or Decimal('0')) - line.quantity
-            else:  # ADJUST uses signed quantity
-                inv.on_hand = (inv.on_hand or Decimal('0')) + line.quantity
-            inv.updated_by = self.updated_by
-            inv.save(update_fields=["on_hand", "updated_at", "updated_by"])
-            # Ledger row
-            StockLedger.record_movement(
-                product=line.product,
-                change=line.quantity if self.entry_type != self.EntryType.OUT else -line.quantity,
-                entry=self,
-                rate=line.rate,
-                user=self.updated_by or self.created_by,
-            )
+    def apply_to_inventory(self, incremental: bool = False, posted_lots=None):
+        """
+        Post lines to Inventory and the StockLedger using set-based writes.
+        With incremental=True only the difference from what this entry already
+        posted is written (used when an entry is edited or re-submitted);
+        `posted_lots` are the (product, warehouse, lot number) keys of the lines
+        it was posted with, when those lines have since been replaced.
+        """
+        from .posting import post_stock_entry, repost_stock_entry
+
+        if incremental:
+            return repost_stock_entry(self, posted_lots)
+        return post_stock_entry(self)
 
 
 class StockEntryLine(BaseModel):
     stock_entry = models.ForeignKey(StockEntry, on_delete=models.CASCADE, related_name="lines")
     product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name="stock_entry_lines")
+    warehouse = models.ForeignKey(Warehouse, null=True, blank=True, on_delete=models.PROTECT, related_name="stock_entry_lines")
+    # TRANSFER only: destination site (null = unassigned location); `warehouse` is the source
+    to_warehouse = models.ForeignKey(
+        Warehouse, null=True, blank=True, on_delete=models.PROTECT, related_name="incoming_stock_entry_lines"
+    )
     quantity = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal("0.000"))
     rate = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
     amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    # Optional lot; an IN line creates the lot on first use, an OUT line draws from it
+    lot_number = models.CharField(max_length=64, blank=True)
+    expiry_date = models.DateField(null=True, blank=True)
 
     class Meta:
         indexes = [
@@ -127,7 +319,9 @@ class StockEntryLine(BaseModel):
 
 class StockLedger(BaseModel):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_ledger")
+    warehouse = models.ForeignKey(Warehouse, null=True, blank=True, on_delete=models.PROTECT, related_name="stock_ledger")
     stock_entry = models.ForeignKey(StockEntry, null=True, blank=True, on_delete=models.SET_NULL, related_name="ledger_rows")
+    lot = models.ForeignKey(StockLot, null=True, blank=True, on_delete=models.PROTECT, related_name="ledger_rows")
     movement_date = models.DateTimeField(auto_now_add=True)
     qty_change = models.DecimalField(max_digits=16, decimal_places=3)
     balance_qty = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal("0.000"))
@@ -137,20 +331,140 @@ class StockLedger(BaseModel):
         ordering = ("-movement_date", "-id")
         indexes = [
             models.Index(fields=["product", "movement_date"]),
+            models.Index(fields=["movement_date"]),
+            models.Index(fields=["warehouse", "product", "movement_date"]),
         ]
 
     @classmethod
-    def record_movement(cls, *, product: Product, change: Decimal, entry: StockEntry | None, rate: Decimal, user):
-        last = cls.objects.filter(product=product).order_by('-movement_date', '-id').first()
-        prev_balance = last.balance_qty if last else Decimal('0')
-        new_balance = (prev_balance + change).quantize(Decimal('0.000'))
-        row = cls.objects.create(
-            product=product,
-            stock_entry=entry,
-            qty_change=change,
-            balance_qty=new_balance,
-            rate=rate or Decimal('0.00'),
-            created_by=user,
-            updated_by=user,
-        )
-        return row
+    def record_movement(cls, *, product: Product, change: Decimal, entry: StockEntry | None, rate: Decimal, user,
+                        warehouse: Warehouse | None = None):
+        """Append one ledger row, serialized through the (product, warehouse) StockBalance head."""
+        from .posting import Movement, append_ledger_rows
+
+        movement = Movement(product.pk, change, rate or Decimal('0.00'), warehouse.pk if warehouse else None)
+        rows = append_ledger_rows([movement], entry=entry, user=user)
+        return rows[0] if rows else None
+
+
+class StockLedgerArchive(models.Model):
+    """
+    StockLedger rows of closed, checkpointed months (see inventory.archive).
+
+    Rows keep their original id. On PostgreSQL the table is range-partitioned
+    by month on movement_date (so its primary key is (id, movement_date) in
+    the database); elsewhere it is a plain table with the same indexes.
+    Relations are kept without database constraints so partitions stay cheap
+    to attach and detach.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    product = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    warehouse = models.ForeignKey(Warehouse, null=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    stock_entry = models.ForeignKey(StockEntry, null=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    lot = models.ForeignKey(StockLot, null=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+")
+    movement_date = models.DateTimeField()
+    qty_change = models.DecimalField(max_digits=16, decimal_places=3)
+    balance_qty = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal("0.000"))
+    rate = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"))
+    created_at = models.DateTimeField()
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+"
+    )
+
+    class Meta:
+        ordering = ("-movement_date", "-id")
+        indexes = [
+            models.Index(fields=["product", "movement_date"]),
+            models.Index(fields=["movement_date"]),
+            models.Index(fields=["warehouse", "product", "movement_date"]),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"Archived ledger {self.id} {self.product_id} {self.movement_date:%Y-%m-%d}"
+
+
+class StockBalance(models.Model):
+    """
+    Running ledger balance per product and warehouse (the "balance head").
+
+    Postings lock the head rows of the (product, warehouse) pairs they touch,
+    add their changes and stamp the result on the new StockLedger rows, so
+    concurrent postings on the same pair serialize on one row while postings
+    on other products or at other sites never wait for each other.
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_balances")
+    warehouse = models.ForeignKey(Warehouse, null=True, blank=True, on_delete=models.PROTECT, related_name="stock_balances")
+    balance_qty = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal("0.000"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "warehouse"], name="uniq_stock_balance_product_warehouse"),
+            models.UniqueConstraint(
+                fields=["product"], condition=models.Q(warehouse__isnull=True), name="uniq_stock_balance_product_unassigned"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["warehouse", "product"]),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"Balance {self.product_id}: {self.balance_qty}"
+
+
+class ProductCost(models.Model):
+    """
+    Running moving-average cost per product (all warehouses).
+
+    Maintained by the posting engine with the same rule the ledger valuation
+    uses (inventory.valuation.average_step): priced receipts move the average,
+    issues and zero-rate receipts leave it. The row only exists once a product
+    has been received at a price; the average is kept unrounded enough to
+    track a full ledger replay and is mirrored (to cents) into
+    Product.cost_price.
+    """
+
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, related_name="cost")
+    avg_cost = models.DecimalField(max_digits=20, decimal_places=6, default=Decimal("0"))
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"Cost {self.product_id}: {self.avg_cost}"
+
+
+class StockCheckpoint(models.Model):
+    """
+    Ledger balance per product and warehouse at the close of a month.
+
+    `period` is the first day of the month; the checkpoint covers every ledger
+    row with movement_date before the first day of the following month.
+    Checkpoints are carried forward for every (product, warehouse) pair with
+    history, so the balance of any pair is its row in the latest period plus
+    the ledger tail after that period.
+    """
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="stock_checkpoints")
+    warehouse = models.ForeignKey(Warehouse, null=True, blank=True, on_delete=models.PROTECT, related_name="stock_checkpoints")
+    period = models.DateField()
+    balance_qty = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal("0.000"))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ("-period", "product")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "warehouse", "period"], name="uniq_stock_checkpoint_product_warehouse_period"
+            ),
+            models.UniqueConstraint(
+                fields=["product", "period"], condition=models.Q(warehouse__isnull=True),
+                name="uniq_stock_checkpoint_product_unassigned_period",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["period"]),
+            models.Index(fields=["warehouse", "period"]),
+        ]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"Checkpoint {self.product_id} {self.period:%Y-%m}: {self.balance_qty}"
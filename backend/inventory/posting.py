@@ -0,0 +1,639 @@
+"""Set-based stock posting engine.
+
+Every stock movement (entry lines, adjustments, re-posts) goes through
+`post_movements`, which touches the database a fixed number of times per call:
+
+1. lock the `StockBalance` heads of the affected (product, warehouse) pairs,
+2. lock the matching `Inventory` rows with a single `select_for_update`
+   (creating any missing rows in one `bulk_create`),
+3. compute new on-hand figures and running ledger balances in memory,
+4. write them back with `bulk_update` and one `bulk_create`,
+5. touch LowStockAlert only for rows that crossed their reorder level.
+
+A posting that receives stock at a price also advances the moving-average
+cost of those products (`ProductCost`, one locking read and one
+bulk_update), so current cost and valuation never need a ledger replay.
+Issues and zero-rate receipts leave the average, and its row, alone.
+
+Lot-tracked stock adds one locking read and one bulk_update of `StockLot`
+rows per call: outgoing movements that name no lot are split across the
+key's unexpired lots earliest expiry first (FEFO) before the ledger rows are
+built, and the receiving leg of such a transfer lands in the same lots.
+
+The cost of posting therefore grows with the number of distinct products,
+not with the number of lines. Locks are taken per (product, warehouse), so
+postings at different sites never wait for each other.
+
+Running balances are taken from the locked heads rather than from the
+latest ledger row, so two postings racing on the same product queue on the
+head row instead of both reading the same base balance.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import connection, transaction
+from django.db.models import F, Max, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .alerts import sync_low_stock_alerts
+from .models import (
+    Inventory, Product, ProductCost, StockBalance, StockEntry, StockLedger, StockLedgerArchive, StockLot,
+)
+from .valuation import MONEY_PLACES, average_costs, average_step
+
+QTY_PLACES = Decimal('0.000')
+COST_PLACES = Decimal('0.000001')
+ZERO = Decimal('0')
+
+# FEFO pick order, served by the (product, expiry_date) lot index; lots without expiry go last
+FEFO_ORDER = ('product_id', 'warehouse_id', F('expiry_date').asc(nulls_last=True), 'id')
+
+# A stock location: (product id, warehouse id or None for the unassigned location)
+Key = tuple[int, 'int | None']
+# A lot by name: (product id, warehouse id, lot number)
+LotKey = tuple[int, 'int | None', str]
+
+
+@dataclass(frozen=True)
+class Movement:
+    """A signed quantity change for one product at one warehouse (positive = stock in)."""
+
+    product_id: int
+    qty_change: Decimal
+    rate: Decimal = Decimal('0.00')
+    warehouse_id: int | None = None
+    lot_id: int | None = None
+
+    @property
+    def key(self) -> Key:
+        return (self.product_id, self.warehouse_id)
+
+
+def sorted_keys(keys) -> list[Key]:
+    """Keys in lock order: product id, then warehouse id (unassigned first)."""
+    return sorted(set(keys), key=lambda key: (key[0], key[1] or 0))
+
+
+def pair_filter(keys) -> Q:
+    """A Q matching rows with (product, warehouse) in `keys`, one term per warehouse."""
+    by_warehouse = defaultdict(list)
+    for pid, wid in keys:
+        by_warehouse[wid].append(pid)
+    condition = Q(pk__in=[])
+    for wid, pids in by_warehouse.items():
+        if wid is None:
+            condition |= Q(product_id__in=pids, warehouse__isnull=True)
+        else:
+            condition |= Q(product_id__in=pids, warehouse_id=wid)
+    return condition
+
+
+def _by_key(rows) -> dict:
+    return {(row.product_id, row.warehouse_id): row for row in rows}
+
+
+def _lock_inventory(keys: list[Key], user) -> dict[Key, Inventory]:
+    """Lock (and create when missing) the Inventory rows for `keys`."""
+    locked = Inventory.objects.select_for_update().order_by('product_id', 'warehouse_id')
+    rows = _by_key(locked.filter(pair_filter(keys)))
+    missing = [key for key in keys if key not in rows]
+    if missing:
+        Inventory.objects.bulk_create(
+            [
+                Inventory(product_id=pid, warehouse_id=wid, on_hand=QTY_PLACES, created_by=user, updated_by=user)
+                for pid, wid in missing
+            ],
+            ignore_conflicts=True,
+        )
+        rows.update(_by_key(locked.filter(pair_filter(missing))))
+    return rows
+
+
+def _latest_balances(keys: list[Key]) -> dict[Key, Decimal]:
+    """Return the last running ledger balance for each key, one query per warehouse.
+
+    Keys with no row in the hot ledger fall back to the archive of closed months.
+    """
+    balances = {key: Decimal('0') for key in keys}
+    pending = list(keys)
+    for model in (StockLedger, StockLedgerArchive):
+        by_warehouse = defaultdict(list)
+        for pid, wid in pending:
+            by_warehouse[wid].append(pid)
+        pending = []
+        for wid, pids in by_warehouse.items():
+            latest = model.objects.filter(product=OuterRef('pk'))
+            latest = latest.filter(warehouse__isnull=True) if wid is None else latest.filter(warehouse_id=wid)
+            latest = latest.order_by('-movement_date', '-id').values('balance_qty')[:1]
+            rows = Product.objects.filter(id__in=pids).annotate(last_balance=Subquery(latest))
+            for pid, last_balance in rows.values_list('id', 'last_balance'):
+                if last_balance is None:
+                    pending.append((pid, wid))
+                else:
+                    balances[(pid, wid)] = last_balance
+        if not pending:
+            break
+    return balances
+
+
+def _lock_balance_heads(keys: list[Key]) -> dict[Key, StockBalance]:
+    """Lock the StockBalance heads for `keys`, creating missing ones.
+
+    On backends without row locks (SQLite) a no-op UPDATE takes the database
+    write lock instead, which serializes concurrent postings the same way.
+    """
+    heads = StockBalance.objects.filter(pair_filter(keys)).order_by('product_id', 'warehouse_id')
+    if connection.features.has_select_for_update:
+        heads = heads.select_for_update()
+    else:
+        heads.update(balance_qty=F('balance_qty'))
+    rows = _by_key(heads)
+    missing = [key for key in keys if key not in rows]
+    if missing:
+        # New heads start from the last ledger balance so pre-existing history is kept.
+        seed = _latest_balances(missing)
+        StockBalance.objects.bulk_create(
+            [StockBalance(product_id=pid, warehouse_id=wid, balance_qty=seed[(pid, wid)]) for pid, wid in missing],
+            ignore_conflicts=True,
+        )
+        locked = StockBalance.objects.filter(pair_filter(missing))
+        if connection.features.has_select_for_update:
+            locked = locked.select_for_update()
+        rows.update(_by_key(locked))
+    return rows
+
+
+def _apply_costs(movements: list[Movement]) -> None:
+    """Advance the moving-average cost of the products `movements` receive at a price.
+
+    Only a priced receipt (rate > 0) moves the average: issues leave at it and
+    zero-rate receipts come in at it. So only postings with a priced receipt
+    lock the product's ProductCost row. The average is weighed against the
+    product's quantity over all its balance heads, read before this posting
+    advances them. A product without a cost row yet starts from a replay of
+    its ledger, or from its cost_price when nothing was received at a price.
+    Product.cost_price is written only when the average changes by a cent.
+    """
+    pids = sorted({m.product_id for m in movements if m.qty_change > 0 and m.rate})
+    if not pids:
+        return
+    locked = ProductCost.objects.filter(product_id__in=pids).order_by('product_id')
+    if connection.features.has_select_for_update:
+        locked = locked.select_for_update()
+    costs = {cost.product_id: cost for cost in locked}
+    missing = [pid for pid in pids if pid not in costs]
+    if missing:
+        replayed = {pid: avg for pid, (_, _, avg) in average_costs(missing).items()}
+        prices = dict(Product.objects.filter(id__in=missing).values_list('id', 'cost_price'))
+        ProductCost.objects.bulk_create(
+            [ProductCost(product_id=pid, avg_cost=(replayed.get(pid) or prices[pid]).quantize(COST_PLACES)) for pid in missing],
+            ignore_conflicts=True,
+        )
+        costs.update({cost.product_id: cost for cost in locked.filter(product_id__in=missing)})
+
+    balances = StockBalance.objects.filter(product_id__in=pids).order_by().values('product').annotate(qty=Sum('balance_qty'))
+    qty = {row['product']: row['qty'] for row in balances}
+    previous = {pid: cost.avg_cost for pid, cost in costs.items()}
+    for m in movements:
+        cost = costs.get(m.product_id)
+        if cost is None:
+            continue
+        on_hand = qty.get(m.product_id, ZERO)
+        if m.qty_change > 0 and m.rate:
+            _, _, avg = average_step(on_hand, on_hand * cost.avg_cost, cost.avg_cost, m.qty_change, m.rate)
+            cost.avg_cost = avg.quantize(COST_PLACES)
+        qty[m.product_id] = on_hand + m.qty_change
+    changed = [cost for pid, cost in costs.items() if cost.avg_cost != previous[pid]]
+    if not changed:
+        return
+    now = timezone.now()
+    for cost in changed:
+        cost.updated_at = now
+    ProductCost.objects.bulk_update(changed, ['avg_cost', 'updated_at'])
+    repriced = [
+        Product(id=cost.product_id, cost_price=cost.avg_cost.quantize(MONEY_PLACES))
+        for cost in changed if cost.avg_cost.quantize(MONEY_PLACES) != previous[cost.product_id].quantize(MONEY_PLACES)
+    ]
+    if repriced:
+        Product.objects.bulk_update(repriced, ['cost_price'])
+
+
+def _write_ledger(movements: list[Movement], heads: dict[Key, StockBalance], *, entry, user) -> list[StockLedger]:
+    """Advance the locked `heads` by `movements` and bulk-insert the ledger rows.
+
+    Movements are written in the order given, so running balances follow
+    the line order of the source document. TRANSFER legs leave the product's
+    cost alone: the stock changes site, not value.
+    """
+    if entry is None or entry.entry_type != StockEntry.EntryType.TRANSFER:
+        _apply_costs(movements)
+    ledger_rows = []
+    for m in movements:
+        head = heads[m.key]
+        head.balance_qty = (head.balance_qty + m.qty_change).quantize(QTY_PLACES)
+        ledger_rows.append(StockLedger(
+            product_id=m.product_id,
+            warehouse_id=m.warehouse_id,
+            stock_entry=entry,
+            lot_id=m.lot_id,
+            qty_change=m.qty_change,
+            balance_qty=head.balance_qty,
+            rate=m.rate or Decimal('0.00'),
+            created_by=user,
+            updated_by=user,
+        ))
+
+    now = timezone.now()
+    for head in heads.values():
+        head.updated_at = now
+    StockBalance.objects.bulk_update(list(heads.values()), ['balance_qty', 'updated_at'])
+    return StockLedger.objects.bulk_create(ledger_rows)
+
+
+def fefo_eligible(today: date | None = None) -> Q:
+    """Lots FEFO may draw from: not expired on `today`, or without an expiry date."""
+    today = today or timezone.localdate()
+    return Q(expiry_date__gte=today) | Q(expiry_date__isnull=True)
+
+
+def allocate_fefo(demand: dict[Key, Decimal], lots) -> dict[Key, list[tuple[StockLot, Decimal]]]:
+    """Split the wanted quantity per key over `lots` (in FEFO_ORDER), earliest expiry first.
+
+    Only stock held in lots is allocated; whatever the lots do not cover is
+    left out of the result.
+    """
+    remaining = dict(demand)
+    picks: dict[Key, list[tuple[StockLot, Decimal]]] = defaultdict(list)
+    for lot in lots:
+        key = (lot.product_id, lot.warehouse_id)
+        wanted = remaining.get(key, ZERO)
+        if wanted <= 0 or lot.qty <= 0:
+            continue
+        take = min(wanted, lot.qty)
+        picks[key].append((lot, take))
+        remaining[key] = wanted - take
+    return picks
+
+
+def fefo_picks(demand: dict[Key, Decimal]) -> dict[Key, list[tuple[StockLot, Decimal]]]:
+    """FEFO allocation of `demand` from current lot balances with one ordered index read (no locks)."""
+    demand = {key: qty for key, qty in demand.items() if qty > 0}
+    if not demand:
+        return {}
+    lots = StockLot.objects.filter(pair_filter(demand), fefo_eligible(), qty__gt=0).order_by(*FEFO_ORDER)
+    return allocate_fefo(demand, lots.iterator())
+
+
+def _apply_lots(movements: list[Movement], *, carry: bool = False) -> list[Movement]:
+    """Lock the lots `movements` touch, FEFO-split lot-less OUT movements and update lot balances.
+
+    One locking read covers the named lots and the open, unexpired lots of
+    every key with a lot-less OUT movement; the new balances are written with
+    one bulk_update. Expired stock is only drawn when a line names its lot.
+    With `carry` the movements are TRANSFER legs in (source, destination)
+    pairs, and a lot-less destination leg is split like its source leg (see
+    `_carry_picks`).
+    """
+    named = {m.lot_id for m in movements if m.lot_id}
+    fefo_keys = {m.key for m in movements if m.lot_id is None and m.qty_change < 0}
+    if not named and not fefo_keys:
+        return movements
+    today = timezone.localdate()
+    condition = Q(id__in=named)
+    if fefo_keys:
+        condition |= pair_filter(fefo_keys) & Q(qty__gt=0) & fefo_eligible(today)
+    lots = StockLot.objects.filter(condition).order_by(*FEFO_ORDER)
+    if connection.features.has_select_for_update:
+        lots = lots.select_for_update()
+    lots = list(lots)
+    by_id = {lot.id: lot for lot in lots}
+    by_key: dict[Key, list[StockLot]] = defaultdict(list)
+    for lot in lots:
+        if lot.expiry_date is None or lot.expiry_date >= today:  # a named lot may be expired
+            by_key[(lot.product_id, lot.warehouse_id)].append(lot)
+
+    # Movements are applied in order, so an OUT sees the lot balances left by the lines before it
+    pieces: list[list[Movement]] = []
+    for m in movements:
+        if m.lot_id is not None:
+            by_id[m.lot_id].qty += m.qty_change
+            pieces.append([m])
+            continue
+        if m.qty_change >= 0:
+            pieces.append([m])
+            continue
+        left = -m.qty_change
+        picked = []
+        for lot, take in allocate_fefo({m.key: left}, by_key[m.key]).get(m.key, []):
+            lot.qty -= take
+            left -= take
+            picked.append(Movement(m.product_id, -take, m.rate, m.warehouse_id, lot.id))
+        if left:
+            picked.append(Movement(m.product_id, -left, m.rate, m.warehouse_id))
+        pieces.append(picked)
+    if carry:
+        lots += _carry_picks(movements, pieces, by_id)
+
+    now = timezone.now()
+    for lot in lots:
+        lot.updated_at = now
+    StockLot.objects.bulk_update(lots, ['qty', 'updated_at'])
+    return [piece for group in pieces for piece in group]
+
+
+def _carry_picks(legs: list[Movement], pieces: list[list[Movement]], by_id: dict[int, StockLot]) -> list[StockLot]:
+    """Split lot-less destination legs over the lots their source legs were FEFO-picked from.
+
+    Each pick arrives in the destination lot of the same number, created with
+    the source lot's expiry if it does not exist yet; unlotted stock stays
+    unlotted. `pieces` (the split of each leg) and `by_id` are updated in place;
+    the destination lots this locked are returned for the caller's bulk_update.
+    """
+    carried, wanted = [], {}
+    for i in range(0, len(legs) - 1, 2):
+        source, destination = legs[i], legs[i + 1]
+        if source.lot_id is None and destination.lot_id is None and any(p.lot_id for p in pieces[i]):
+            carried.append(i + 1)
+            for pick in pieces[i]:
+                if pick.lot_id:
+                    lot = by_id[pick.lot_id]
+                    wanted.setdefault((destination.product_id, destination.warehouse_id, lot.lot_number), lot.expiry_date)
+    if not wanted:
+        return []
+    ids = resolve_lots((pid, wid, number, expiry) for (pid, wid, number), expiry in wanted.items())
+    # The destination heads are already locked, so this second locking read cannot deadlock
+    fresh = StockLot.objects.filter(id__in=set(ids.values()) - by_id.keys()).order_by('id')
+    if connection.features.has_select_for_update:
+        fresh = fresh.select_for_update()
+    fresh = list(fresh)
+    by_id.update((lot.id, lot) for lot in fresh)
+
+    for i in carried:
+        destination = legs[i]
+        pieces[i] = []
+        for pick in pieces[i - 1]:
+            lot_id = None
+            if pick.lot_id:
+                lot_id = ids[(destination.product_id, destination.warehouse_id, by_id[pick.lot_id].lot_number)]
+                by_id[lot_id].qty -= pick.qty_change
+            pieces[i].append(Movement(destination.product_id, -pick.qty_change, destination.rate,
+                                      destination.warehouse_id, lot_id))
+    return fresh
+
+
+@transaction.atomic
+def append_ledger_rows(movements: list[Movement], *, entry: StockEntry | None = None, user=None) -> list[StockLedger]:
+    """Append StockLedger rows for `movements` without touching Inventory."""
+    if not movements:
+        return []
+    heads = _lock_balance_heads(sorted_keys(m.key for m in movements))
+    return _write_ledger(movements, heads, entry=entry, user=user)
+
+
+@transaction.atomic
+def post_movements(movements: Iterable[Movement], *, entry: StockEntry | None = None, user=None,
+                   in_transit: dict[Key, Decimal] | None = None, carry_lots: bool = False) -> list[StockLedger]:
+    """Apply `movements` to Inventory and append the matching StockLedger rows.
+
+    `in_transit` adds to Inventory.in_transit_qty of keys the movements touch,
+    in the same write as on_hand (used for the receiving leg of a transfer).
+    `carry_lots` marks `movements` as TRANSFER legs in (source, destination)
+    pairs, so stock FEFO-picked from lots at the source arrives in lots too.
+    """
+    movements = [m for m in movements if m.qty_change]
+    if not movements:
+        return []
+    in_transit = in_transit or {}
+
+    # Every posting path locks heads before Inventory rows, both in
+    # (product, warehouse) order, so concurrent postings cannot deadlock each other.
+    keys = sorted_keys(m.key for m in movements)
+    heads = _lock_balance_heads(keys)
+    inventory = _lock_inventory(keys, user)
+    previous_on_hand = {inv.pk: inv.on_hand for inv in inventory.values()}
+    for m in movements:
+        inv = inventory[m.key]
+        inv.on_hand = (inv.on_hand or Decimal('0')) + m.qty_change
+    fields = ['on_hand', 'updated_at', 'updated_by']
+    for key, qty in in_transit.items():
+        if qty:
+            inv = inventory[key]
+            inv.in_transit_qty = (inv.in_transit_qty or Decimal('0')) + qty
+            fields = ['on_hand', 'in_transit_qty', 'updated_at', 'updated_by']
+
+    now = timezone.now()
+    for inv in inventory.values():
+        inv.updated_at = now
+        inv.updated_by = user
+    Inventory.objects.bulk_update(list(inventory.values()), fields)
+    sync_low_stock_alerts(inventory.values(), previous_on_hand)
+    # Lots are locked after heads and Inventory rows, keeping the lock order of every posting path
+    movements = _apply_lots(movements, carry=carry_lots)
+    return _write_ledger(movements, heads, entry=entry, user=user)
+
+
+@transaction.atomic
+def adjust_reserved(changes: dict[Key, Decimal], *, user=None) -> None:
+    """Add `changes` ((product, warehouse) -> signed qty) to reserved_qty of those Inventory rows.
+
+    The Inventory rows are locked (and created when missing) in one query and
+    written back with one bulk_update, however many orders the change covers.
+    """
+    changes = {key: qty for key, qty in changes.items() if qty}
+    if not changes:
+        return
+    inventory = _lock_inventory(sorted_keys(changes), user)
+    now = timezone.now()
+    for key, inv in inventory.items():
+        inv.reserved_qty = (inv.reserved_qty or Decimal('0')) + changes[key]
+        inv.updated_at = now
+        inv.updated_by = user
+    Inventory.objects.bulk_update(list(inventory.values()), ['reserved_qty', 'updated_at', 'updated_by'])
+
+
+def _find_lots(wanted) -> dict[LotKey, int]:
+    """Map the existing lots among `wanted` (LotKeys) to their StockLot ids with one query."""
+    lots = StockLot.objects.filter(
+        pair_filter({(pid, wid) for pid, wid, _ in wanted}), lot_number__in={number for _, _, number in wanted}
+    )
+    found = {(pid, wid, number): lot_id for lot_id, pid, wid, number
+             in lots.values_list('id', 'product_id', 'warehouse_id', 'lot_number')}
+    return {key: lot_id for key, lot_id in found.items() if key in wanted}
+
+
+def missing_lots(keys) -> set[LotKey]:
+    """The LotKeys in `keys` that name a lot which does not exist (keys without a lot number are ignored)."""
+    wanted = {key for key in keys if key[2]}
+    return wanted - _find_lots(wanted).keys() if wanted else set()
+
+
+def resolve_lots(rows, *, create: bool = True) -> dict[LotKey, int]:
+    """Map (product, warehouse, lot number) to StockLot ids, creating missing lots in one bulk_create.
+
+    `rows` yields (product_id, warehouse_id, lot_number, expiry_date); rows
+    without a lot number are skipped and an existing lot keeps its expiry.
+    With `create=False` (lots an outgoing line draws from) a missing lot
+    raises ValueError instead of being created.
+    """
+    wanted: dict[LotKey, object] = {}
+    for pid, wid, number, expiry in rows:
+        if number:
+            wanted.setdefault((pid, wid, number), expiry)
+    if not wanted:
+        return {}
+
+    found = _find_lots(wanted)
+    missing = wanted.keys() - found.keys()
+    if missing and not create:
+        raise ValueError(f"Unknown lot {', '.join(sorted(number for _, _, number in missing))}.")
+    if missing:
+        StockLot.objects.bulk_create(
+            [StockLot(product_id=pid, warehouse_id=wid, lot_number=number, expiry_date=wanted[(pid, wid, number)])
+             for pid, wid, number in missing],
+            ignore_conflicts=True,
+        )
+        found = _find_lots(wanted)
+    return found
+
+
+def is_outgoing(entry_type: str, quantity: Decimal) -> bool:
+    """Whether a line of an `entry_type` entry takes stock out of its (source) location."""
+    return entry_type in (StockEntry.EntryType.OUT, StockEntry.EntryType.TRANSFER) or (
+        entry_type == StockEntry.EntryType.ADJUST and quantity < 0
+    )
+
+
+def entry_movements(entry: StockEntry) -> list[Movement]:
+    """Translate the lines of `entry` into signed movements (OUT is negative).
+
+    A TRANSFER line becomes two movements, out of `warehouse` and into
+    `to_warehouse`; a named lot moves into the lot of the same number at the
+    destination, which inherits the source lot's expiry unless the line gives one.
+    Incoming lines create the lots they name; outgoing lines must name an
+    existing lot (ValueError otherwise).
+    """
+    lines = list(entry.lines.order_by('id').values_list(
+        'product_id', 'quantity', 'rate', 'warehouse_id', 'lot_number', 'expiry_date', 'to_warehouse_id'
+    ))
+    outgoing = [is_outgoing(entry.entry_type, qty) for _, qty, *_ in lines]
+    lots = resolve_lots((pid, wid, number, expiry) for (pid, _, _, wid, number, expiry, _), out in zip(lines, outgoing)
+                        if not out)
+    lots.update(resolve_lots(((pid, wid, number, expiry) for (pid, _, _, wid, number, expiry, _), out
+                              in zip(lines, outgoing) if out), create=False))
+    if entry.entry_type != StockEntry.EntryType.TRANSFER:
+        sign = Decimal('-1') if entry.entry_type == StockEntry.EntryType.OUT else Decimal('1')
+        return [
+            Movement(pid, qty * sign, rate, wid, lots.get((pid, wid, number)))
+            for pid, qty, rate, wid, number, _, _ in lines
+        ]
+
+    expiries = dict(StockLot.objects.filter(id__in=lots.values()).values_list('id', 'expiry_date')) if lots else {}
+    destination_lots = resolve_lots(
+        (pid, to_wid, number, expiry or expiries.get(lots.get((pid, wid, number))))
+        for pid, _, _, wid, number, expiry, to_wid in lines
+    )
+    movements = []
+    for pid, qty, rate, wid, number, _, to_wid in lines:
+        movements.append(Movement(pid, -qty, rate, wid, lots.get((pid, wid, number))))
+        movements.append(Movement(pid, qty, rate, to_wid, destination_lots.get((pid, to_wid, number))))
+    return movements
+
+
+def post_stock_entry(entry: StockEntry) -> list[StockLedger]:
+    """Post every line of `entry` to Inventory and the StockLedger.
+
+    Both legs of a TRANSFER go through one `post_movements` call, so they
+    commit together; until the transfer is received its quantity is also
+    carried as in-transit stock at the destination. A line that names no lot
+    takes the lots FEFO picks at the source along to the destination.
+    """
+    movements = entry_movements(entry)
+    in_transit: dict[Key, Decimal] = {}
+    if entry.entry_type == StockEntry.EntryType.TRANSFER and entry.received_at is None:
+        for m in movements[1::2]:  # the receiving legs
+            in_transit[m.key] = in_transit.get(m.key, ZERO) + m.qty_change
+    return post_movements(movements, entry=entry, user=entry.updated_by or entry.created_by, in_transit=in_transit,
+                          carry_lots=entry.entry_type == StockEntry.EntryType.TRANSFER)
+
+
+@transaction.atomic
+def receive_transfer(entry: StockEntry, *, user=None) -> bool:
+    """Mark a posted TRANSFER as received and release its in-transit quantity.
+
+    The received_at stamp is set with a conditional UPDATE, so a transfer is
+    received at most once however many requests race on it. Returns False if
+    it was already received.
+    """
+    now = timezone.now()
+    claimed = StockEntry.objects.filter(
+        pk=entry.pk, entry_type=StockEntry.EntryType.TRANSFER, received_at__isnull=True
+    ).update(received_at=now, updated_at=now, updated_by=user)
+    if not claimed:
+        return False
+    entry.received_at = now
+    arriving: dict[Key, Decimal] = {}
+    for pid, to_wid, qty in entry.lines.values_list('product_id', 'to_warehouse_id', 'quantity'):
+        arriving[(pid, to_wid)] = arriving.get((pid, to_wid), ZERO) + qty
+    inventory = _lock_inventory(sorted_keys(arriving), user)
+    for key, inv in inventory.items():
+        inv.in_transit_qty = (inv.in_transit_qty or ZERO) - arriving[key]
+        inv.updated_at = now
+        inv.updated_by = user
+    Inventory.objects.bulk_update(list(inventory.values()), ['in_transit_qty', 'updated_at', 'updated_by'])
+    return True
+
+
+def repost_stock_entry(entry: StockEntry, posted_lots: Iterable[LotKey] | None = None) -> list[StockLedger]:
+    """Bring the posted effect of an edited `entry` in line with its current lines.
+
+    The net quantity already posted per (product, warehouse, lot) (from the entry's own ledger
+    rows) is compared with what the lines now say, and only the difference is
+    written as compensating movements. Editing one line of a large entry
+    therefore costs one ledger row, and re-posting an unchanged entry is a no-op.
+    `posted_lots` are the LotKeys named on the lines the entry was last posted
+    with (default: its current lines); posted rows of those lots, or of lots the
+    lines name now, are compared lot by lot. Lots the posting picked by FEFO
+    count towards the lot-less figure of their (product, warehouse); when an edit takes less out
+    of that location, the difference goes back to the unlotted stock it drew
+    first, then to the picked lots (latest pick first).
+    """
+    wanted: dict[tuple, Decimal] = {}
+    rates: dict[tuple, Decimal] = {}
+    for m in entry_movements(entry):
+        key = (m.product_id, m.warehouse_id, m.lot_id)
+        wanted[key] = wanted.get(key, ZERO) + m.qty_change
+        rates[key] = m.rate
+    named = {lot_id for _, _, lot_id in wanted if lot_id}
+    if posted_lots is not None:
+        named.update(_find_lots({key for key in posted_lots if key[2]}).values())
+    posted: dict[tuple, Decimal] = {}
+    # Net quantity drawn per (product, warehouse): (lot id or None, qty, last ledger row id)
+    drawn: dict[Key, list[tuple]] = defaultdict(list)
+    for rows in (entry.ledger_rows.all(), StockLedgerArchive.objects.filter(stock_entry=entry)):
+        rows = rows.order_by().values('product', 'warehouse', 'lot').annotate(total=Sum('qty_change'), last=Max('id'))
+        for row in rows:
+            key = (row['product'], row['warehouse'], row['lot'] if row['lot'] in named else None)
+            posted[key] = posted.get(key, ZERO) + row['total']
+            if key[2] is None and row['total'] < 0:
+                drawn[key[:2]].append((row['lot'], row['total'], row['last']))
+    deltas = []
+    for pid, wid, lot_id in sorted(wanted.keys() | posted.keys(), key=lambda k: (k[0], k[1] or 0, k[2] or 0)):
+        key = (pid, wid, lot_id)
+        delta = wanted.get(key, ZERO) - posted.get(key, ZERO)
+        rate = rates.get(key, Decimal('0.00'))
+        if lot_id is None and delta > 0:
+            picks = sorted(drawn[(pid, wid)], key=lambda pick: (pick[0] is not None, -pick[2]))
+            for pick_lot, total, _ in picks:
+                back = min(delta, -total)
+                if back > 0:
+                    deltas.append(Movement(pid, back, rate, wid, pick_lot))
+                    delta -= back
+            if not delta:
+                continue
+        deltas.append(Movement(pid, delta, rate, wid, lot_id))
+    return post_movements(deltas, entry=entry, user=entry.updated_by or entry.created_by)
@@ -0,0 +1,78 @@
+"""Set-based selling price changes and effective-dated price lists."""
+from __future__ import annotations
+
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Iterable
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PriceList, PriceListItem, Product
+
+PRICE_PLACES = Decimal('0.01')
+PRICE_MAX = Decimal('999999999999.99')  # max_digits=14, decimal_places=2
+
+
+def clean_price(value) -> Decimal | None:
+    """`value` rounded to cents, or None unless it is a price the selling_price column can hold."""
+    try:
+        price = Decimal(str(value)).quantize(PRICE_PLACES)
+    except (InvalidOperation, TypeError, ValueError):
+        return None
+    return price if Decimal('0') <= price <= PRICE_MAX else None
+
+
+def apply_prices(products: Iterable[Product], prices: dict[int, Decimal], *, user=None) -> list[int]:
+    """Set selling_price on already-loaded `products` with one bulk_update."""
+    now = timezone.now()
+    changed = []
+    for product in products:
+        product.selling_price = prices[product.id]
+        product.updated_at = now
+        product.updated_by = user
+        changed.append(product)
+    Product.objects.bulk_update(changed, ['selling_price', 'updated_at', 'updated_by'], batch_size=1000)
+    return [product.id for product in changed]
+
+
+@transaction.atomic
+def stage_price_list(prices: dict[int, Decimal], *, effective_from: date, name: str = '', user=None) -> PriceList:
+    """Store `prices` as a SCHEDULED price list that activates on `effective_from`."""
+    price_list = PriceList.objects.create(name=name, effective_from=effective_from, created_by=user, updated_by=user)
+    PriceListItem.objects.bulk_create(
+        [PriceListItem(price_list=price_list, product_id=pid, selling_price=price) for pid, price in prices.items()],
+        batch_size=1000,
+    )
+    return price_list
+
+
+@transaction.atomic
+def activate_due_price_lists(today: date | None = None, *, user=None) -> tuple[list[int], int]:
+    """Apply every SCHEDULED list with effective_from <= today in one batch.
+
+    When several due lists price the same product, the one with the latest
+    effective_from wins. Returns (activated list ids, number of products repriced).
+    """
+    today = today or timezone.localdate()
+    due = list(
+        PriceList.objects.select_for_update()
+        .filter(status=PriceList.Status.SCHEDULED, effective_from__lte=today)
+        .order_by('effective_from', 'id')
+        .values_list('id', flat=True)
+    )
+    if not due:
+        return [], 0
+    prices: dict[int, Decimal] = {}
+    items = (
+        PriceListItem.objects.filter(price_list_id__in=due)
+        .order_by('price_list__effective_from', 'price_list_id')
+        .values_list('product_id', 'selling_price')
+    )
+    for pid, price in items.iterator(chunk_size=5000):
+        prices[pid] = price
+    repriced = apply_prices(Product.objects.filter(id__in=list(prices)), prices, user=user)
+    PriceList.objects.filter(id__in=due).update(
+        status=PriceList.Status.ACTIVE, activated_at=timezone.now(), updated_at=timezone.now(), updated_by=user
+    )
+    return due, len(repriced)
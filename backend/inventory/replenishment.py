@@ -0,0 +1,259 @@
+"""Vectorized replenishment planning from StockLedger OUT movements.
+
+The planner reads consumption with one aggregate query (outgoing quantity per
+product, warehouse and week over the history window) and lays it out as a
+dense NumPy matrix of products x weeks. Consumption is what OUT entries
+(issues and sales) took out of stock, net of what later edits of those
+entries gave back; transfer legs and negative adjustments move or correct
+stock and are not demand. Every figure is then computed for
+all products at once:
+
+- velocity: mean daily consumption over the last `window_weeks`,
+- forecast: simple exponential smoothing of weekly demand, per day,
+- safety stock: z * weekly std dev * sqrt(lead time in weeks),
+- reorder point: forecast over the lead time plus safety stock,
+- reorder qty: what brings the stock position (on hand - reserved) up to the
+  reorder point plus `cover_days` of forecast demand.
+
+Results are upserted into ReplenishmentSuggestion in batches and can also be
+copied to Inventory.reorder_level, splitting each product's reorder point
+over its warehouses by their share of the consumption.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import DateField, Min, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .alerts import sync_low_stock_alerts
+from .models import Inventory, ReplenishmentSuggestion, StockEntry, StockLedger, StockLedgerArchive
+from .posting import Key, pair_filter
+
+BATCH_SIZE = 1000
+SUGGESTION_FIELDS = ['velocity', 'forecast', 'safety_stock', 'reorder_point', 'reorder_qty', 'computed_at']
+# Entry types whose outgoing rows are consumption
+CONSUMPTION_TYPES = (StockEntry.EntryType.OUT,)
+
+
+@dataclass(frozen=True)
+class PlanParams:
+    history_weeks: int = 104
+    window_weeks: int = 12
+    alpha: float = 0.3
+    lead_time_days: int = 14
+    cover_days: int = 30
+    service_z: float = 1.65
+
+
+@dataclass
+class Plan:
+    product_ids: np.ndarray
+    velocity: np.ndarray
+    forecast: np.ndarray
+    safety_stock: np.ndarray
+    reorder_point: np.ndarray
+    reorder_qty: np.ndarray
+
+
+def consumption(model, since: datetime):
+    """Outgoing rows of `model` (StockLedger or its archive) posted by consuming entries since `since`."""
+    return model.objects.filter(
+        qty_change__lt=0, movement_date__gte=since, stock_entry__entry_type__in=CONSUMPTION_TYPES
+    )
+
+
+def compensations(since: datetime, **values) -> list[tuple]:
+    """What reposts gave back to consuming entries since `since`, dated by the issue they reduced.
+
+    Reducing a posted OUT writes positive rows for the same entry, possibly
+    weeks after the issue. They are returned as (product id, warehouse id,
+    week of the entry's first issue row, qty, *values), each aggregate in
+    `values` summed over them, so callers can net them against the week
+    `consumption` reported. Reductions of issues before `since` are dropped.
+    These rows are rare, so both lookups stay small.
+    """
+    returned: dict[tuple, list] = {}
+    for model in (StockLedgerArchive, StockLedger):
+        rows = (
+            model.objects.filter(qty_change__gt=0, movement_date__gte=since, stock_entry__entry_type__in=CONSUMPTION_TYPES)
+            .order_by()
+            .values('stock_entry_id', 'product_id', 'warehouse_id')
+            .annotate(qty=Sum('qty_change'), **values)
+            .values_list('stock_entry_id', 'product_id', 'warehouse_id', 'qty', *values)
+        )
+        for entry_id, pid, wid, *amounts in rows:
+            totals = returned.setdefault((entry_id, pid, wid), [0] * len(amounts))
+            totals[:] = [total + (amount or 0) for total, amount in zip(totals, amounts)]
+    if not returned:
+        return []
+
+    issued = {}
+    for model in (StockLedgerArchive, StockLedger):
+        rows = (
+            consumption(model, since).filter(stock_entry_id__in={entry_id for entry_id, _, _ in returned})
+            .order_by()
+            .values('stock_entry_id', 'product_id', 'warehouse_id')
+            .annotate(first=Min('movement_date'))
+            .values_list('stock_entry_id', 'product_id', 'warehouse_id', 'first')
+        )
+        for entry_id, pid, wid, first in rows:
+            key = (entry_id, pid, wid)
+            issued[key] = min(issued.get(key, first), first)
+    result = []
+    for key, amounts in returned.items():
+        if key in issued:
+            day = timezone.localdate(issued[key])
+            result.append((key[1], key[2], day - timedelta(days=day.weekday()), *amounts))
+    return result
+
+
+def weekly_demand(history_weeks: int, today: date | None = None) -> tuple[np.ndarray, np.ndarray, dict[Key, float]]:
+    """Return (product ids, demand matrix, consumption per (product, warehouse)).
+
+    The matrix has one column per week, oldest first.
+    """
+    today = today or timezone.localdate()
+    this_week = today - timedelta(days=today.weekday())
+    first_week = this_week - timedelta(weeks=history_weeks - 1)
+    since = timezone.make_aware(datetime.combine(first_week, time.min))
+    pids, weeks, qtys = [], [], []
+    by_site: dict[Key, float] = {}
+    first_ordinal = first_week.toordinal()
+    # Long windows reach into archived months; week buckets split across both tables add up below
+    for model in (StockLedgerArchive, StockLedger):
+        rows = (
+            consumption(model, since)
+            .annotate(week=TruncWeek('movement_date', output_field=DateField()))
+            .order_by()
+            .values('product_id', 'warehouse_id', 'week')
+            .annotate(qty=Sum('qty_change'))
+            .values_list('product_id', 'warehouse_id', 'week', 'qty')
+        )
+        for pid, wid, week, qty in rows.iterator(chunk_size=10000):
+            pids.append(pid)
+            weeks.append((week.toordinal() - first_ordinal) // 7)
+            qtys.append(-float(qty))
+            by_site[(pid, wid)] = by_site.get((pid, wid), 0.0) - float(qty)
+    for pid, wid, week, qty in compensations(since):
+        pids.append(pid)
+        weeks.append((week.toordinal() - first_ordinal) // 7)
+        qtys.append(-float(qty))
+        by_site[(pid, wid)] = by_site.get((pid, wid), 0.0) - float(qty)
+    if not pids:
+        return np.empty(0, dtype=np.int64), np.zeros((0, history_weeks)), {}
+
+    product_ids, rows_idx = np.unique(np.asarray(pids, dtype=np.int64), return_inverse=True)
+    demand = np.zeros((len(product_ids), history_weeks))
+    np.add.at(demand, (rows_idx, np.clip(np.asarray(weeks), 0, history_weeks - 1)), np.asarray(qtys))
+    # An entry issued partly before the window can give back more than the window saw of it
+    np.maximum(demand, 0.0, out=demand)
+    return product_ids, demand, {key: qty for key, qty in by_site.items() if qty > 0}
+
+
+def stock_positions(product_ids: np.ndarray) -> np.ndarray:
+    """On hand minus reserved per product (all locations), aligned with `product_ids`."""
+    totals = Inventory.objects.order_by().values('product').annotate(on_hand=Sum('on_hand'), reserved=Sum('reserved_qty'))
+    position = {row['product']: float(row['on_hand'] - row['reserved']) for row in totals}
+    return np.fromiter((position.get(int(pid), 0.0) for pid in product_ids), dtype=float, count=len(product_ids))
+
+
+def compute_plan(product_ids: np.ndarray, demand: np.ndarray, position: np.ndarray, params: PlanParams) -> Plan:
+    """Vectorized planning over a products x weeks demand matrix."""
+    window = demand[:, -params.window_weeks:]
+    velocity = window.sum(axis=1) / (window.shape[1] * 7)
+
+    level = demand[:, 0].copy()
+    for week in range(1, demand.shape[1]):
+        level = params.alpha * demand[:, week] + (1 - params.alpha) * level
+    forecast = level / 7
+
+    safety_stock = params.service_z * window.std(axis=1) * np.sqrt(params.lead_time_days / 7)
+    reorder_point = forecast * params.lead_time_days + safety_stock
+    reorder_qty = np.maximum(0.0, reorder_point + forecast * params.cover_days - position)
+    return Plan(product_ids, velocity, forecast, safety_stock, reorder_point, reorder_qty)
+
+
+def _qty(value: float) -> Decimal:
+    return Decimal(f'{value:.3f}')
+
+
+def site_levels(product_ids: list[int], reorder_points: list[float], by_site: dict[Key, float]) -> dict[Key, Decimal]:
+    """Split each product's reorder point over its warehouses in proportion to their consumption."""
+    totals: dict[int, float] = {}
+    for (pid, _), qty in by_site.items():
+        totals[pid] = totals.get(pid, 0.0) + qty
+    points = dict(zip(product_ids, reorder_points))
+    return {
+        (pid, wid): _qty(points[pid] * qty / totals[pid])
+        for (pid, wid), qty in by_site.items() if pid in points and totals[pid] > 0
+    }
+
+
+def save_plan(plan: Plan, *, apply_reorder_levels: bool = False, by_site: dict[Key, float] | None = None,
+              user=None) -> int:
+    """Upsert suggestions in batches; optionally copy reorder points to Inventory.
+
+    Reorder levels go to the warehouses in `by_site` (consumption per
+    (product, warehouse)); other Inventory rows keep their level.
+    """
+    now = timezone.now()
+    for start in range(0, len(plan.product_ids), BATCH_SIZE):
+        batch = slice(start, start + BATCH_SIZE)
+        columns = zip(
+            plan.product_ids[batch].tolist(), plan.velocity[batch].tolist(), plan.forecast[batch].tolist(),
+            plan.safety_stock[batch].tolist(), plan.reorder_point[batch].tolist(), plan.reorder_qty[batch].tolist(),
+        )
+        with transaction.atomic():
+            ReplenishmentSuggestion.objects.bulk_create(
+                [
+                    ReplenishmentSuggestion(
+                        product_id=pid, velocity=_qty(vel), forecast=_qty(fc), safety_stock=_qty(ss),
+                        reorder_point=_qty(rop), reorder_qty=_qty(qty), computed_at=now,
+                    )
+                    for pid, vel, fc, ss, rop, qty in columns
+                ],
+                update_conflicts=True,
+                unique_fields=['product'],
+                update_fields=SUGGESTION_FIELDS,
+            )
+            if apply_reorder_levels:
+                levels = site_levels(plan.product_ids[batch].tolist(), plan.reorder_point[batch].tolist(), by_site or {})
+                _apply_reorder_levels(levels, now, user)
+    return len(plan.product_ids)
+
+
+def _apply_reorder_levels(levels: dict[Key, Decimal], now, user) -> None:
+    if not levels:
+        return
+    rows = list(Inventory.objects.filter(pair_filter(levels)))
+    missing = levels.keys() - {(inv.product_id, inv.warehouse_id) for inv in rows}
+    if missing:
+        Inventory.objects.bulk_create(
+            [Inventory(product_id=pid, warehouse_id=wid, created_by=user, updated_by=user) for pid, wid in missing],
+            ignore_conflicts=True,
+        )
+        rows += list(Inventory.objects.filter(pair_filter(missing)))
+    for inv in rows:
+        inv.reorder_level = levels[(inv.product_id, inv.warehouse_id)]
+        inv.updated_at = now
+        inv.updated_by = user
+    Inventory.objects.bulk_update(rows, ['reorder_level', 'updated_at', 'updated_by'])
+    # bulk_update skips post_save, so re-evaluate the low-stock index here
+    sync_low_stock_alerts(rows)
+
+
+def run_planner(params: PlanParams | None = None, *, apply_reorder_levels: bool = False, today: date | None = None,
+                user=None) -> int:
+    """Plan every product with consumption in the history window; returns the number planned."""
+    params = params or PlanParams()
+    product_ids, demand, by_site = weekly_demand(params.history_weeks, today)
+    if not len(product_ids):
+        return 0
+    plan = compute_plan(product_ids, demand, stock_positions(product_ids), params)
+    return save_plan(plan, apply_reorder_levels=apply_reorder_levels, by_site=by_site, user=user)
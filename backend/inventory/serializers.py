@@ -1,6 +1,11 @@
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 
-from .models import Product, Inventory, StockEntry, StockEntryLine, StockLedger
+from core.serializers import PrefetchedPrimaryKeyRelatedField, prefetch_line_relations
+
+from .models import Product, Inventory, StockEntry, StockEntryLine, StockLedger, Warehouse
+from .posting import is_outgoing, missing_lots
 
 
 class ProductSerializer(serializers.ModelSerializer):
@@ -9,6 +14,19 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'sku', 'name', 'description', 'hsn_code', 'unit',
             'cost_price', 'selling_price', 'gst_rate', 'is_active',
+            'abc_class', 'xyz_class', 'classified_at',
+            'created_at', 'updated_at', 'created_by', 'updated_by'
+        ]
+        read_only_fields = (
+            'id', 'abc_class', 'xyz_class', 'classified_at', 'created_at', 'updated_at', 'created_by', 'updated_by'
+        )
+
+
+class WarehouseSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Warehouse
+        fields = [
+            'id', 'code', 'name', 'address_line1', 'city', 'state', 'postal_code', 'is_active',
             'created_at', 'updated_at', 'created_by', 'updated_by'
         ]
         read_only_fields = ('id', 'created_at', 'updated_at', 'created_by', 'updated_by')
@@ -16,22 +34,29 @@ class ProductSerializer(serializers.ModelSerializer):
 
 class InventorySerializer(serializers.ModelSerializer):
     product_detail = ProductSerializer(source='product', read_only=True)
+    available_qty = serializers.DecimalField(max_digits=16, decimal_places=3, read_only=True)
 
     class Meta:
         model = Inventory
         fields = [
-            'id', 'product', 'product_detail', 'on_hand', 'reorder_level',
-            'created_at', 'updated_at', 'created_by', 'updated_by'
+            'id', 'product', 'product_detail', 'warehouse', 'on_hand', 'reorder_level',
+            'reserved_qty', 'in_transit_qty', 'available_qty', 'created_at', 'updated_at', 'created_by', 'updated_by'
         ]
-        read_only_fields = ('id', 'created_at', 'updated_at', 'created_by', 'updated_by')
+        read_only_fields = ('id', 'reserved_qty', 'in_transit_qty', 'created_at', 'updated_at', 'created_by', 'updated_by')
 
 
 class StockEntryLineSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
+    product = PrefetchedPrimaryKeyRelatedField(queryset=Product.objects.all())
+    warehouse = PrefetchedPrimaryKeyRelatedField(queryset=Warehouse.objects.all(), required=False, allow_null=True)
+    to_warehouse = PrefetchedPrimaryKeyRelatedField(queryset=Warehouse.objects.all(), required=False, allow_null=True)
 
     class Meta:
         model = StockEntryLine
-        fields = ['id', 'product', 'product_name', 'quantity', 'rate', 'amount']
+        fields = [
+            'id', 'product', 'product_name', 'warehouse', 'to_warehouse', 'quantity', 'rate', 'amount', 'lot_number',
+            'expiry_date',
+        ]
         read_only_fields = ['id', 'amount']
 
 
@@ -41,30 +66,71 @@ class StockEntrySerializer(serializers.ModelSerializer):
     class Meta:
         model = StockEntry
         fields = [
-            'id', 'reference_number', 'entry_type', 'entry_date', 'remarks', 'lines',
+            'id', 'reference_number', 'entry_type', 'entry_date', 'remarks', 'lines', 'received_at',
             'created_at', 'updated_at', 'created_by', 'updated_by'
         ]
-        read_only_fields = ['id', 'entry_date', 'created_at', 'updated_at', 'created_by', 'updated_by']
-
+        read_only_fields = ['id', 'entry_date', 'received_at', 'created_at', 'updated_at', 'created_by', 'updated_by']
+
+    def to_internal_value(self, data):
+        # One query per related model for all lines instead of one per line and field
+        if hasattr(data, 'get'):
+            prefetch_line_relations(
+                self.context, data.get('lines'), {'product': Product, 'warehouse': Warehouse, 'to_warehouse': Warehouse}
+            )
+        return super().to_internal_value(data)
+
+    def validate(self, attrs):
+        entry_type = attrs.get('entry_type', getattr(self.instance, 'entry_type', None))
+        is_transfer = entry_type == StockEntry.EntryType.TRANSFER
+        if self.instance is not None and StockEntry.EntryType.TRANSFER in (entry_type, self.instance.entry_type):
+            if self.instance.ledger_rows.exists():
+                raise serializers.ValidationError('A posted transfer cannot be edited; post a transfer back instead.')
+        for line in attrs.get('lines') or []:
+            if is_transfer and line.get('warehouse') == line.get('to_warehouse'):
+                raise serializers.ValidationError({'lines': 'A transfer line needs different source and destination.'})
+            if not is_transfer and line.get('to_warehouse'):
+                raise serializers.ValidationError({'lines': 'to_warehouse is only used by TRANSFER entries.'})
+        # Outgoing lines draw from existing lots; only incoming lines may start one
+        unknown = missing_lots(
+            (line['product'].pk, getattr(line.get('warehouse'), 'pk', None), line.get('lot_number'))
+            for line in attrs.get('lines') or [] if entry_type and is_outgoing(entry_type, line['quantity'])
+        )
+        if unknown:
+            numbers = ', '.join(sorted(number for _, _, number in unknown))
+            raise serializers.ValidationError({'lines': f'Unknown lot {numbers} on an outgoing line.'})
+        return attrs
+
+    @staticmethod
+    def _create_lines(entry: StockEntry, lines_data):
+        lines = [StockEntryLine(stock_entry=entry, **line) for line in lines_data]
+        for line in lines:
+            # bulk_create skips StockEntryLine.save, so set the amount here
+            line.amount = (line.quantity or 0) * (line.rate or 0)
+        StockEntryLine.objects.bulk_create(lines, batch_size=500)
+
+    @transaction.atomic
     def create(self, validated_data):
         lines_data = validated_data.pop('lines', [])
         entry = StockEntry.objects.create(**validated_data)
-        for line in lines_data:
-            StockEntryLine.objects.create(stock_entry=entry, **line)
+        self._create_lines(entry, lines_data)
         entry.apply_to_inventory()
+        prefetch_related_objects([entry], Prefetch('lines', StockEntryLine.objects.select_related('product')))
         return entry
 
+    @transaction.atomic
     def update(self, instance: StockEntry, validated_data):
         lines_data = validated_data.pop('lines', None)
         for attr, val in validated_data.items():
             setattr(instance, attr, val)
         instance.save()
+        posted_lots = None
         if lines_data is not None:
+            posted_lots = set(instance.lines.exclude(lot_number='').values_list('product_id', 'warehouse_id', 'lot_number'))
             instance.lines.all().delete()
-            for line in lines_data:
-                StockEntryLine.objects.create(stock_entry=instance, **line)
-            # Reapply inventory effect: simplistic (could compute delta)
-            instance.apply_to_inventory()
+            self._create_lines(instance, lines_data)
+        # Post only the net change against what this entry already posted
+        # (covers edited lines as well as a changed entry_type).
+        instance.apply_to_inventory(incremental=True, posted_lots=posted_lots)
         return instance
 
 
@@ -74,6 +140,6 @@ class StockLedgerSerializer(serializers.ModelSerializer):
     class Meta:
         model = StockLedger
         fields = [
-            'id', 'product', 'product_name', 'movement_date', 'qty_change', 'balance_qty', 'rate'
+            'id', 'product', 'product_name', 'warehouse', 'lot', 'movement_date', 'qty_change', 'balance_qty', 'rate'
         ]
         read_only_fields = ['id']
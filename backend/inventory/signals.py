@@ -0,0 +1,16 @@
+"""Keep low-stock alerts in step with Inventory rows saved outside the posting engine."""
+from __future__ import annotations
+
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .alerts import sync_low_stock_alerts
+from .models import Inventory
+
+
+@receiver(post_save, sender=Inventory)
+def refresh_low_stock_alert(sender, instance: Inventory, raw=False, **kwargs):
+    """Re-evaluate the alert after an API/admin edit (e.g. a new reorder level)."""
+    if raw:
+        return
+    sync_low_stock_alerts([instance])
@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from inventory.models import Inventory, Product, StockEntry
+
+
+@pytest.fixture
+def manager_client(db):
+    User = get_user_model()
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username='counter', password='x', role=User.Roles.MANAGER))
+    return client
+
+
+@pytest.mark.django_db
+def test_bulk_adjust_posts_one_entry_and_reports_row_errors(manager_client):
+    products = Product.objects.bulk_create([Product(sku=f'CC-{i}', name=f'Counted {i}') for i in range(5)])
+    adjustments = [{'product': p.id, 'quantity': '3'} for p in products]
+    adjustments += [{'product': 999999, 'quantity': '1'}, {'sku': 'CC-0', 'quantity': 'lots'}]
+
+    response = manager_client.post(reverse('stock-entry-bulk-adjust'), {'adjustments': adjustments}, format='json')
+    assert response.status_code == 201
+    assert len(response.data['created']) == 1 and response.data['lines'] == 5
+    assert response.data['errors'] == [
+        {'row': 6, 'error': 'Unknown product'},
+        {'row': 7, 'error': 'Quantity must be a number'},
+    ]
+    entry = StockEntry.objects.get(id=response.data['created'][0])
+    assert entry.entry_type == StockEntry.EntryType.ADJUST and entry.lines.count() == 5
+    assert Inventory.objects.get(product=products[0]).on_hand == Decimal('3.000')
+
+
+@pytest.mark.django_db
+def test_bulk_adjust_accepts_streamed_csv(manager_client):
+    Product.objects.create(sku='CSV-1', name='From CSV')
+    upload = SimpleUploadedFile('count.csv', b'sku,quantity\nCSV-1,-2.5\nNOPE,1\n', content_type='text/csv')
+    response = manager_client.post(reverse('stock-entry-bulk-adjust'), {'file': upload}, format='multipart')
+    assert response.status_code == 201
+    assert response.data['errors'] == [{'row': 2, 'error': 'Unknown product'}]
+    assert Inventory.objects.get(product__sku='CSV-1').on_hand == Decimal('-2.500')
+
+
+@pytest.mark.django_db
+def test_bulk_adjust_rejects_a_non_utf8_upload(manager_client):
+    Product.objects.create(sku='CSV-2', name='Latin-1 sheet')
+    upload = SimpleUploadedFile('count.csv', 'sku,quantity\nCSV-2,1\nCAFÉ,1\n'.encode('latin-1'), content_type='text/csv')
+    response = manager_client.post(reverse('stock-entry-bulk-adjust'), {'file': upload}, format='multipart')
+    assert response.status_code == 400
+    assert 'UTF-8' in response.data['detail']
+    assert not StockEntry.objects.exists()
+
+
+@pytest.mark.django_db
+def test_bulk_adjust_rejects_values_the_line_columns_cannot_hold(manager_client):
+    product = Product.objects.create(sku='BIG-1', name='Out of range')
+    adjustments = [
+        {'product': product.id, 'quantity': '1e20'},
+        {'product': product.id, 'quantity': '1', 'rate': '1e15'},
+        {'product': product.id, 'quantity': '1000000', 'rate': '1000000000'},
+        {'product': product.id, 'quantity': '1.23456'},
+        {'product': product.id, 'quantity': '2', 'rate': '10.006'},
+    ]
+    response = manager_client.post(reverse('stock-entry-bulk-adjust'), {'adjustments': adjustments}, format='json')
+    assert response.status_code == 201
+    assert response.data['errors'] == [
+        {'row': 1, 'error': 'Quantity is out of range'},
+        {'row': 2, 'error': 'Rate or amount is out of range'},
+        {'row': 3, 'error': 'Rate or amount is out of range'},
+        {'row': 4, 'error': 'Quantity allows at most 3 decimal places'},
+    ]
+    line = StockEntry.objects.get(id=response.data['created'][0]).lines.get()
+    assert line.quantity == Decimal('2.000') and line.rate == Decimal('10.01')
@@ -0,0 +1,50 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from inventory.archive import archive_closed_periods
+from inventory.balances import last_closed_period, ledger_balances, month_start
+from inventory.consistency import check_chunk
+from inventory.models import Product, StockBalance, StockCheckpoint, StockLedger, StockLedgerArchive
+from inventory.posting import Movement, post_movements
+from inventory.valuation import stream_valuation
+
+
+@pytest.mark.django_db
+def test_archive_moves_closed_months_and_readers_follow():
+    product = Product.objects.create(sku='AR-1', name='Archived')
+    closed = last_closed_period()
+    old = timezone.make_aware(datetime.combine(month_start(closed) - timedelta(days=20), time(12)))
+    rows = post_movements([Movement(product.id, Decimal('10'), Decimal('2.00'))])
+    rows += post_movements([Movement(product.id, Decimal('-4'))])
+    StockLedger.objects.filter(pk__in=[row.pk for row in rows]).update(movement_date=old)
+    post_movements([Movement(product.id, Decimal('5'), Decimal('3.00'))])
+
+    out = StringIO()
+    call_command('archive_stock_ledger', batch_size=1, stdout=out)
+    assert 'Archived 2 ledger rows' in out.getvalue()
+    assert StockLedger.objects.filter(product=product).count() == 1
+    assert list(StockLedgerArchive.objects.order_by('id').values_list('qty_change', 'balance_qty')) == [
+        (Decimal('10.000'), Decimal('10.000')), (Decimal('-4.000'), Decimal('6.000')),
+    ]
+    assert StockCheckpoint.objects.get(product=product, period=closed).balance_qty == Decimal('6')
+    assert archive_closed_periods() == 0
+
+    assert ledger_balances([product.id]) == {product.id: Decimal('11')}
+    assert ledger_balances([product.id], as_of=old) == {product.id: Decimal('6')}
+    valuation = next(stream_valuation(product_ids=[product.id]))
+    assert (valuation.qty, valuation.value) == (Decimal('11'), Decimal('27.00'))
+    assert check_chunk([product.id]) == []
+
+    # A new head is seeded from the archive when the hot ledger has no rows for the key
+    StockLedger.objects.filter(product=product).delete()
+    StockBalance.objects.filter(product=product).delete()
+    post_movements([Movement(product.id, Decimal('1'))])
+    assert StockBalance.objects.get(product=product).balance_qty == Decimal('7')
+
+    with pytest.raises(ValueError):
+        archive_closed_periods(timezone.localdate())
@@ -0,0 +1,59 @@
+import random
+import threading
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.db.models import Sum
+
+from inventory.models import Inventory, Product, StockBalance, StockLedger
+from inventory.posting import Movement, post_movements
+
+THREADS = 8
+POSTINGS_PER_THREAD = 40
+
+
+def _worker(product_ids, seed, barrier, errors):
+    rng = random.Random(seed)
+    try:
+        barrier.wait()
+        for _ in range(POSTINGS_PER_THREAD):
+            # Mostly hit the two hot SKUs, sometimes several products in one posting.
+            picks = rng.sample(product_ids, k=rng.choice([1, 1, 1, 2, 3]))
+            post_movements([
+                Movement(pid, Decimal(rng.randint(-5, 9)) + Decimal('0.125'), Decimal('1.00'))
+                for pid in picks
+            ])
+    except Exception as exc:  # pragma: no cover - surfaced by the assertion below
+        errors.append(exc)
+    finally:
+        connection.close()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_postings_keep_running_balances_exact():
+    products = [Product.objects.create(sku=f'HOT-{i}', name=f'Hot {i}') for i in range(4)]
+    product_ids = [p.id for p in products[:2]] * 3 + [p.id for p in products[2:]]
+
+    barrier = threading.Barrier(THREADS)
+    errors = []
+    threads = [
+        threading.Thread(target=_worker, args=(product_ids, seed, barrier, errors))
+        for seed in range(THREADS)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors, errors
+
+    assert StockLedger.objects.count() > THREADS * POSTINGS_PER_THREAD
+    for product in products:
+        total = StockLedger.objects.filter(product=product).aggregate(total=Sum('qty_change'))['total']
+        assert StockBalance.objects.get(product=product).balance_qty == total
+        assert Inventory.objects.get(product=product).on_hand == total
+
+        running = Decimal('0')
+        for change, balance in StockLedger.objects.filter(product=product).order_by('id').values_list('qty_change', 'balance_qty'):
+            running += change
+            assert balance == running
@@ -0,0 +1,128 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from inventory.balances import build_checkpoints, ledger_balances
+from inventory.models import Product, StockCheckpoint, StockLedger
+from inventory.posting import Movement, post_movements
+
+
+def _post_at(when, product, qty):
+    rows = post_movements([Movement(product.id, Decimal(qty))])
+    StockLedger.objects.filter(id__in=[r.id for r in rows]).update(movement_date=when)
+
+
+def _aware(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+@pytest.fixture
+def history(db):
+    a = Product.objects.create(sku='CK-A', name='Checkpoint A')
+    b = Product.objects.create(sku='CK-B', name='Checkpoint B')
+    _post_at(_aware(2025, 1, 10), a, '10')
+    _post_at(_aware(2025, 1, 20), b, '4')
+    _post_at(_aware(2025, 2, 5), a, '-3')
+    _post_at(_aware(2025, 3, 31, 23, 59), b, '6')
+    return a, b
+
+
+@pytest.mark.django_db
+def test_checkpoints_carry_balances_forward(history):
+    a, b = history
+    created = build_checkpoints(datetime(2025, 3, 1).date())
+    assert created == 6
+    march = dict(StockCheckpoint.objects.filter(period='2025-03-01').values_list('product_id', 'balance_qty'))
+    assert march == {a.id: Decimal('7.000'), b.id: Decimal('10.000')}
+    # Re-running only closes months that are not closed yet.
+    assert build_checkpoints(datetime(2025, 3, 1).date()) == 0
+
+
+@pytest.mark.django_db
+def test_ledger_balances_match_full_ledger_sum(history):
+    a, b = history
+    call_command('checkpoint_stock_ledger', through='2025-03')
+    post_movements([Movement(a.id, Decimal('2')), Movement(b.id, Decimal('-1'))])
+
+    full = dict(StockLedger.objects.order_by().values('product').annotate(t=Sum('qty_change')).values_list('product', 't'))
+    with CaptureQueriesContext(connection) as ctx:
+        balances = ledger_balances()
+    assert balances == full == {a.id: Decimal('9.000'), b.id: Decimal('9.000')}
+    assert len(ctx) == 3
+    assert ledger_balances([a.id]) == {a.id: Decimal('9.000')}
+
+
+@pytest.mark.django_db
+def test_current_stock_endpoint_reads_checkpoints(history):
+    from django.contrib.auth import get_user_model
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    a, b = history
+    build_checkpoints(datetime(2025, 2, 1).date())
+    User = get_user_model()
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username='ck-admin', password='x', role=User.Roles.ADMIN))
+    response = client.get(reverse('stock-ledger-current-stock'))
+    assert response.status_code == 200
+    assert {row['product']: row['balance'] for row in response.data} == {a.id: Decimal('7.000'), b.id: Decimal('10.000')}
+    assert client.get(reverse('stock-ledger-valuation')).status_code == 200
+    assert client.get(reverse('stock-ledger-low-stock')).status_code == 200
+
+
+@pytest.mark.django_db
+def test_point_in_time_balances(history):
+    from django.contrib.auth import get_user_model
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    a, b = history
+    build_checkpoints(datetime(2025, 3, 1).date())
+
+    assert ledger_balances(as_of=_aware(2025, 1, 15)) == {a.id: Decimal('10.000')}
+    assert ledger_balances(as_of=_aware(2025, 2, 28, 12)) == {a.id: Decimal('7.000'), b.id: Decimal('4.000')}
+    # Resolved from the February checkpoint plus a March range scan (March is
+    # checkpointed, so the range is read from the archive and the hot ledger).
+    with CaptureQueriesContext(connection) as ctx:
+        march = ledger_balances([b.id], as_of=_aware(2025, 3, 31, 23, 59))
+    assert march == {b.id: Decimal('10.000')}
+    assert len(ctx) == 4
+
+    User = get_user_model()
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username='asof-admin', password='x', role=User.Roles.ADMIN))
+    url = reverse('stock-ledger-current-stock')
+    response = client.get(url, {'as_of': '2025-01-31', 'product': a.id})
+    assert response.status_code == 200
+    assert response.data == [{'product': a.id, 'balance': Decimal('10.000')}]
+    assert client.get(url, {'as_of': 'yesterday'}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_stock_reports_do_not_count_the_scoped_ledger(history):
+    from django.contrib.auth import get_user_model
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    a, b = history
+    StockLedger.objects.filter(product=a).update(created_by=None)
+    User = get_user_model()
+    admin = User.objects.create_user(username='scope-admin', password='x', role=User.Roles.ADMIN)
+    clerk = User.objects.create_user(username='scope-clerk', password='x', role=User.Roles.STAFF)
+    StockLedger.objects.filter(product=b).update(created_by=clerk)
+    client = APIClient()
+    for user, expected in ((admin, {a.id, b.id}), (clerk, {b.id})):
+        client.force_authenticate(user)
+        for name in ('stock-ledger-current-stock', 'stock-ledger-valuation', 'stock-ledger-low-stock'):
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(reverse(name))
+            assert response.status_code == 200
+            assert not any('COUNT(' in q['sql'] for q in ctx.captured_queries)
+            if name == 'stock-ledger-current-stock':
+                assert {row['product'] for row in response.data} == expected
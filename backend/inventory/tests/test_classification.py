@@ -0,0 +1,69 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from inventory.classification import ClassificationParams, abc_classes, classify_products, xyz_classes
+from inventory.models import Product, StockEntry, StockLedger
+from inventory.posting import Movement, post_movements
+
+
+def test_vectorized_ranking():
+    value = np.array([10.0, 700.0, 150.0, 100.0, 40.0, 0.0])
+    assert abc_classes(value, 0.8, 0.95).tolist() == ['C', 'A', 'A', 'B', 'C', 'C']
+    demand = np.array([[5.0, 5.0, 5.0, 5.0], [0.0, 10.0, 0.0, 10.0], [0.0, 0.0, 0.0, 40.0], [0.0] * 4])
+    assert xyz_classes(demand, 0.5, 1.0).tolist() == ['X', 'Y', 'Z', 'Z']
+
+
+@pytest.mark.django_db
+def test_classify_products_stores_classes_and_viewset_filters():
+    today = timezone.localdate()
+    steady = Product.objects.create(sku='CL-A', name='Steady seller', cost_price=Decimal('50.00'))
+    lumpy = Product.objects.create(sku='CL-B', name='Lumpy seller')
+    idle = Product.objects.create(sku='CL-C', name='Idle')
+    post_movements([Movement(steady.id, Decimal('100')), Movement(lumpy.id, Decimal('100')), Movement(idle.id, Decimal('9'))])
+    for week in range(4):
+        moved = timezone.make_aware(datetime.combine(today - timedelta(weeks=week), time(12)))
+        rows = [Movement(steady.id, Decimal('-5'))]  # no rate: valued at cost price
+        if week == 0:
+            rows.append(Movement(lumpy.id, Decimal('-4'), Decimal('1.00')))
+        out = StockEntry.objects.create(entry_type=StockEntry.EntryType.OUT)
+        for row in post_movements(rows, entry=out):
+            StockLedger.objects.filter(pk=row.pk).update(movement_date=moved)
+    # A write-off is a correction, not consumption
+    post_movements([Movement(idle.id, Decimal('-9'), Decimal('100.00'))],
+                   entry=StockEntry.objects.create(entry_type=StockEntry.EntryType.ADJUST))
+
+    counts = classify_products(ClassificationParams(history_weeks=4), today=today)
+    assert counts == {'AX': 1, 'CZ': 2}
+    classes = dict(Product.objects.values_list('sku', 'abc_class'))
+    assert classes == {'CL-A': 'A', 'CL-B': 'C', 'CL-C': 'C'}
+    assert Product.objects.get(pk=idle.pk).xyz_class == 'Z'
+
+    User = get_user_model()
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username='planner', password='x', role=User.Roles.ADMIN))
+    rows = client.get(reverse('product-list'), {'abc_class': 'a', 'xyz_class': 'X,Y'}).data['results']
+    assert [row['sku'] for row in rows] == ['CL-A']
+
+
+@pytest.mark.django_db
+def test_classify_products_writes_in_chunks(monkeypatch):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    from inventory import classification
+
+    Product.objects.bulk_create([Product(sku=f'CH-{i}', name=f'Chunked {i}') for i in range(25)])
+    monkeypatch.setattr(classification, 'BATCH_SIZE', 10)
+    with CaptureQueriesContext(connection) as ctx:
+        counts = classify_products(ClassificationParams(history_weeks=4))
+    assert counts == {'CZ': 25}
+    updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+    assert len(updates) == 3 and all('WHERE' in sql for sql in updates)
+    assert not Product.objects.filter(classified_at__isnull=True).exists()
@@ -0,0 +1,61 @@
+from decimal import Decimal
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from inventory.models import Inventory, Product, StockBalance, StockLedger
+from inventory.posting import Movement, post_movements
+
+
+@pytest.mark.django_db
+def test_verify_reports_then_repairs_drift():
+    good = Product.objects.create(sku='CV-OK', name='Consistent')
+    bad = Product.objects.create(sku='CV-BAD', name='Drifted')
+    post_movements([Movement(good.id, Decimal('5')), Movement(bad.id, Decimal('10')), Movement(bad.id, Decimal('-3'))])
+
+    # Simulate a double-applied entry and a corrupted running balance
+    Inventory.objects.filter(product=bad).update(on_hand=Decimal('14'))
+    first = StockLedger.objects.filter(product=bad).order_by('id').first()
+    StockLedger.objects.filter(pk=first.pk).update(balance_qty=Decimal('99'))
+
+    out = StringIO()
+    call_command('verify_stock_ledger', workers=1, chunk_size=1, stdout=out)
+    report = out.getvalue()
+    assert f'product {bad.id}: ledger sum 7.000, on_hand=14.000, 1 running balance rows off' in report
+    assert f'product {good.id}' not in report
+    assert Inventory.objects.get(product=bad).on_hand == Decimal('14')
+
+    out = StringIO()
+    call_command('verify_stock_ledger', workers=1, repair=True, stdout=out)
+    assert 'Repaired 1 products.' in out.getvalue()
+    assert Inventory.objects.get(product=bad).on_hand == Decimal('7')
+    assert StockBalance.objects.get(product=bad).balance_qty == Decimal('7')
+    assert list(StockLedger.objects.filter(product=bad).order_by('id').values_list('balance_qty', flat=True)) == [
+        Decimal('10'), Decimal('7'),
+    ]
+
+    out = StringIO()
+    call_command('verify_stock_ledger', workers=1, stdout=out)
+    assert 'consistent' in out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_verify_with_worker_processes_reports_and_repairs():
+    products = Product.objects.bulk_create([Product(sku=f'CW-{i}', name=f'Worker {i}') for i in range(6)])
+    post_movements([Movement(p.id, Decimal('4')) for p in products])
+    drifted = products[1], products[4]
+    Inventory.objects.filter(product__in=drifted).update(on_hand=Decimal('9'))
+
+    # Chunks of two products spread the work over both workers
+    out = StringIO()
+    call_command('verify_stock_ledger', workers=2, chunk_size=2, stdout=out)
+    report = out.getvalue()
+    for product in drifted:
+        assert f'product {product.id}: ledger sum 4.000, on_hand=9.000' in report
+    assert '2 products out of balance' in report
+
+    out = StringIO()
+    call_command('verify_stock_ledger', workers=2, chunk_size=2, repair=True, stdout=out)
+    assert 'Repaired 2 products.' in out.getvalue()
+    assert set(Inventory.objects.filter(product__in=products).values_list('on_hand', flat=True)) == {Decimal('4')}
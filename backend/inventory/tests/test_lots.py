@@ -0,0 +1,172 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from inventory.models import Inventory, Product, StockEntry, StockEntryLine, StockLedger, StockLot
+from sales.models import Customer, SalesOrder, SalesOrderLine
+
+
+def _in_days(days):
+    return timezone.localdate() + timedelta(days=days)
+
+
+@pytest.fixture
+def client(db):
+    User = get_user_model()
+    api = APIClient()
+    api.force_authenticate(User.objects.create_user(username='picker', password='x', role=User.Roles.ADMIN))
+    return api
+
+
+def _entry(entry_type, lines):
+    entry = StockEntry.objects.create(entry_type=entry_type)
+    StockEntryLine.objects.bulk_create([
+        StockEntryLine(stock_entry=entry, product=product, quantity=Decimal(qty), lot_number=lot, expiry_date=expiry)
+        for product, qty, lot, expiry in lines
+    ])
+    return entry
+
+
+def _lots(product):
+    return dict(StockLot.objects.filter(product=product).values_list('lot_number', 'qty'))
+
+
+@pytest.mark.django_db
+def test_lot_receipts_and_fefo_issue():
+    milk = Product.objects.create(sku='LOT-MILK', name='Milk')
+    _entry(StockEntry.EntryType.IN, [
+        (milk, '10', 'L-LATE', _in_days(90)),
+        (milk, '4', 'L-EARLY', _in_days(30)),
+        (milk, '3', 'L-NOEXP', None),
+        (milk, '2', '', None),
+    ]).apply_to_inventory()
+    assert _lots(milk) == {'L-LATE': Decimal('10'), 'L-EARLY': Decimal('4'), 'L-NOEXP': Decimal('3')}
+
+    # A lot-less OUT is drawn earliest expiry first; a named OUT draws its own lot
+    out = _entry(StockEntry.EntryType.OUT, [(milk, '6', '', None), (milk, '1', 'L-NOEXP', None)])
+    out.apply_to_inventory()
+    assert _lots(milk) == {'L-LATE': Decimal('8'), 'L-EARLY': Decimal('0'), 'L-NOEXP': Decimal('2')}
+    picked = out.ledger_rows.order_by('id').values_list('lot__lot_number', 'qty_change')
+    assert list(picked) == [('L-EARLY', Decimal('-4')), ('L-LATE', Decimal('-2')), ('L-NOEXP', Decimal('-1'))]
+    assert Inventory.objects.get(product=milk).on_hand == Decimal('12')
+
+    # Re-posting an unchanged entry leaves FEFO picks alone; a larger OUT runs past the lots
+    out.apply_to_inventory(incremental=True)
+    assert out.ledger_rows.count() == 3
+    _entry(StockEntry.EntryType.OUT, [(milk, '15', '', None)]).apply_to_inventory()
+    assert sum(_lots(milk).values()) == Decimal('0')
+    assert Inventory.objects.get(product=milk).on_hand == Decimal('-3')
+    assert StockLedger.objects.filter(product=milk, lot__isnull=True).count() == 2
+
+
+@pytest.mark.django_db
+def test_lot_posting_query_count_is_independent_of_line_count():
+    counts = {}
+    for size in (1, 40):
+        products = Product.objects.bulk_create([Product(sku=f'LQ{size}-{i}', name=f'Lot {i}') for i in range(size)])
+        receipt = _entry(StockEntry.EntryType.IN, [(p, '5', f'B-{p.id}', _in_days(60)) for p in products])
+        issue = _entry(StockEntry.EntryType.OUT, [(p, '2', '', None) for p in products])
+        with CaptureQueriesContext(connection) as in_ctx:
+            receipt.apply_to_inventory()
+        with CaptureQueriesContext(connection) as out_ctx:
+            issue.apply_to_inventory()
+        counts[size] = (len(in_ctx), len(out_ctx))
+        assert StockLot.objects.filter(product__in=products, qty=Decimal('3')).count() == size
+    assert counts[1] == counts[40]
+
+
+@pytest.mark.django_db
+def test_sales_order_pick_list_is_fefo(client):
+    soap = Product.objects.create(sku='LOT-SOAP', name='Soap')
+    _entry(StockEntry.EntryType.IN, [
+        (soap, '5', 'S-2', _in_days(45)), (soap, '5', 'S-1', _in_days(15)),
+    ]).apply_to_inventory()
+    order = SalesOrder.objects.create(order_number='SO-LOT', customer=Customer.objects.create(customer_code='LOT-C', name='Shop'))
+    SalesOrderLine.objects.create(order=order, product=soap, quantity=Decimal('12'), rate=Decimal('1.00'))
+
+    data = client.get(reverse('sales-order-pick-list', args=[order.id])).data
+    line = data['lines'][0]
+    assert [(lot['lot_number'], lot['quantity']) for lot in line['lots']] == [('S-1', Decimal('5')), ('S-2', Decimal('5'))]
+    assert line['short'] == Decimal('2')
+
+
+@pytest.mark.django_db
+def test_fefo_skips_expired_lots_unless_named(client):
+    tea = Product.objects.create(sku='LOT-TEA', name='Tea')
+    _entry(StockEntry.EntryType.IN, [
+        (tea, '5', 'T-OLD', _in_days(-1)), (tea, '5', 'T-NEW', _in_days(20)),
+    ]).apply_to_inventory()
+
+    _entry(StockEntry.EntryType.OUT, [(tea, '3', '', None)]).apply_to_inventory()
+    assert _lots(tea) == {'T-OLD': Decimal('5'), 'T-NEW': Decimal('2')}
+
+    order = SalesOrder.objects.create(order_number='SO-EXP', customer=Customer.objects.create(customer_code='EXP-C', name='Cafe'))
+    SalesOrderLine.objects.create(order=order, product=tea, quantity=Decimal('4'), rate=Decimal('1.00'))
+    line = client.get(reverse('sales-order-pick-list', args=[order.id])).data['lines'][0]
+    assert [(lot['lot_number'], lot['quantity']) for lot in line['lots']] == [('T-NEW', Decimal('2'))]
+
+    # Writing off the expired lot by name still draws it
+    _entry(StockEntry.EntryType.OUT, [(tea, '5', 'T-OLD', None)]).apply_to_inventory()
+    assert _lots(tea) == {'T-OLD': Decimal('0'), 'T-NEW': Decimal('2')}
+
+
+@pytest.mark.django_db
+def test_outgoing_line_must_name_an_existing_lot(client):
+    salt = Product.objects.create(sku='LOT-SALT', name='Salt')
+    _entry(StockEntry.EntryType.IN, [(salt, '5', 'N-1', _in_days(30))]).apply_to_inventory()
+
+    response = client.post(reverse('stock-entry-list'), {
+        'entry_type': 'OUT', 'lines': [{'product': salt.id, 'quantity': '2', 'lot_number': 'N-TYPO'}],
+    }, format='json')
+    assert response.status_code == 400
+    assert 'N-TYPO' in str(response.data)
+    assert _lots(salt) == {'N-1': Decimal('5')}
+    assert Inventory.objects.get(product=salt).on_hand == Decimal('5')
+
+    with pytest.raises(ValueError):
+        _entry(StockEntry.EntryType.OUT, [(salt, '2', 'N-TYPO', None)]).apply_to_inventory()
+    assert not StockLot.objects.filter(lot_number='N-TYPO').exists()
+
+
+@pytest.mark.django_db
+def test_reducing_a_fefo_out_returns_stock_to_the_picked_lots():
+    rice = Product.objects.create(sku='LOT-RICE', name='Rice')
+    _entry(StockEntry.EntryType.IN, [
+        (rice, '4', 'R-1', _in_days(10)), (rice, '4', 'R-2', _in_days(20)), (rice, '2', '', None),
+    ]).apply_to_inventory()
+    out = _entry(StockEntry.EntryType.OUT, [(rice, '7', '', None)])
+    out.apply_to_inventory()
+    assert _lots(rice) == {'R-1': Decimal('0'), 'R-2': Decimal('1')}
+
+    out.lines.update(quantity=Decimal('2'))
+    out.apply_to_inventory(incremental=True)
+    assert _lots(rice) == {'R-1': Decimal('2'), 'R-2': Decimal('4')}
+    assert sum(_lots(rice).values()) + 2 == Inventory.objects.get(product=rice).on_hand == Decimal('8')
+
+    out.lines.update(quantity=Decimal('0'))
+    out.apply_to_inventory(incremental=True)
+    assert _lots(rice) == {'R-1': Decimal('4'), 'R-2': Decimal('4')}
+
+
+@pytest.mark.django_db
+def test_re_lotting_a_posted_receipt_moves_the_stock_between_the_named_lots(client):
+    oil = Product.objects.create(sku='LOT-OIL', name='Oil')
+    _entry(StockEntry.EntryType.IN, [(oil, '10', 'O-0', _in_days(30))]).apply_to_inventory()
+    response = client.post(reverse('stock-entry-list'), {
+        'entry_type': 'IN', 'lines': [{'product': oil.id, 'quantity': '5', 'lot_number': 'O-1'}],
+    }, format='json')
+    assert response.status_code == 201
+
+    response = client.patch(reverse('stock-entry-detail', args=[response.data['id']]), {
+        'lines': [{'product': oil.id, 'quantity': '5', 'lot_number': 'O-2'}],
+    }, format='json')
+    assert response.status_code == 200
+    assert _lots(oil) == {'O-0': Decimal('10'), 'O-1': Decimal('0'), 'O-2': Decimal('5')}
+    assert Inventory.objects.get(product=oil).on_hand == Decimal('15')
@@ -0,0 +1,63 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from inventory.alerts import low_stock_changed
+from inventory.models import Inventory, LowStockAlert, Product
+from inventory.posting import Movement, post_movements
+
+
+@pytest.mark.django_db
+def test_alerts_follow_threshold_crossings_only(django_capture_on_commit_callbacks):
+    product = Product.objects.create(sku='LS-1', name='Low 1')
+    Inventory.objects.create(product=product, on_hand=Decimal('20'), reorder_level=Decimal('10'))
+    assert not LowStockAlert.objects.exists()
+
+    # Staying above the level does not touch the alert table
+    with CaptureQueriesContext(connection) as ctx:
+        post_movements([Movement(product.id, Decimal('-5'))])
+    assert not any('low_stock' in q['sql'].lower() for q in ctx.captured_queries)
+
+    events = []
+    receiver = lambda sender, **kwargs: events.append(kwargs)  # noqa: E731
+    low_stock_changed.connect(receiver)
+    try:
+        with django_capture_on_commit_callbacks(execute=True):
+            post_movements([Movement(product.id, Decimal('-6'))])
+        assert LowStockAlert.objects.filter(product=product).count() == 1
+        assert events[-1] == {'signal': low_stock_changed, 'went_low': [product.id], 'recovered': []}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            post_movements([Movement(product.id, Decimal('-1'))])
+        assert len(events) == 1  # already low, no new crossing
+
+        with django_capture_on_commit_callbacks(execute=True):
+            post_movements([Movement(product.id, Decimal('50'))])
+        assert not LowStockAlert.objects.exists()
+        assert events[-1]['recovered'] == [product.id]
+    finally:
+        low_stock_changed.disconnect(receiver)
+
+
+@pytest.mark.django_db
+def test_reorder_level_edit_and_low_stock_endpoint_read_the_index():
+    User = get_user_model()
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username='stocker', password='x', role=User.Roles.ADMIN))
+    product = Product.objects.create(sku='LS-2', name='Low 2')
+    inv = Inventory.objects.create(product=product, on_hand=Decimal('0'), reorder_level=Decimal('0'))
+    assert not LowStockAlert.objects.exists()
+
+    inv.reorder_level = Decimal('5')
+    inv.save()
+    assert LowStockAlert.objects.filter(inventory=inv).exists()
+
+    response = client.get(reverse('stock-ledger-low-stock'))
+    assert response.status_code == 200
+    assert [row['sku'] for row in response.data] == ['LS-2']
+    assert client.get(reverse('stock-ledger-low-stock'), {'threshold': '-1'}).data == []
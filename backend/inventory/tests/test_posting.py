@@ -0,0 +1,139 @@
+import sqlite3
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from inventory.models import Inventory, Product, StockEntry, StockEntryLine, StockLedger
+
+
+@pytest.fixture
+def user(db):
+    User = get_user_model()
+    return User.objects.create_user(username='poster', password='pass', role=User.Roles.MANAGER)
+
+
+def _make_entry(user, products, lines_per_product=1, entry_type=StockEntry.EntryType.IN):
+    entry = StockEntry.objects.create(entry_type=entry_type, created_by=user, updated_by=user)
+    StockEntryLine.objects.bulk_create([
+        StockEntryLine(stock_entry=entry, product=p, quantity=Decimal('2.000'), rate=Decimal('10.00'))
+        for _ in range(lines_per_product)
+        for p in products
+    ])
+    return entry
+
+
+def _make_products(user, count, prefix='P'):
+    return Product.objects.bulk_create([
+        Product(sku=f'{prefix}-{i:05d}', name=f'Product {prefix}{i}', created_by=user, updated_by=user)
+        for i in range(count)
+    ])
+
+
+def _legacy_post(entry):
+    """Per-line posting as it was done before the set-based engine (benchmark baseline)."""
+    for line in entry.lines.all():
+        inv, _ = Inventory.objects.get_or_create(product=line.product, defaults={'on_hand': Decimal('0.000')})
+        inv.on_hand += line.quantity
+        inv.save(update_fields=['on_hand', 'updated_at'])
+        last = StockLedger.objects.filter(product=line.product).order_by('-movement_date', '-id').first()
+        StockLedger.objects.create(
+            product=line.product,
+            stock_entry=entry,
+            qty_change=line.quantity,
+            balance_qty=(last.balance_qty if last else Decimal('0')) + line.quantity,
+            rate=line.rate,
+        )
+
+
+@pytest.mark.django_db
+def test_posting_updates_inventory_and_running_balance(user):
+    products = _make_products(user, 3)
+    entry = _make_entry(user, products, lines_per_product=2)
+    entry.apply_to_inventory()
+
+    for product in products:
+        assert Inventory.objects.get(product=product).on_hand == Decimal('4.000')
+        balances = list(StockLedger.objects.filter(product=product).order_by('id').values_list('balance_qty', flat=True))
+        assert balances == [Decimal('2.000'), Decimal('4.000')]
+
+    out = _make_entry(user, products[:1], entry_type=StockEntry.EntryType.OUT)
+    out.apply_to_inventory()
+    assert Inventory.objects.get(product=products[0]).on_hand == Decimal('2.000')
+    last = StockLedger.objects.filter(product=products[0]).order_by('-id').first()
+    assert last.qty_change == Decimal('-2.000') and last.balance_qty == Decimal('2.000')
+
+
+@pytest.fixture
+def library_param_limit(monkeypatch):
+    """Batch bulk writes by the SQLite library's own bound-parameter limit.
+
+    Django 5.2 assumes 999 parameters on SQLite and splits a 500-row bulk write
+    into several statements; SQLite 3.32+ (like Postgres) takes it in one.
+    """
+    if connection.vendor == 'sqlite':
+        connection.ensure_connection()
+        limit = connection.connection.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+        monkeypatch.setattr(connection.features, 'max_query_params', limit)
+
+
+@pytest.mark.django_db
+def test_posting_benchmark_query_count_is_independent_of_line_count(user, library_param_limit):
+    """Benchmark: set-based posting vs the per-line baseline for 1, 50 and 500 lines."""
+    results = {}
+    for size in (1, 50, 500):
+        products = _make_products(user, size, prefix=f'B{size}')
+        entry = _make_entry(user, products)
+        baseline = _make_entry(user, _make_products(user, size, prefix=f'L{size}'))
+
+        with CaptureQueriesContext(connection) as bulk:
+            entry.apply_to_inventory()
+        with CaptureQueriesContext(connection) as legacy:
+            _legacy_post(baseline)
+        results[size] = (len(bulk), len(legacy))
+
+    # Nothing is issued per line
+    assert results[500][0] == results[50][0] == results[1][0]
+    assert results[500][0] <= 25
+    assert results[500][1] >= 500 * 4
+
+
+@pytest.mark.django_db
+def test_editing_one_line_reposts_only_the_delta(user):
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    products = _make_products(user, 20, prefix='E')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    payload = {
+        'entry_type': 'IN',
+        'lines': [{'product': p.id, 'quantity': '5.000', 'rate': '10.00'} for p in products],
+    }
+    response = client.post(reverse('stock-entry-list'), payload, format='json')
+    assert response.status_code == 201
+    entry_id = response.data['id']
+    assert StockLedger.objects.filter(stock_entry_id=entry_id).count() == 20
+    assert Inventory.objects.get(product=products[0]).on_hand == Decimal('5.000')
+
+    payload['lines'][0]['quantity'] = '8.000'
+    response = client.put(reverse('stock-entry-detail', args=[entry_id]), payload, format='json')
+    assert response.status_code == 200
+
+    rows = StockLedger.objects.filter(stock_entry_id=entry_id)
+    assert rows.count() == 21
+    assert rows.order_by('-id').first().qty_change == Decimal('3.000')
+    assert Inventory.objects.get(product=products[0]).on_hand == Decimal('8.000')
+    assert Inventory.objects.get(product=products[1]).on_hand == Decimal('5.000')
+
+    # Switching the entry to OUT reverses the full effect in one pass.
+    payload['entry_type'] = 'OUT'
+    client.put(reverse('stock-entry-detail', args=[entry_id]), payload, format='json')
+    assert Inventory.objects.get(product=products[0]).on_hand == Decimal('-8.000')
+    assert Inventory.objects.get(product=products[1]).on_hand == Decimal('-5.000')
+
+    # Re-submitting an unchanged entry posts nothing.
+    client.post(reverse('stock-entry-submit-entry', args=[entry_id]), format='json')
+    assert StockLedger.objects.filter(stock_entry_id=entry_id).count() == 41
@@ -0,0 +1,76 @@
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from inventory.models import PriceList, Product
+from inventory.pricing import activate_due_price_lists
+
+
+@pytest.fixture
+def admin_client(db):
+    User = get_user_model()
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username='pricer', password='x', role=User.Roles.ADMIN))
+    return client
+
+
+@pytest.mark.django_db
+def test_bulk_price_update_uses_constant_queries(admin_client):
+    products = Product.objects.bulk_create([Product(sku=f'PR-{i}', name=f'Priced {i}') for i in range(200)])
+    updates = [{'id': p.id, 'selling_price': f'{i}.50'} for i, p in enumerate(products)]
+    with CaptureQueriesContext(connection) as ctx:
+        response = admin_client.post(reverse('product-bulk-price-update'), {'updates': updates}, format='json')
+    assert response.status_code == 200
+    assert len(response.data['updated']) == 200
+    assert len(ctx) < 15
+    assert Product.objects.get(sku='PR-7').selling_price == Decimal('7.50')
+
+
+@pytest.mark.django_db
+def test_future_prices_are_staged_then_activated_in_one_batch(admin_client):
+    a = Product.objects.create(sku='PL-A', name='List A', selling_price=Decimal('10.00'))
+    b = Product.objects.create(sku='PL-B', name='List B', selling_price=Decimal('20.00'))
+    tomorrow = timezone.localdate() + timedelta(days=1)
+    url = reverse('product-bulk-price-update')
+    response = admin_client.post(url, {
+        'effective_from': tomorrow.isoformat(),
+        'updates': [{'id': a.id, 'selling_price': '11.00'}, {'id': b.id, 'selling_price': '22.00'}],
+    }, format='json')
+    assert response.status_code == 201
+    a.refresh_from_db()
+    assert a.selling_price == Decimal('10.00')
+
+    call_command('activate_price_lists')  # not due yet
+    assert PriceList.objects.get().status == PriceList.Status.SCHEDULED
+
+    activated, repriced = activate_due_price_lists(tomorrow)
+    assert activated == [response.data['staged']] and repriced == 2
+    assert PriceList.objects.get().status == PriceList.Status.ACTIVE
+    assert list(Product.objects.filter(sku__startswith='PL-').order_by('sku').values_list('selling_price', flat=True)) == [
+        Decimal('11.00'), Decimal('22.00'),
+    ]
+
+
+@pytest.mark.django_db
+def test_bulk_price_update_rounds_and_skips_out_of_range_prices(admin_client):
+    a, b, c = Product.objects.bulk_create([
+        Product(sku=f'RG-{i}', name=f'Ranged {i}', selling_price=Decimal('5.00')) for i in range(3)
+    ])
+    response = admin_client.post(reverse('product-bulk-price-update'), {'updates': [
+        {'id': a.id, 'selling_price': '12.345'},
+        {'id': b.id, 'selling_price': '1e13'},
+        {'id': c.id, 'selling_price': '1e40'},
+    ]}, format='json')
+    assert response.status_code == 200
+    assert response.data['updated'] == [a.id]
+    assert list(Product.objects.filter(sku__startswith='RG-').order_by('sku').values_list('selling_price', flat=True)) == [
+        Decimal('12.34'), Decimal('5.00'), Decimal('5.00'),
+    ]
@@ -0,0 +1,71 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from inventory.models import Product, ProductCost
+from inventory.posting import Movement, post_movements
+from inventory.valuation import AVERAGE, current_valuation, stream_valuation
+
+
+@pytest.mark.django_db
+def test_posting_maintains_moving_average_cost():
+    oil = Product.objects.create(sku='MA-OIL', name='Oil', cost_price=Decimal('1.00'))
+    post_movements([Movement(oil.id, Decimal('10'), Decimal('5.00'))])
+    post_movements([Movement(oil.id, Decimal('10'), Decimal('8.00'))])
+    assert ProductCost.objects.get(product=oil).avg_cost == Decimal('6.5')
+    assert Product.objects.get(pk=oil.pk).cost_price == Decimal('6.50')
+
+    # Issues leave at the average and a zero-rate receipt comes in at it, without touching the cost row
+    with CaptureQueriesContext(connection) as ctx:
+        post_movements([Movement(oil.id, Decimal('-15'), Decimal('99.00'))])
+        post_movements([Movement(oil.id, Decimal('2'))])
+    assert not any('productcost' in q['sql'].lower() for q in ctx.captured_queries)
+    assert ProductCost.objects.get(product=oil).avg_cost == Decimal('6.5')
+    assert list(current_valuation([oil.id])) == list(stream_valuation(AVERAGE, [oil.id]))
+    assert next(current_valuation([oil.id])).value == Decimal('45.50')
+
+    # A product without a cost row yet starts from a replay of its ledger
+    ProductCost.objects.filter(product=oil).delete()
+    post_movements([Movement(oil.id, Decimal('3'), Decimal('10.50'))])
+    assert ProductCost.objects.get(product=oil).avg_cost == Decimal('7.7')
+    assert Product.objects.get(pk=oil.pk).cost_price == Decimal('7.70')
+
+
+@pytest.mark.django_db
+def test_zero_rate_stock_keeps_the_set_cost_price():
+    bolt = Product.objects.create(sku='MA-BOLT', name='Bolt', cost_price=Decimal('4.00'))
+    post_movements([Movement(bolt.id, Decimal('10'))])
+    assert not ProductCost.objects.filter(product=bolt).exists()
+    assert Product.objects.get(pk=bolt.pk).cost_price == Decimal('4.00')
+    assert next(current_valuation([bolt.id])).value == Decimal('40.00')
+
+    # The first priced receipt averages against the stock already held at cost_price
+    post_movements([Movement(bolt.id, Decimal('10'), Decimal('6.00'))])
+    assert ProductCost.objects.get(product=bolt).avg_cost == Decimal('5')
+    assert next(current_valuation([bolt.id])).value == Decimal('100.00')
+
+    # A receipt at the current average leaves cost_price unwritten
+    with CaptureQueriesContext(connection) as ctx:
+        post_movements([Movement(bolt.id, Decimal('5'), Decimal('5.00'))])
+    assert not any(q['sql'].startswith('UPDATE "inventory_product"') for q in ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_current_average_valuation_is_a_plain_read():
+    products = Product.objects.bulk_create([Product(sku=f'MA-{i}', name=f'Item {i}') for i in range(30)])
+    post_movements([Movement(p.id, Decimal('4'), Decimal('2.50')) for p in products])
+    post_movements([Movement(p.id, Decimal('-1')) for p in products])
+
+    User = get_user_model()
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username='valuer', password='x', role=User.Roles.ADMIN))
+    with CaptureQueriesContext(connection) as ctx:
+        rows = client.get(reverse('stock-ledger-valuation')).data
+    assert {(row['qty'], row['value']) for row in rows} == {(Decimal('3.000'), Decimal('7.50'))}
+    assert len(rows) == 30
+    assert not any('qty_change' in q['sql'] for q in ctx.captured_queries)  # no ledger replay
@@ -0,0 +1,98 @@
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from django.utils import timezone
+
+from inventory.models import (
+    Inventory, LowStockAlert, Product, ReplenishmentSuggestion, StockEntry, StockEntryLine, StockLedger, Warehouse,
+)
+from inventory.posting import Movement, post_movements
+from inventory.replenishment import PlanParams, compute_plan, run_planner, weekly_demand
+
+
+def test_compute_plan_is_vectorized_over_products():
+    demand = np.array([[7.0] * 8, [0.0, 14.0] * 4])
+    plan = compute_plan(np.array([1, 2]), demand, np.array([0.0, 100.0]), PlanParams(window_weeks=8, alpha=0.5, service_z=0))
+    assert plan.velocity.tolist() == [1.0, 1.0]
+    assert plan.forecast[0] == pytest.approx(1.0)
+    assert plan.reorder_point[0] == pytest.approx(14.0)
+    assert plan.reorder_qty.tolist() == pytest.approx([44.0, 0.0])
+
+
+def _post_at(day, movements, entry_type=StockEntry.EntryType.OUT):
+    entry = StockEntry.objects.create(entry_type=entry_type)
+    rows = post_movements(movements, entry=entry)
+    moved = timezone.make_aware(datetime.combine(day, time(12)))
+    StockLedger.objects.filter(pk__in=[row.pk for row in rows]).update(movement_date=moved)
+
+
+@pytest.mark.django_db
+def test_run_planner_writes_suggestions_and_reorder_levels():
+    today = timezone.localdate()
+    product = Product.objects.create(sku='RP-1', name='Fast mover')
+    idle = Product.objects.create(sku='RP-2', name='Idle')
+    post_movements([Movement(product.id, Decimal('500')), Movement(idle.id, Decimal('5'))])
+    for week in range(10):
+        _post_at(today - timedelta(weeks=week), [Movement(product.id, Decimal('-14'))])
+    # Negative adjustments and transfer legs move or correct stock; they are not demand
+    _post_at(today, [Movement(idle.id, Decimal('-2'))], StockEntry.EntryType.ADJUST)
+    overflow = Warehouse.objects.create(code='RP-W', name='Overflow')
+    _post_at(today, [Movement(product.id, Decimal('-50')), Movement(product.id, Decimal('50'), warehouse_id=overflow.id)],
+             StockEntry.EntryType.TRANSFER)
+
+    planned = run_planner(PlanParams(history_weeks=10, window_weeks=10, service_z=0), apply_reorder_levels=True, today=today)
+    assert planned == 1
+    suggestion = ReplenishmentSuggestion.objects.get(product=product)
+    assert suggestion.velocity == Decimal('2.000')
+    assert suggestion.reorder_point == Decimal('28.000')
+    assert suggestion.reorder_qty == Decimal('0.000')  # 360 on hand covers ROP + 30 days
+    inv = Inventory.objects.get(product=product, warehouse__isnull=True)
+    assert inv.reorder_level == Decimal('28.000')
+    assert not LowStockAlert.objects.filter(product=product).exists()
+    assert not ReplenishmentSuggestion.objects.filter(product=idle).exists()
+
+    # Re-running overwrites in place
+    run_planner(PlanParams(history_weeks=10, window_weeks=10, service_z=0, lead_time_days=200), today=today)
+    suggestion.refresh_from_db()
+    assert suggestion.reorder_point == Decimal('400.000')
+    assert ReplenishmentSuggestion.objects.count() == 1
+
+
+@pytest.mark.django_db
+def test_reorder_levels_are_split_over_consuming_warehouses():
+    today = timezone.localdate()
+    north = Warehouse.objects.create(code='RP-N', name='North')
+    south = Warehouse.objects.create(code='RP-S', name='South')
+    product = Product.objects.create(sku='RP-3', name='Two sites')
+    post_movements([Movement(product.id, Decimal('100'), warehouse_id=north.id),
+                    Movement(product.id, Decimal('100'), warehouse_id=south.id)])
+    for week in range(4):
+        _post_at(today - timedelta(weeks=week), [Movement(product.id, Decimal('-21'), warehouse_id=north.id),
+                                                 Movement(product.id, Decimal('-7'), warehouse_id=south.id)])
+
+    run_planner(PlanParams(history_weeks=4, window_weeks=4, service_z=0), apply_reorder_levels=True, today=today)
+    assert ReplenishmentSuggestion.objects.get(product=product).reorder_point == Decimal('56.000')
+    levels = dict(Inventory.objects.filter(product=product).values_list('warehouse_id', 'reorder_level'))
+    assert levels == {north.id: Decimal('42.000'), south.id: Decimal('14.000')}
+
+
+@pytest.mark.django_db
+def test_demand_is_net_of_later_reductions_of_an_issue():
+    today = timezone.localdate()
+    product = Product.objects.create(sku='RP-4', name='Over-issued')
+    post_movements([Movement(product.id, Decimal('100'))])
+    entry = StockEntry.objects.create(entry_type=StockEntry.EntryType.OUT)
+    StockEntryLine.objects.create(stock_entry=entry, product=product, quantity=Decimal('28'))
+    entry.apply_to_inventory()
+    moved = timezone.make_aware(datetime.combine(today - timedelta(weeks=2), time(12)))
+    entry.ledger_rows.update(movement_date=moved)
+    # Corrected this week: the issue was 14, the repost gives 14 back today
+    entry.lines.update(quantity=Decimal('14'))
+    entry.apply_to_inventory(incremental=True)
+
+    product_ids, demand, by_site = weekly_demand(4, today=today)
+    assert product_ids.tolist() == [product.id]
+    assert demand.tolist() == [[0.0, 14.0, 0.0, 0.0]]
+    assert by_site == {(product.id, None): 14.0}
@@ -0,0 +1,130 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from inventory.models import Inventory, Product, ProductCost, StockLedger, StockLot, Warehouse
+from inventory.posting import Movement, post_movements
+from inventory.valuation import AVERAGE, FIFO, stream_valuation
+
+
+@pytest.fixture
+def client(db):
+    User = get_user_model()
+    api = APIClient()
+    api.force_authenticate(User.objects.create_user(username='mover', password='x', role=User.Roles.ADMIN))
+    return api
+
+
+def _inv(product, warehouse):
+    return Inventory.objects.get(product=product, warehouse=warehouse)
+
+
+@pytest.mark.django_db
+def test_transfer_posts_both_legs_and_tracks_in_transit(client):
+    main = Warehouse.objects.create(code='TR-MAIN', name='Main')
+    shop = Warehouse.objects.create(code='TR-SHOP', name='Shop')
+    tea = Product.objects.create(sku='TR-TEA', name='Tea')
+    client.post(reverse('stock-entry-list'), {
+        'entry_type': 'IN',
+        'lines': [{'product': tea.id, 'warehouse': main.id, 'quantity': '10', 'lot_number': 'T-1', 'expiry_date': '2027-03-01'}],
+    }, format='json')
+
+    response = client.post(reverse('stock-entry-list'), {
+        'entry_type': 'TRANSFER',
+        'lines': [{'product': tea.id, 'warehouse': main.id, 'to_warehouse': shop.id, 'quantity': '4', 'lot_number': 'T-1'}],
+    }, format='json')
+    assert response.status_code == 201
+    transfer_id = response.data['id']
+    legs = StockLedger.objects.filter(stock_entry_id=transfer_id).order_by('id')
+    assert [(row.warehouse_id, row.qty_change) for row in legs] == [(main.id, Decimal('-4')), (shop.id, Decimal('4'))]
+    assert _inv(tea, main).on_hand == Decimal('6')
+    arrived = _inv(tea, shop)
+    assert (arrived.on_hand, arrived.in_transit_qty, arrived.available_qty) == (Decimal('4'), Decimal('4'), Decimal('0'))
+    # The lot travels with the stock and keeps its expiry
+    assert StockLot.objects.get(product=tea, warehouse=shop, lot_number='T-1').expiry_date.isoformat() == '2027-03-01'
+    assert StockLot.objects.get(product=tea, warehouse=main, lot_number='T-1').qty == Decimal('6')
+
+    edit = client.patch(reverse('stock-entry-detail', args=[transfer_id]), {'remarks': 'x'}, format='json')
+    assert edit.status_code == 400
+    receive = reverse('stock-entry-receive', args=[transfer_id])
+    assert client.post(receive).status_code == 200
+    assert _inv(tea, shop).in_transit_qty == Decimal('0')
+    assert client.post(receive).status_code == 400
+
+    same_site = client.post(reverse('stock-entry-list'), {
+        'entry_type': 'TRANSFER', 'lines': [{'product': tea.id, 'warehouse': main.id, 'to_warehouse': main.id, 'quantity': '1'}],
+    }, format='json')
+    assert same_site.status_code == 400
+
+
+@pytest.mark.django_db
+def test_transfer_statement_count_is_independent_of_line_count(client):
+    main = Warehouse.objects.create(code='TQ-MAIN', name='Main')
+    counts = {}
+    for size in (10, 1000):
+        products = Product.objects.bulk_create([Product(sku=f'TQ{size}-{i}', name=f'Item {i}') for i in range(size)])
+        post_movements([Movement(p.id, Decimal('5'), warehouse_id=main.id) for p in products])
+        payload = {
+            'entry_type': 'TRANSFER',
+            'lines': [{'product': p.id, 'warehouse': main.id, 'quantity': '2'} for p in products],
+        }
+        with CaptureQueriesContext(connection) as ctx:
+            assert client.post(reverse('stock-entry-list'), payload, format='json').status_code == 201
+        counts[size] = len(ctx)
+        assert Inventory.objects.filter(product__in=products, warehouse__isnull=True, in_transit_qty=Decimal('2')).count() == size
+    # Nothing is issued per line: the growth is SQLite splitting the bulk writes (1,000 lines,
+    # 2,000 ledger rows) into 999-parameter batches, which PostgreSQL sends as single statements.
+    assert counts[1000] <= 120
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('rate', ['0', '20'])
+def test_transfer_leaves_product_value_and_cost_unchanged(client, rate):
+    main = Warehouse.objects.create(code='TV-MAIN', name='Main')
+    shop = Warehouse.objects.create(code='TV-SHOP', name='Shop')
+    oil = Product.objects.create(sku='TV-OIL', name='Oil', cost_price=Decimal('1.00'))
+    post_movements([Movement(oil.id, Decimal('10'), Decimal('5.00'), main.id)])
+    post_movements([Movement(oil.id, Decimal('10'), Decimal('8.00'), main.id)])
+
+    def figures():
+        fifo, average = (next(stream_valuation(method, [oil.id])) for method in (FIFO, AVERAGE))
+        return fifo.value, average.value, ProductCost.objects.get(product=oil).avg_cost, Product.objects.get(pk=oil.pk).cost_price
+
+    before = figures()
+    assert before == (Decimal('130.00'), Decimal('130.00'), Decimal('6.5'), Decimal('6.50'))
+    response = client.post(reverse('stock-entry-list'), {
+        'entry_type': 'TRANSFER',
+        'lines': [{'product': oil.id, 'warehouse': main.id, 'to_warehouse': shop.id, 'quantity': '10', 'rate': rate}],
+    }, format='json')
+    assert response.status_code == 201
+    assert _inv(oil, shop).on_hand == Decimal('10')
+    assert figures() == before
+
+
+@pytest.mark.django_db
+def test_lot_less_transfer_carries_the_fefo_picked_lots(client):
+    main = Warehouse.objects.create(code='TL-MAIN', name='Main')
+    shop = Warehouse.objects.create(code='TL-SHOP', name='Shop')
+    jam = Product.objects.create(sku='TL-JAM', name='Jam')
+    client.post(reverse('stock-entry-list'), {'entry_type': 'IN', 'lines': [
+        {'product': jam.id, 'warehouse': main.id, 'quantity': '3', 'lot_number': 'J-1', 'expiry_date': '2027-01-01'},
+        {'product': jam.id, 'warehouse': main.id, 'quantity': '5', 'lot_number': 'J-2', 'expiry_date': '2027-06-01'},
+        {'product': jam.id, 'warehouse': main.id, 'quantity': '2'},
+    ]}, format='json')
+
+    response = client.post(reverse('stock-entry-list'), {
+        'entry_type': 'TRANSFER', 'lines': [{'product': jam.id, 'warehouse': main.id, 'to_warehouse': shop.id, 'quantity': '6'}],
+    }, format='json')
+    assert response.status_code == 201
+    arrived = StockLot.objects.filter(product=jam, warehouse=shop).order_by('lot_number')
+    assert [(lot.lot_number, lot.qty, lot.expiry_date.isoformat()) for lot in arrived] == [
+        ('J-1', Decimal('3'), '2027-01-01'), ('J-2', Decimal('3'), '2027-06-01'),
+    ]
+    legs = StockLedger.objects.filter(stock_entry_id=response.data['id'], warehouse=shop)
+    assert sorted((row.lot.lot_number, row.qty_change) for row in legs) == [('J-1', Decimal('3')), ('J-2', Decimal('3'))]
+    assert _inv(jam, shop).on_hand == Decimal('6')
@@ -0,0 +1,49 @@
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from inventory.models import Product
+from inventory.posting import Movement, post_movements
+from inventory.valuation import AVERAGE, FIFO, stream_valuation
+
+
+@pytest.fixture
+def movements(db):
+    a = Product.objects.create(sku='VAL-A', name='Valued A', cost_price=Decimal('1.00'))
+    b = Product.objects.create(sku='VAL-B', name='Valued B')
+    post_movements([Movement(a.id, Decimal('10'), Decimal('5.00')), Movement(b.id, Decimal('4'), Decimal('2.00'))])
+    post_movements([Movement(a.id, Decimal('10'), Decimal('8.00'))])
+    post_movements([Movement(a.id, Decimal('-15'))])
+    post_movements([Movement(a.id, Decimal('2'))])  # zero-rate adjustment comes in at current cost
+    return a, b
+
+
+@pytest.mark.django_db
+def test_fifo_consumes_oldest_layers_first(movements):
+    a, b = movements
+    result = {v.product_id: v for v in stream_valuation(FIFO)}
+    # 5 units left from the 8.00 layer, plus 2 adjusted in at 8.00
+    assert result[a.id].qty == Decimal('7.000')
+    assert result[a.id].value == Decimal('56.00')
+    assert result[b.id].value == Decimal('8.00')
+
+
+@pytest.mark.django_db
+def test_moving_average_ignores_static_cost_price(movements):
+    a, _ = movements
+    result = {v.product_id: v for v in stream_valuation(AVERAGE)}
+    assert result[a.id].qty == Decimal('7.000')
+    assert result[a.id].value == Decimal('45.50')  # 7 x 6.50 average
+
+
+@pytest.mark.django_db
+def test_valuation_uses_a_constant_number_of_queries(movements):
+    for i in range(30):
+        p = Product.objects.create(sku=f'VAL-X{i}', name=f'Extra {i}')
+        post_movements([Movement(p.id, Decimal('1'), Decimal('3.00'))])
+    with CaptureQueriesContext(connection) as ctx:
+        rows = list(stream_valuation(FIFO))
+    assert len(rows) == 32
+    assert len(ctx) == 2  # one ordered pass each over the archive and the hot ledger
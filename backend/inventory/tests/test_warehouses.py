@@ -0,0 +1,62 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from inventory.models import Inventory, Product, StockBalance, StockEntry, StockLedger, Warehouse
+from inventory.posting import Movement, post_movements
+
+
+@pytest.fixture
+def sites(db):
+    return (
+        Warehouse.objects.create(code='BLR', name='Bengaluru'),
+        Warehouse.objects.create(code='DEL', name='Delhi'),
+    )
+
+
+@pytest.mark.django_db
+def test_postings_keep_separate_heads_and_running_balances_per_site(sites):
+    blr, dl = sites
+    product = Product.objects.create(sku='WH-1', name='Widget')
+    post_movements([
+        Movement(product.id, Decimal('10'), warehouse_id=blr.id),
+        Movement(product.id, Decimal('4'), warehouse_id=dl.id),
+        Movement(product.id, Decimal('2')),
+    ])
+    post_movements([Movement(product.id, Decimal('-3'), warehouse_id=blr.id)])
+
+    on_hand = {inv.warehouse_id: inv.on_hand for inv in Inventory.objects.filter(product=product)}
+    assert on_hand == {blr.id: Decimal('7'), dl.id: Decimal('4'), None: Decimal('2')}
+    heads = {head.warehouse_id: head.balance_qty for head in StockBalance.objects.filter(product=product)}
+    assert heads == on_hand
+    blr_running = StockLedger.objects.filter(product=product, warehouse=blr).order_by('id').values_list('balance_qty', flat=True)
+    assert list(blr_running) == [Decimal('10'), Decimal('7')]
+
+
+@pytest.mark.django_db
+def test_entry_lines_post_to_their_warehouse_and_stock_reads_per_site(sites):
+    blr, dl = sites
+    User = get_user_model()
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username='siteadmin', password='x', role=User.Roles.ADMIN))
+    product = Product.objects.create(sku='WH-2', name='Gadget')
+
+    payload = {
+        'entry_type': StockEntry.EntryType.IN,
+        'lines': [
+            {'product': product.id, 'warehouse': blr.id, 'quantity': '5', 'rate': '1.00'},
+            {'product': product.id, 'warehouse': dl.id, 'quantity': '8', 'rate': '1.00'},
+        ],
+    }
+    assert client.post(reverse('stock-entry-list'), payload, format='json').status_code == 201
+
+    url = reverse('stock-ledger-current-stock')
+    assert client.get(url).data == [{'product': product.id, 'balance': Decimal('13')}]
+    assert client.get(url, {'warehouse': dl.id}).data == [{'product': product.id, 'balance': Decimal('8')}]
+    assert client.get(url, {'warehouse': 'x'}).status_code == 400
+
+    rows = client.get(reverse('inventory-list'), {'warehouse': blr.id}).data['results']
+    assert [(row['warehouse'], row['on_hand']) for row in rows] == [(blr.id, '5.000')]
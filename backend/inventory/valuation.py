@@ -0,0 +1,166 @@
+"""Streaming inventory valuation (FIFO and moving average).
+
+Valuation makes one pass over StockLedger ordered by (product, movement_date,
+id), which the (product, movement_date) index serves, merged with the same
+ordered pass over StockLedgerArchive, and values each product from the
+ledger `rate` column. Rows are consumed from a chunked iterator and
+only the state of the product being read is kept in memory (a deque of FIFO
+layers or a quantity/value pair), so memory stays bounded and the query count
+stays constant however many products are valued.
+
+Rules shared by both methods:
+- incoming rows with a zero rate (e.g. positive adjustments) come in at the
+  current cost (moving average, or the newest FIFO layer);
+- outgoing rows leave at cost, ignoring their rate;
+- stock driven negative is valued at the last known cost until receipts
+  cover it;
+- TRANSFER legs are left out: they move stock between warehouses, and the
+  product's quantity, layers and average are the same on both sides.
+
+The current moving-average cost is also kept per product in ProductCost by
+the posting engine (through the same `average_step`), so "average, now" is
+a plain read of the balance heads via `current_valuation`; the ledger pass
+serves FIFO, `as_of` and rebuilds.
+"""
+from __future__ import annotations
+
+import heapq
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterable, Iterator
+
+from django.db.models import DecimalField, Sum
+from django.db.models.functions import Coalesce
+
+from .models import StockBalance, StockEntry, StockLedger, StockLedgerArchive
+
+FIFO = 'fifo'
+AVERAGE = 'average'
+METHODS = (FIFO, AVERAGE)
+
+ZERO = Decimal('0')
+MONEY_PLACES = Decimal('0.01')
+COST_FIELD = DecimalField(max_digits=20, decimal_places=6)
+
+
+@dataclass(frozen=True)
+class ProductValuation:
+    product_id: int
+    sku: str
+    qty: Decimal
+    value: Decimal
+
+
+def _value_fifo(rows: Iterable[tuple[Decimal, Decimal]]) -> tuple[Decimal, Decimal]:
+    layers: deque[list[Decimal]] = deque()  # [qty, rate]; a negative qty is uncovered stock
+    last_rate = ZERO
+    for qty_change, rate in rows:
+        if qty_change > 0:
+            cost = rate or last_rate
+            qty = qty_change
+            while qty > 0 and layers and layers[0][0] < 0:
+                settle = min(qty, -layers[0][0])
+                layers[0][0] += settle
+                qty -= settle
+                if not layers[0][0]:
+                    layers.popleft()
+            if qty > 0:
+                layers.append([qty, cost])
+            last_rate = cost
+        elif qty_change < 0:
+            qty = -qty_change
+            while qty > 0 and layers and layers[0][0] > 0:
+                take = min(qty, layers[0][0])
+                layers[0][0] -= take
+                qty -= take
+                if not layers[0][0]:
+                    layers.popleft()
+            if qty > 0:
+                layers.append([-qty, last_rate])
+    qty = sum((layer[0] for layer in layers), ZERO)
+    value = sum((layer[0] * layer[1] for layer in layers), ZERO)
+    return qty, value
+
+
+def average_step(qty: Decimal, value: Decimal, avg: Decimal, qty_change: Decimal, rate: Decimal) -> tuple[Decimal, Decimal, Decimal]:
+    """Apply one ledger row to a moving-average (qty, value, average cost) state."""
+    if qty_change > 0:
+        value += qty_change * (rate or avg)
+    else:
+        value += qty_change * avg
+    qty += qty_change
+    if qty > 0:
+        avg = value / qty
+    else:
+        value = qty * avg
+    return qty, value, avg
+
+
+def _average_state(rows: Iterable[tuple[Decimal, Decimal]]) -> tuple[Decimal, Decimal, Decimal]:
+    qty = value = avg = ZERO
+    for qty_change, rate in rows:
+        qty, value, avg = average_step(qty, value, avg, qty_change, rate)
+    return qty, value, avg
+
+
+def _value_average(rows: Iterable[tuple[Decimal, Decimal]]) -> tuple[Decimal, Decimal]:
+    qty, value, _ = _average_state(rows)
+    return qty, value
+
+
+def _ledger_rows(product_ids=None, as_of: datetime | None = None) -> Iterator[tuple]:
+    """(product_id, movement_date, id, sku, qty_change, rate) over archive and hot ledger, in valuation order."""
+    streams = []
+    for model in (StockLedgerArchive, StockLedger):
+        rows = model.objects.exclude(stock_entry__entry_type=StockEntry.EntryType.TRANSFER)
+        rows = rows.order_by('product_id', 'movement_date', 'id')
+        if product_ids is not None:
+            rows = rows.filter(product_id__in=product_ids)
+        if as_of is not None:
+            rows = rows.filter(movement_date__lte=as_of)
+        fields = ('product_id', 'movement_date', 'id', 'product__sku', 'qty_change', 'rate')
+        streams.append(rows.values_list(*fields).iterator(chunk_size=5000))
+    return heapq.merge(*streams, key=itemgetter(0, 1, 2))
+
+
+def stream_valuation(method: str = AVERAGE, product_ids=None, as_of: datetime | None = None) -> Iterator[ProductValuation]:
+    """Yield one ProductValuation per product with ledger history, in product id order."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown valuation method '{method}'")
+    value_rows = _value_fifo if method == FIFO else _value_average
+
+    for (product_id, sku), group in groupby(_ledger_rows(product_ids, as_of), key=itemgetter(0, 3)):
+        qty, value = value_rows((qty_change, rate) for *_, qty_change, rate in group)
+        yield ProductValuation(product_id, sku, qty, value.quantize(MONEY_PLACES))
+
+
+def average_costs(product_ids) -> dict[int, tuple[Decimal, Decimal, Decimal]]:
+    """Replay the ledger of `product_ids` into moving-average (qty, value, average cost) states."""
+    return {
+        product_id: _average_state((qty_change, rate) for *_, qty_change, rate in group)
+        for product_id, group in groupby(_ledger_rows(product_ids), key=itemgetter(0))
+    }
+
+
+def current_valuation(product_ids=None) -> Iterator[ProductValuation]:
+    """Moving-average valuation now, with no ledger scan.
+
+    Quantity is the sum of the product's balance heads; it is valued at the
+    average posting keeps in ProductCost, or at Product.cost_price for a
+    product never received at a price.
+    """
+    heads = StockBalance.objects.order_by('product_id')
+    if product_ids is not None:
+        heads = heads.filter(product_id__in=product_ids)
+    rows = (
+        heads.annotate(avg=Coalesce('product__cost__avg_cost', 'product__cost_price', output_field=COST_FIELD))
+        .values('product_id', 'product__sku', 'avg')
+        .annotate(qty=Sum('balance_qty'))
+        .values_list('product_id', 'product__sku', 'qty', 'avg')
+    )
+    for product_id, sku, qty, avg in rows.iterator():
+        yield ProductValuation(product_id, sku, qty, (qty * avg).quantize(MONEY_PLACES))
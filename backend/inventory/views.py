@@ -1,15 +1,38 @@
 from rest_framework import viewsets, filters, status
 from rest_framework.pagination import PageNumberPagination
 
-from .models import Product, Inventory, StockEntry, StockLedger
-from .serializers import ProductSerializer, InventorySerializer, StockEntrySerializer, StockLedgerSerializer
+from .adjustments import csv_rows, post_adjustments
+from .balances import ledger_balances
+from .posting import receive_transfer
+from .pricing import activate_due_price_lists, apply_prices, clean_price, stage_price_list
+from .models import Product, Inventory, LowStockAlert, StockEntry, StockLedger, Warehouse
+from .serializers import (
+    ProductSerializer, InventorySerializer, StockEntrySerializer, StockLedgerSerializer, WarehouseSerializer,
+)
+from .valuation import AVERAGE, METHODS, current_valuation, stream_valuation
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Sum, F
+from datetime import datetime, time
 from decimal import Decimal
 
-from authentication.mixins import RoleScopedQuerysetMixin
-from authentication.permissions import RoleScopedPermission, IsManagerOrAdmin
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from authentication.mixins import RoleScopedQuerysetMixin, scope_queryset_for_user
+from authentication.permissions import RoleScopedPermission, IsManagerOrAdmin, IsAdmin
+
+
+def _parse_as_of(value: str):
+    """Parse an as_of query param; a bare date means the end of that day."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            return None
+        parsed = datetime.combine(day, time.max)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
 
 
 class DefaultPagination(PageNumberPagination):
@@ -25,9 +48,19 @@ class ProductViewSet(RoleScopedQuerysetMixin, viewsets.ModelViewSet):
     pagination_class = DefaultPagination
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['sku', 'name', 'description', 'hsn_code']
-    ordering_fields = ['name', 'sku', 'created_at', 'updated_at']
+    ordering_fields = ['name', 'sku', 'abc_class', 'xyz_class', 'created_at', 'updated_at']
     ordering = ['name']
 
+    def get_queryset(self):
+        """Filter by ?abc_class= and/or ?xyz_class= (comma-separated, e.g. abc_class=A,B)."""
+        qs = super().get_queryset()
+        params = self.request.query_params
+        for field in ('abc_class', 'xyz_class'):
+            value = params.get(field)
+            if value:
+                qs = qs.filter(**{f'{field}__in': [v.strip().upper() for v in value.split(',') if v.strip()]})
+        return qs
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user, updated_by=self.request.user)
 
@@ -36,26 +69,72 @@ class ProductViewSet(RoleScopedQuerysetMixin, viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'], url_path='bulk-price-update', permission_classes=[RoleScopedPermission, IsManagerOrAdmin])
     def bulk_price_update(self, request):
-        updates = request.data.get('updates', [])
-        changed = []
-        for upd in updates:
+        """
+        Reprice many products at once: {"updates": [{"id": .., "selling_price": ..}], "effective_from"?: "YYYY-MM-DD"}.
+
+        Prices are rounded to cents; negative or out-of-range prices are skipped.
+        All ids are resolved in one scoped query and written with bulk_update.
+        With a future effective_from the prices are staged as a PriceList instead
+        and applied by activate-price-lists (or the activate_price_lists command).
+        """
+        prices = {}
+        for upd in request.data.get('updates', []):
             pid = upd.get('id')
             price = upd.get('selling_price')
             if pid and price is not None:
                 try:
-                    obj = self.get_queryset().get(id=pid)
-                    self.check_object_permissions(request, obj)
-                    obj.selling_price = price
-                    obj.updated_by = request.user
-                    obj.save(update_fields=['selling_price', 'updated_at', 'updated_by'])
-                    changed.append(obj.id)
-                except Product.DoesNotExist:
+                    pid = int(pid)
+                except (TypeError, ValueError):
                     continue
+                price = clean_price(price)
+                if price is not None:
+                    prices[pid] = price
+        effective_from = None
+        if request.data.get('effective_from'):
+            effective_from = parse_date(str(request.data['effective_from']))
+            if effective_from is None:
+                return Response({'detail': 'effective_from must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+        products = list(self.get_queryset().filter(id__in=list(prices)))
+        for obj in products:
+            self.check_object_permissions(request, obj)
+        if effective_from and effective_from > timezone.localdate():
+            price_list = stage_price_list(
+                {obj.id: prices[obj.id] for obj in products},
+                effective_from=effective_from,
+                name=request.data.get('name', ''),
+                user=request.user,
+            )
+            return Response({'staged': price_list.id, 'effective_from': effective_from, 'products': [obj.id for obj in products]},
+                            status=status.HTTP_201_CREATED)
+        changed = apply_prices(products, prices, user=request.user)
         return Response({'updated': changed}, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], url_path='activate-price-lists', permission_classes=[RoleScopedPermission, IsAdmin])
+    def activate_price_lists(self, request):
+        activated, repriced = activate_due_price_lists(user=request.user)
+        return Response({'activated': activated, 'repriced': repriced}, status=status.HTTP_200_OK)
+
+
+class WarehouseViewSet(RoleScopedQuerysetMixin, viewsets.ModelViewSet):
+    queryset = Warehouse.objects.all().select_related('created_by', 'updated_by')
+    serializer_class = WarehouseSerializer
+    permission_classes = [RoleScopedPermission]
+    pagination_class = DefaultPagination
+    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    search_fields = ['code', 'name', 'city']
+    ordering_fields = ['code', 'name', 'created_at']
+    ordering = ['code']
+
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user, updated_by=self.request.user)
+
+    def perform_update(self, serializer):
+        serializer.save(updated_by=self.request.user)
+
 
 class InventoryViewSet(RoleScopedQuerysetMixin, viewsets.ModelViewSet):
-    queryset = Inventory.objects.select_related('product', 'created_by', 'updated_by').all()
+    queryset = Inventory.objects.select_related('product', 'warehouse', 'created_by', 'updated_by').all()
     serializer_class = InventorySerializer
     permission_classes = [RoleScopedPermission]
     pagination_class = DefaultPagination
@@ -64,6 +143,13 @@ class InventoryViewSet(RoleScopedQuerysetMixin, viewsets.ModelViewSet):
     ordering_fields = ['product__name', 'on_hand', 'reorder_level', 'created_at', 'updated_at']
     ordering = ['product__name']
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        warehouse = self.request.query_params.get('warehouse')
+        if warehouse and warehouse.isdigit():
+            qs = qs.filter(warehouse_id=int(warehouse))
+        return qs
+
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user, updated_by=self.request.user)
 
@@ -82,18 +168,28 @@ class StockEntryViewSet(RoleScopedQuerysetMixin, viewsets.ModelViewSet):
     ordering = ['-entry_date']
 
     def perform_create(self, serializer):
-        entry = serializer.save(created_by=self.request.user, updated_by=self.request.user)
-        # apply_to_inventory already invoked in serializer
-        entry.apply_to_inventory()
+        # The serializer posts the new entry to inventory
+        serializer.save(created_by=self.request.user, updated_by=self.request.user)
 
     def perform_update(self, serializer):
-        entry = serializer.save(updated_by=self.request.user)
-        entry.apply_to_inventory()
+        # The serializer re-posts only the delta of the edit
+        serializer.save(updated_by=self.request.user)
 
     @action(detail=True, methods=['post'], url_path='submit', permission_classes=[RoleScopedPermission, IsManagerOrAdmin])
     def submit_entry(self, request, pk=None):
         entry = self.get_object()
-        entry.apply_to_inventory()
+        # Idempotent: posts whatever part of the entry is not yet on the ledger
+        entry.apply_to_inventory(incremental=True)
+        return Response(self.get_serializer(entry).data, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], url_path='receive', permission_classes=[RoleScopedPermission, IsManagerOrAdmin])
+    def receive(self, request, pk=None):
+        """Confirm a TRANSFER arrived at its destination, releasing its in-transit quantity."""
+        entry = self.get_object()
+        if entry.entry_type != StockEntry.EntryType.TRANSFER:
+            return Response({'detail': 'Only transfers can be received.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not receive_transfer(entry, user=request.user):
+            return Response({'detail': 'Transfer already received.'}, status=status.HTTP_400_BAD_REQUEST)
         return Response(self.get_serializer(entry).data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], url_path='cancel', permission_classes=[RoleScopedPermission, IsManagerOrAdmin])
@@ -103,27 +199,30 @@ class StockEntryViewSet(RoleScopedQuerysetMixin, viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'], url_path='bulk-adjust', permission_classes=[RoleScopedPermission, IsManagerOrAdmin])
     def bulk_adjust(self, request):
-        adjustments = request.data.get('adjustments', [])
-        created_ids = []
-        for adj in adjustments:
-            try:
-                product_id = adj['product']
-                qty = Decimal(str(adj.get('quantity', '0')))
-            except Exception:
-                continue
-            if qty == 0:
-                continue
-            entry = StockEntry.objects.create(
-                entry_type=StockEntry.EntryType.ADJUST,
-                remarks='Bulk adjustment',
-                created_by=request.user,
-                updated_by=request.user,
+        """
+        Post a cycle count as one multi-line ADJUST entry.
+
+        Accepts JSON {"adjustments": [{"product": id | "sku": code, "quantity": signed, "rate"?}]}
+        or a multipart upload `file` (CSV with the same columns), which is streamed.
+        An optional `warehouse` id applies the count to that site.
+        Valid rows are posted; invalid ones are returned in `errors` with their row number.
+        """
+        warehouse_id = request.data.get('warehouse') or None
+        if warehouse_id is not None:
+            if not str(warehouse_id).isdigit() or not Warehouse.objects.filter(pk=int(warehouse_id)).exists():
+                return Response({'detail': 'Unknown warehouse'}, status=status.HTTP_400_BAD_REQUEST)
+            warehouse_id = int(warehouse_id)
+        upload = request.FILES.get('file')
+        rows = csv_rows(upload) if upload else request.data.get('adjustments', [])
+        try:
+            entry, line_count, errors = post_adjustments(
+                rows, user=request.user, remarks=request.data.get('remarks') or 'Bulk adjustment', warehouse_id=warehouse_id
             )
-            StockEntryLine = entry.lines.model
-            StockEntryLine.objects.create(stock_entry=entry, product_id=product_id, quantity=qty)
-            entry.apply_to_inventory()
-            created_ids.append(entry.id)
-        return Response({'created': created_ids}, status=status.HTTP_201_CREATED)
+        except UnicodeDecodeError:
+            return Response({'detail': 'The uploaded file must be UTF-8 encoded CSV'}, status=status.HTTP_400_BAD_REQUEST)
+        created_ids = [entry.id] if entry else []
+        code = status.HTTP_400_BAD_REQUEST if errors and not entry else status.HTTP_201_CREATED
+        return Response({'created': created_ids, 'lines': line_count, 'errors': errors}, status=code)
 
 
 class StockLedgerViewSet(RoleScopedQuerysetMixin, viewsets.ReadOnlyModelViewSet):
@@ -136,34 +235,106 @@ class StockLedgerViewSet(RoleScopedQuerysetMixin, viewsets.ReadOnlyModelViewSet)
     ordering_fields = ['movement_date', 'qty_change']
     ordering = ['-movement_date']
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        warehouse = self.request.query_params.get('warehouse')
+        if warehouse and warehouse.isdigit():
+            qs = qs.filter(warehouse_id=int(warehouse))
+        return qs
+
+    def _warehouse_param(self):
+        """The `warehouse` query param as an id, None when absent; raises ValueError when malformed."""
+        value = self.request.query_params.get('warehouse')
+        if not value:
+            return None
+        if not value.isdigit():
+            raise ValueError(value)
+        return int(value)
+
+    def _visible_product_ids(self):
+        """Products whose stock the user may see: every product for admins, otherwise
+        the products appearing in the user's scoped ledger rows (as a subquery).
+
+        The scope is applied directly rather than through get_queryset, whose
+        audit log counts the whole scoped ledger on every call."""
+        user = self.request.user
+        if user.is_admin():
+            return None
+        scoped = scope_queryset_for_user(
+            user, StockLedger.objects.all(),
+            owner_field=self._get_owner_lookup(), department_field=self._get_department_lookup(),
+        )
+        return scoped.order_by().values('product').distinct()
+
     @action(detail=False, methods=['get'], url_path='current-stock')
     def current_stock(self, request):
-        qs = self.get_queryset().values('product').order_by('product').annotate(balance=Sum('qty_change'))
-        return Response(list(qs), status=status.HTTP_200_OK)
+        """
+        Balance per product. Optional query params:
+        - product: restrict to one product id
+        - as_of: YYYY-MM-DD (end of that day) or an ISO datetime for a point-in-time balance
+        - warehouse: balance at one site only (default: all sites summed)
+        """
+        try:
+            warehouse_id = self._warehouse_param()
+        except ValueError:
+            return Response({'detail': 'warehouse must be an id'}, status=status.HTTP_400_BAD_REQUEST)
+        as_of = None
+        as_of_param = request.query_params.get('as_of')
+        if as_of_param:
+            as_of = _parse_as_of(as_of_param)
+            if as_of is None:
+                return Response({'detail': 'as_of must be YYYY-MM-DD or an ISO datetime'}, status=status.HTTP_400_BAD_REQUEST)
+        product_ids = self._visible_product_ids()
+        product_param = request.query_params.get('product')
+        if product_param:
+            if not product_param.isdigit():
+                return Response({'detail': 'product must be an id'}, status=status.HTTP_400_BAD_REQUEST)
+            visible = product_ids is None or product_ids.filter(product=int(product_param)).exists()
+            product_ids = [int(product_param)] if visible else []
+        balances = ledger_balances(product_ids, as_of=as_of, warehouse_id=warehouse_id)
+        data = [{'product': pid, 'balance': qty} for pid, qty in sorted(balances.items())]
+        return Response(data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'], url_path='low-stock')
     def low_stock(self, request):
         threshold = Decimal(request.query_params.get('threshold', '0'))
-        # Summarize ledger balances
-        base_qs = self.get_queryset()
-        balances = base_qs.values('product').annotate(balance=Sum('qty_change'))
-        product_map = {b['product']: b['balance'] for b in balances}
-        allowed_product_ids = list(product_map.keys())
-        low = []
-        for inv in Inventory.objects.select_related('product').filter(product_id__in=allowed_product_ids):
-            bal = product_map.get(inv.product_id, Decimal('0'))
-            if inv.reorder_level and bal <= inv.reorder_level and bal <= threshold:
-                low.append({'product': inv.product_id, 'sku': inv.product.sku, 'name': inv.product.name, 'balance': bal})
+        # Read from the maintained alert index instead of scanning Inventory
+        alerts = LowStockAlert.objects.select_related('product', 'inventory').filter(inventory__on_hand__lte=threshold)
+        try:
+            warehouse_id = self._warehouse_param()
+        except ValueError:
+            return Response({'detail': 'warehouse must be an id'}, status=status.HTTP_400_BAD_REQUEST)
+        if warehouse_id is not None:
+            alerts = alerts.filter(inventory__warehouse_id=warehouse_id)
+        visible = self._visible_product_ids()
+        if visible is not None:
+            alerts = alerts.filter(product_id__in=visible)
+        low = [
+            {'product': a.product_id, 'warehouse': a.inventory.warehouse_id, 'sku': a.product.sku,
+             'name': a.product.name, 'balance': a.inventory.on_hand}
+            for a in alerts.order_by('product_id', 'inventory__warehouse_id')
+        ]
         return Response(low, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['get'], url_path='valuation')
     def valuation(self, request):
-        # Simple average cost * qty approach placeholder
-        qs = self.get_queryset().values('product').annotate(qty=Sum('qty_change'))
-        data = []
-        for row in qs:
-            product = Product.objects.get(id=row['product'])
-            qty = row['qty'] or Decimal('0')
-            value = qty * (product.cost_price or Decimal('0'))
-            data.append({'product': product.id, 'sku': product.sku, 'qty': qty, 'value': value})
+        """
+        Stock value per product. Query params: method=average (default) or fifo;
+        as_of as for current-stock. The current moving average is read from the
+        per-product cost figures posting maintains; FIFO and as_of stream the ledger.
+        """
+        method = request.query_params.get('method', AVERAGE)
+        if method not in METHODS:
+            return Response({'detail': f"method must be one of: {', '.join(METHODS)}"}, status=status.HTTP_400_BAD_REQUEST)
+        as_of = None
+        as_of_param = request.query_params.get('as_of')
+        if as_of_param:
+            as_of = _parse_as_of(as_of_param)
+            if as_of is None:
+                return Response({'detail': 'as_of must be YYYY-MM-DD or an ISO datetime'}, status=status.HTTP_400_BAD_REQUEST)
+        if method == AVERAGE and as_of is None:
+            rows = current_valuation(self._visible_product_ids())
+        else:
+            rows = stream_valuation(method, self._visible_product_ids(), as_of=as_of)
+        data = [{'product': row.product_id, 'sku': row.sku, 'qty': row.qty, 'value': row.value} for row in rows]
         return Response(data, status=status.HTTP_200_OK)
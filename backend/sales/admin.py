@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Customer
+from .models import ADDRESS_PART_FIELDS, Customer
 
 
 @admin.register(Customer)
@@ -10,13 +10,13 @@ class CustomerAdmin(admin.ModelAdmin):
         'credit_limit', 'payment_terms', 'created_at', 'updated_at'
     )
     search_fields = ('customer_code', 'name', 'phone', 'email', 'gstin')
-    list_filter = ('is_active', 'state_code')
-    readonly_fields = ('created_at', 'updated_at', 'created_by', 'updated_by')
+    list_filter = ('is_active', 'state_code', 'billing_state')
+    readonly_fields = (*ADDRESS_PART_FIELDS, 'created_at', 'updated_at', 'created_by', 'updated_by')
 
     fieldsets = (
         ('Identity', {'fields': ('customer_code', 'name', 'is_active')}),
         ('Contacts', {'fields': ('contact_person', 'phone', 'email')}),
-        ('Addresses', {'fields': ('billing_address', 'shipping_address')}),
+        ('Addresses', {'fields': ('billing_address', 'shipping_address', *ADDRESS_PART_FIELDS)}),
         ('Tax', {'fields': ('gstin', 'state_code')}),
         ('Credit & Terms', {'fields': ('credit_limit', 'payment_terms')}),
         ('Audit', {'classes': ('collapse',), 'fields': ('created_at', 'updated_at', 'created_by', 'updated_by')}),
@@ -0,0 +1,83 @@
+"""Credit-limit checks for sales order confirmation.
+
+A customer's exposure is the maintained CustomerExposure row: unpaid AR
+invoices (`outstanding`) plus confirmed sales orders (`open_orders`).
+Confirming an order locks the customer's row, admits the order when the
+exposure plus the order total stays within `Customer.credit_limit`, and
+adds the total to `open_orders` under the same lock. The cost is the same
+however long the customer's history is. Concurrent confirms for one
+customer queue on the lock instead of both passing a stale check. A credit
+limit of zero means no limit.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Iterable
+
+from django.utils import timezone
+
+from accounting.exposure import lock_exposure
+from accounting.models import CustomerExposure
+
+# (customer_id, amount counted in open_orders) of a confirmed order
+Commitment = tuple[int, Decimal]
+
+
+class CreditLimitExceeded(ValueError):
+    """Confirming the order would take the customer past their credit limit."""
+
+
+def _save(rows) -> None:
+    now = timezone.now()
+    for row in rows:
+        row.updated_at = now
+    CustomerExposure.objects.bulk_update(list(rows), ['open_orders', 'updated_at'], batch_size=1000)
+
+
+def admit_orders(orders: Iterable[tuple[int, int, Decimal]]) -> tuple[list[int], list[int]]:
+    """Admit (order_id, customer_id, amount) against credit in the given order.
+
+    Returns (admitted, over_limit) order ids. The admitted amounts are added to
+    `open_orders` before the locks are released with the transaction.
+    """
+    orders = list(orders)
+    exposure = lock_exposure(customer_id for _, customer_id, _ in orders)
+    admitted, over_limit = [], []
+    for order_id, customer_id, amount in orders:
+        row = exposure[customer_id]
+        if amount > 0 and row.credit_limit and row.total + amount > row.credit_limit:
+            over_limit.append(order_id)
+            continue
+        row.open_orders += amount
+        admitted.append(order_id)
+    _save(exposure.values())
+    return admitted, over_limit
+
+
+def release_orders(amounts: dict[int, Decimal]) -> None:
+    """Take `amounts` (customer id -> total) of orders leaving the confirmed state off `open_orders`."""
+    amounts = {customer_id: amount for customer_id, amount in amounts.items() if amount}
+    exposure = lock_exposure(amounts)
+    for customer_id, row in exposure.items():
+        row.open_orders -= amounts[customer_id]
+    _save(exposure.values())
+
+
+def recommit_order(order_id: int, before: Commitment | None, after: Commitment | None) -> None:
+    """Move an order's `open_orders` share from `before` to `after` (None: not confirmed).
+
+    The exposure rows of both customers are locked together, in customer id
+    order, so a concurrent edit moving an order the other way cannot deadlock.
+    Raises CreditLimitExceeded when the share grows past the customer's limit.
+    """
+    exposure = lock_exposure(customer_id for customer_id, _ in filter(None, (before, after)))
+    if before:
+        exposure[before[0]].open_orders -= before[1]
+    if after:
+        customer_id, amount = after
+        row = exposure[customer_id]
+        grows = not before or before[0] != customer_id or amount > before[1]
+        if grows and amount > 0 and row.credit_limit and row.total + amount > row.credit_limit:
+            raise CreditLimitExceeded('Order exceeds the customer credit limit.')
+        row.open_orders += amount
+    _save(exposure.values())
@@ -0,0 +1,204 @@
+"""Bulk import of customers from CSV, JSON Lines or JSON array files.
+
+`Customer.save` runs `full_clean`, which costs a uniqueness query per row;
+loading a legacy customer master that way takes hours. `import_customers`
+streams the input instead and validates each row in Python with the
+Customer model's own validators, including the GSTIN check character. Rows
+are handled in chunks: one `IN` query per chunk finds the customer codes
+that already exist, and the valid rows are written with `bulk_create`. Rows that fail are written, with their errors, to a CSV
+result file, and the rest of the file is still imported.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import IO, Iterable, Iterator
+
+from django.core.exceptions import ValidationError
+from django.core.validators import EmailValidator
+from django.db import IntegrityError, transaction
+
+from utils.gst_utils import gstin_error, is_valid_state_code
+
+from .models import Customer, validate_phone
+
+CHUNK_SIZE = 1000
+FORMATS = ('csv', 'jsonl', 'json')
+TEXT_LIMITS = {'customer_code': 32, 'name': 255, 'contact_person': 100, 'email': 254}
+TEXT_FIELDS = ('customer_code', 'name', 'contact_person', 'phone', 'email', 'billing_address',
+               'shipping_address', 'gstin', 'state_code')
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f'}
+CREDIT_LIMIT_MAX = Decimal('999999999999.99')  # max_digits=14, decimal_places=2
+RESULT_COLUMNS = ('row', 'customer_code', 'errors')
+
+validate_email = EmailValidator()
+
+
+@dataclass(frozen=True)
+class ImportResult:
+    total: int
+    created: int
+    failed: int
+
+
+def read_rows(stream: IO[str], fmt: str) -> Iterator[dict]:
+    """Yield the records of a CSV (with header), JSON Lines or JSON array text stream."""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+    elif fmt == 'jsonl':
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+    elif fmt == 'json':
+        yield from _json_array(stream)
+    else:
+        raise ValueError(f"Unknown import format '{fmt}'; expected one of {', '.join(FORMATS)}.")
+
+
+def _json_array(stream: IO[str], read_size: int = 1 << 16) -> Iterator[dict]:
+    """Decode the elements of a top-level JSON array one at a time."""
+    decoder = json.JSONDecoder()
+    buffer, position, started = '', 0, False
+    while True:
+        chunk = stream.read(read_size)
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and (buffer[position].isspace() or buffer[position] in ',]'):
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != '[':
+                    raise ValueError('JSON input must be an array of customer objects.')
+                started, position = True, position + 1
+                continue
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    if buffer[position:].strip():
+                        raise
+                    return
+                break  # the element continues in the next chunk
+            yield record
+
+
+def clean_row(raw: dict) -> tuple[dict, dict[str, str]]:
+    """Normalised Customer field values for `raw` and the errors found, per field."""
+    values, errors = {}, {}
+    for field in TEXT_FIELDS:
+        value = raw.get(field)
+        values[field] = '' if value is None else str(value).strip()
+    for field, limit in TEXT_LIMITS.items():
+        if len(values[field]) > limit:
+            errors[field] = f'At most {limit} characters.'
+    for field in ('customer_code', 'name'):
+        if not values[field]:
+            errors[field] = 'This field is required.'
+
+    if values['phone'] and not validate_phone.regex.match(values['phone']):
+        errors['phone'] = validate_phone.message
+    if values['email']:
+        try:
+            validate_email(values['email'])
+        except ValidationError:
+            errors['email'] = 'Enter a valid email address.'
+    values['gstin'] = values['gstin'].upper() or None
+    if values['gstin'] and (problem := gstin_error(values['gstin'])):
+        errors['gstin'] = problem
+    if values['state_code'] and not is_valid_state_code(values['state_code']):
+        errors['state_code'] = f"Unknown GST state code '{values['state_code']}'."
+    elif values['gstin'] and 'gstin' not in errors:
+        # The GSTIN starts with the state code; fill it in or check it agrees
+        if not values['state_code']:
+            values['state_code'] = values['gstin'][:2]
+        elif values['state_code'] != values['gstin'][:2]:
+            errors['state_code'] = 'State code does not match the GSTIN.'
+
+    credit_limit = str(raw.get('credit_limit') or '0').strip()
+    try:
+        values['credit_limit'] = Decimal(credit_limit).quantize(Decimal('0.01'))
+        if not Decimal('0') <= values['credit_limit'] <= CREDIT_LIMIT_MAX:
+            errors['credit_limit'] = 'Must be between 0 and 999999999999.99.'
+    except InvalidOperation:
+        errors['credit_limit'] = 'Enter a number.'
+    payment_terms = str(raw.get('payment_terms') or '0').strip()
+    if payment_terms.isdigit() and int(payment_terms) <= 3650:
+        values['payment_terms'] = int(payment_terms)
+    else:
+        errors['payment_terms'] = 'Enter a whole number of days from 0 to 3650.'
+    is_active = str(raw.get('is_active', '')).strip().lower()
+    if is_active in TRUE_VALUES or not is_active:
+        values['is_active'] = True
+    elif is_active in FALSE_VALUES:
+        values['is_active'] = False
+    else:
+        errors['is_active'] = 'Enter true or false.'
+    return values, errors
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[list[tuple[int, dict]]]:
+    numbered = enumerate(rows, start=1)
+    while chunk := list(islice(numbered, size)):
+        yield chunk
+
+
+def _insert(customers: list[Customer], codes: set[str]) -> set[str]:
+    """Insert `customers` in one transaction; returns the codes that already existed instead.
+
+    The chunk's IN check normally finds every conflict. If another writer
+    inserts one of the codes in between, the chunk is checked again and
+    retried without it.
+    """
+    for _ in range(2):
+        taken = set(Customer.objects.filter(customer_code__in=codes).values_list('customer_code', flat=True))
+        fresh = [customer for customer in customers if customer.customer_code not in taken]
+        try:
+            with transaction.atomic():
+                Customer.objects.bulk_create(fresh, batch_size=CHUNK_SIZE)
+            return taken
+        except IntegrityError:
+            continue
+    raise IntegrityError('Customer codes kept colliding with concurrent inserts; retry the import.')
+
+
+def import_customers(rows: Iterable[dict], errors_out: IO[str], *, user=None, chunk_size: int = CHUNK_SIZE) -> ImportResult:
+    """Validate and insert `rows`; rows that fail go to `errors_out` as CSV (row, customer_code, errors)."""
+    writer = csv.writer(errors_out)
+    writer.writerow(RESULT_COLUMNS)
+    seen: set[str] = set()
+    total = created = failed = 0
+
+    def fail(number, code, problems):
+        nonlocal failed
+        failed += 1
+        writer.writerow([number, code, '; '.join(f'{field}: {message}' for field, message in problems.items())])
+
+    for chunk in _chunks(rows, chunk_size):
+        total += len(chunk)
+        valid: dict[str, tuple[int, Customer]] = {}
+        for number, raw in chunk:
+            if not isinstance(raw, dict):
+                fail(number, '', {'row': 'Expected an object with customer fields.'})
+                continue
+            values, problems = clean_row(raw)
+            code = values['customer_code']
+            if not problems and code in seen:
+                problems['customer_code'] = 'Duplicate customer code in the import file.'
+            if problems:
+                fail(number, code, problems)
+                continue
+            seen.add(code)
+            customer = Customer(created_by=user, updated_by=user, **values)
+            customer.parse_addresses()
+            valid[code] = (number, customer)
+        if not valid:
+            continue
+        taken = _insert([customer for _, customer in valid.values()], set(valid))
+        for code in sorted(taken, key=lambda code: valid[code][0]):
+            fail(valid[code][0], code, {'customer_code': 'Customer with this code already exists.'})
+        created += len(valid) - len(taken)
+    return ImportResult(total=total, created=created, failed=failed)
@@ -0,0 +1,90 @@
+"""Batch writes of sales order lines.
+
+`SalesOrderLine.save` recalculates the parent order from all of its lines,
+which is right for a single edit but makes writing n lines cost n full line
+reloads. The helpers here compute line amounts and order totals in memory
+in one pass, write lines with `bulk_create`/`bulk_update` and a single
+filtered delete, and write the parent totals with a single UPDATE, so the
+statements issued do not grow with line count.
+"""
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Iterable
+
+from django.utils import timezone
+
+from .models import SalesOrder, SalesOrderLine
+
+MONEY_PLACES = Decimal('0.01')
+TOTAL_FIELDS = ('subtotal', 'tax_amount', 'total_amount')
+LINE_FIELDS = ('product', 'description', 'quantity', 'rate', 'discount_amount', 'tax_rate')
+
+
+def build_lines(order: SalesOrder, lines_data: Iterable[dict], *, user=None) -> list[SalesOrderLine]:
+    """Unsaved lines for `order` with amount and tax_amount computed.
+
+    A line `id` only names an existing line to update (`upsert_lines`); new
+    lines always get a fresh primary key.
+    """
+    lines = []
+    for data in lines_data:
+        data = {field: value for field, value in data.items() if field != 'id'}
+        line = SalesOrderLine(order=order, created_by=user, updated_by=user, **data)
+        line.recalc()
+        lines.append(line)
+    return lines
+
+
+def apply_totals(order: SalesOrder, lines: Iterable[SalesOrderLine]) -> None:
+    """Set the order totals from `lines` (all of its lines) and write them with one UPDATE."""
+    subtotal = tax_amount = Decimal('0')
+    for line in lines:
+        subtotal += line.amount
+        tax_amount += line.tax_amount
+    order.subtotal = subtotal.quantize(MONEY_PLACES)
+    order.tax_amount = tax_amount.quantize(MONEY_PLACES)
+    order.total_amount = (order.subtotal + order.tax_amount).quantize(MONEY_PLACES)
+    SalesOrder.objects.filter(pk=order.pk).update(**{field: getattr(order, field) for field in TOTAL_FIELDS})
+
+
+def write_lines(order: SalesOrder, lines_data: Iterable[dict], *, user=None) -> list[SalesOrderLine]:
+    """Insert the lines of a new order in bulk and write its totals once."""
+    lines = SalesOrderLine.objects.bulk_create(build_lines(order, lines_data, user=user), batch_size=1000)
+    apply_totals(order, lines)
+    return lines
+
+
+def upsert_lines(order: SalesOrder, lines_data: Iterable[dict], *, user=None) -> list[SalesOrderLine]:
+    """Make the lines of `order` match `lines_data` and write its totals once.
+
+    Entries carrying the id of one of the order's lines update that line; the
+    rest are inserted, and lines that are not mentioned are deleted.
+    """
+    existing = {line.id: line for line in order.lines.all()}
+    now = timezone.now()
+    kept, inserts = [], []
+    for data in lines_data:
+        data = dict(data)
+        line = existing.pop(data.pop('id', None), None)
+        if line is None:
+            inserts.append(data)
+            continue
+        for field in LINE_FIELDS:
+            if field in data:
+                setattr(line, field, data[field])
+        line.recalc()
+        line.updated_at = now
+        if user is not None:
+            line.updated_by = user
+        kept.append(line)
+
+    if existing:
+        SalesOrderLine.objects.filter(order=order, pk__in=list(existing)).delete()
+    SalesOrderLine.objects.bulk_update(
+        kept, [*LINE_FIELDS, 'amount', 'tax_amount', 'updated_at', 'updated_by'], batch_size=1000,
+    )
+    created = SalesOrderLine.objects.bulk_create(build_lines(order, inserts, user=user), batch_size=1000)
+    lines = kept + created
+    apply_totals(order, lines)
+    return lines
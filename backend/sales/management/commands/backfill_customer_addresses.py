@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from sales.models import ADDRESS_PART_FIELDS, Customer
+
+
+class Command(BaseCommand):
+    help = "Parse billing/shipping addresses of existing customers into the structured city, state and PIN code columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Customers parsed and written per transaction.')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be positive.')
+        fields = ('pk', 'billing_address', 'shipping_address', *ADDRESS_PART_FIELDS)
+        last_pk, scanned, changed = 0, 0, 0
+        while True:
+            customers = list(Customer.objects.filter(pk__gt=last_pk).order_by('pk').only(*fields)[:chunk_size])
+            if not customers:
+                break
+            stale = []
+            for customer in customers:
+                before = [getattr(customer, field) for field in ADDRESS_PART_FIELDS]
+                customer.parse_addresses()
+                if [getattr(customer, field) for field in ADDRESS_PART_FIELDS] != before:
+                    stale.append(customer)
+            with transaction.atomic():
+                Customer.objects.bulk_update(stale, ADDRESS_PART_FIELDS)
+            scanned += len(customers)
+            changed += len(stale)
+            last_pk = customers[-1].pk
+        self.stdout.write(self.style.SUCCESS(f'Parsed {scanned} customers; updated {changed}.'))
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sales.imports import CHUNK_SIZE, FORMATS, import_customers, read_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk-import customers from a CSV, JSON Lines or JSON array file; failed rows go to a result file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import.')
+        parser.add_argument('--format', choices=FORMATS, help='Input format (default: from the file extension).')
+        parser.add_argument('--errors', help='Result file for rejected rows (default: <path>.errors.csv).')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Rows validated and inserted per batch.')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        fmt = options['format'] or path.suffix.lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError(f"Cannot tell the format of '{path.name}'; pass --format ({', '.join(FORMATS)}).")
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be positive.')
+        errors_path = Path(options['errors'] or f'{path}.errors.csv')
+        try:
+            with path.open(encoding='utf-8-sig', newline='') as source, \
+                    errors_path.open('w', encoding='utf-8', newline='') as errors_out:
+                result = import_customers(read_rows(source, fmt), errors_out, chunk_size=options['chunk_size'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc)) from exc
+        self.stdout.write(self.style.SUCCESS(f'Imported {result.created} of {result.total} customers.'))
+        if result.failed:
+            self.stdout.write(self.style.WARNING(f'{result.failed} rows rejected; see {errors_path}.'))
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-17 01:58
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def reserve_confirmed_orders(apps, schema_editor):
+    SalesOrderLine = apps.get_model('sales', 'SalesOrderLine')
+    StockReservation = apps.get_model('sales', 'StockReservation')
+    Inventory = apps.get_model('inventory', 'Inventory')
+    rows = (
+        SalesOrderLine.objects.filter(order__status='confirmed')
+        .order_by()
+        .values('order', 'product')
+        .annotate(qty=Sum('quantity'))
+    )
+    reserved = {}
+    reservations = []
+    for row in rows:
+        if not row['qty']:
+            continue
+        reservations.append(StockReservation(order_id=row['order'], product_id=row['product'], quantity=row['qty']))
+        reserved[row['product']] = reserved.get(row['product'], Decimal('0')) + row['qty']
+    StockReservation.objects.bulk_create(reservations, batch_size=1000)
+    for product_id, qty in reserved.items():
+        inv, _ = Inventory.objects.get_or_create(product_id=product_id, warehouse=None)
+        inv.reserved_qty = qty
+        inv.save(update_fields=['reserved_qty'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_inventory_reserved_qty'),
+        ('sales', '0002_salesorder_salesorderline_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.DecimalField(decimal_places=3, default=Decimal('0.000'), max_digits=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='sales.salesorder')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock_reservations', to='inventory.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product'], name='sales_stock_product_09b479_idx')],
+                'constraints': [models.UniqueConstraint(fields=('order', 'product'), name='uniq_stock_reservation_order_product')],
+            },
+        ),
+        migrations.RunPython(reserve_confirmed_orders, migrations.RunPython.noop),
+    ]
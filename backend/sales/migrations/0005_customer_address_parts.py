@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0004_salesordertransition'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='billing_city',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='billing_pincode',
+            field=models.CharField(blank=True, editable=False, max_length=6),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='billing_state',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='shipping_city',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='shipping_pincode',
+            field=models.CharField(blank=True, editable=False, max_length=6),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='shipping_state',
+            field=models.CharField(blank=True, editable=False, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['billing_city'], name='sales_custo_billing_165c02_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['shipping_city'], name='sales_custo_shippin_ffc36e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['billing_pincode'], name='sales_custo_billing_ee23bf_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customer',
+            index=models.Index(fields=['shipping_pincode'], name='sales_custo_shippin_996534_idx'),
+        ),
+    ]
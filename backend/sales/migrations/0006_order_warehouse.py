@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_productcost'),
+        ('sales', '0005_customer_address_parts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='salesorder',
+            name='warehouse',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='sales_orders', to='inventory.warehouse'),
+        ),
+        migrations.AddField(
+            model_name='stockreservation',
+            name='warehouse',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stock_reservations', to='inventory.warehouse'),
+        ),
+    ]
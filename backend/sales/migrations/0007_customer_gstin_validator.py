@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:07
+
+import sales.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sales', '0006_order_warehouse'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customer',
+            name='gstin',
+            field=models.CharField(blank=True, help_text='GST identification number (India).', max_length=15, null=True, validators=[sales.models.validate_gstin]),
+        ),
+    ]
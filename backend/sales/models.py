@@ -1,18 +1,22 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator, EmailValidator
 
 from core.models import BaseModel
-from inventory.models import Product
+from inventory.models import Product, Warehouse
+from utils.address import parse_address
+from utils.gst_utils import gstin_error
 from django.utils import timezone
 from decimal import Decimal
 
 
-# Validator for Indian GSTIN (15 chars: 2-digit state, 10-char PAN, 1 entity, 1 'Z', 1 checksum)
-GSTIN_REGEX = r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z]{1}[1-9A-Z]{1}Z[0-9A-Z]{1}$'
-validate_gstin = RegexValidator(
-    regex=GSTIN_REGEX,
-    message='Enter a valid GSTIN (15 characters), e.g., 22AAAAA0000A1Z5.',
-)
+def validate_gstin(value):
+    """Indian GSTIN (15 chars: 2-digit state, 10-char PAN, 1 entity, 1 'Z', 1 check character)."""
+    problem = gstin_error(value)
+    if problem:
+        raise ValidationError(problem, code='invalid')
+
 
 # Validator for Indian state code (two digits). Example: 29 = Karnataka
 STATE_CODE_REGEX = r'^[0-9]{2}$'
@@ -27,6 +31,11 @@ validate_phone = RegexValidator(
     message="Enter a valid phone number (digits, +, -, space, parentheses).",
 )
 
+# Structured address columns kept by Customer.parse_addresses
+ADDRESS_PART_FIELDS = tuple(
+    f'{prefix}_{part}' for prefix in ('billing', 'shipping') for part in ('city', 'state', 'pincode')
+)
+
 
 class Customer(BaseModel):
     """
@@ -39,9 +48,12 @@ class Customer(BaseModel):
     - phone, email: Communication channels for confirmations and notifications.
     - billing_address: Address used for invoicing and taxation.
     - shipping_address: Address for deliveries (can differ from billing).
+    - billing_/shipping_ city, state, pincode: parsed from the addresses on save
+      (utils.address) and indexed, so city and PIN code filters are index lookups.
     - gstin: Mandatory for B2B GST compliance (India), printed on invoices.
     - state_code: Two-digit GST state code, impacts tax calculations (intra/inter-state).
-    - credit_limit: Allowed outstanding amount; useful for blocking new orders over limit.
+    - credit_limit: Allowed exposure (unpaid invoices plus confirmed orders); confirming an order past it
+      is refused (sales.credit). Zero means no limit.
     - payment_terms: Number of days to due date (e.g., 30 = Net 30).
     - is_active: Toggle to soft-deactivate a customer without deleting history.
     """
@@ -86,6 +98,14 @@ class Customer(BaseModel):
         help_text="Shipping/delivery address.",
     )
 
+    # Structured address parts derived from the free-text addresses on every save
+    billing_city = models.CharField(max_length=100, blank=True, editable=False)
+    billing_state = models.CharField(max_length=50, blank=True, editable=False)
+    billing_pincode = models.CharField(max_length=6, blank=True, editable=False)
+    shipping_city = models.CharField(max_length=100, blank=True, editable=False)
+    shipping_state = models.CharField(max_length=50, blank=True, editable=False)
+    shipping_pincode = models.CharField(max_length=6, blank=True, editable=False)
+
     gstin = models.CharField(
         max_length=15,
         blank=True,
@@ -127,6 +147,10 @@ class Customer(BaseModel):
         indexes = [
             models.Index(fields=["customer_code"]),
             models.Index(fields=["name"]),
+            models.Index(fields=["billing_city"]),
+            models.Index(fields=["shipping_city"]),
+            models.Index(fields=["billing_pincode"]),
+            models.Index(fields=["shipping_pincode"]),
         ]
 
     def __str__(self) -> str:  # pragma: no cover - simple
@@ -136,11 +160,28 @@ class Customer(BaseModel):
         """
         return f"{self.customer_code} - {self.name}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_gstin = instance.__dict__.get('gstin')
+        return instance
+
+    def clean_fields(self, exclude=None):
+        """
+        Field validation. A GSTIN saved before the checksum was enforced is
+        accepted while it is left unchanged, so those customers stay editable;
+        a new or changed GSTIN gets the full check.
+        """
+        if self.gstin and self.gstin == getattr(self, '_loaded_gstin', None):
+            exclude = {*(exclude or ()), 'gstin'}
+        super().clean_fields(exclude=exclude)
+
     def clean(self):
         """
         Model-level validation/normalization.
         - Normalize GSTIN to uppercase (spec requires uppercase letters)
         - Optional: strip whitespace from code and names
+        - Derive the structured address columns from the address text
         """
         super().clean()
         if self.customer_code:
@@ -149,6 +190,15 @@ class Customer(BaseModel):
             self.name = self.name.strip()
         if self.gstin:
             self.gstin = self.gstin.upper().strip()
+        self.parse_addresses()
+
+    def parse_addresses(self):
+        """Fill the structured billing/shipping city, state and PIN code from the address text."""
+        for prefix in ('billing', 'shipping'):
+            parsed = parse_address(getattr(self, f'{prefix}_address'))
+            setattr(self, f'{prefix}_city', parsed.city)
+            setattr(self, f'{prefix}_state', parsed.state)
+            setattr(self, f'{prefix}_pincode', parsed.pincode)
 
     def save(self, *args, **kwargs):
         # Ensure clean() runs before save when saving programmatically
@@ -167,6 +217,8 @@ class SalesOrder(BaseModel):
     - status workflow: Draft -> Confirmed -> Delivered OR Cancelled
     - monetary fields: subtotal (sum of line item amounts pre-tax), tax_amount (computed), total_amount (subtotal + tax)
     - notes: internal or customer facing notes
+    - warehouse: site the order ships from; confirmed orders reserve stock there
+      (blank = the unassigned location)
     """
 
     class Status(models.TextChoices):
@@ -181,6 +233,7 @@ class SalesOrder(BaseModel):
     delivery_date = models.DateField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.DRAFT, db_index=True)
     notes = models.TextField(blank=True)
+    warehouse = models.ForeignKey(Warehouse, null=True, blank=True, on_delete=models.PROTECT, related_name='sales_orders')
 
     subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
     tax_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
@@ -217,28 +270,44 @@ class SalesOrder(BaseModel):
         return super().save(*args, **kwargs)
 
     # --- Workflow helpers ---
+    # Each transition goes through sales.transitions, which updates the status,
+    # logs the change and brings stock reservations in line (reserve on confirm,
+    # release on cancel/deliver) in one transaction.
     def can_confirm(self):
         return self.status == self.Status.DRAFT and self.lines.exists()
 
-    def confirm(self):
+    def can_cancel(self):
+        return self.status not in {self.Status.DELIVERED, self.Status.CANCELLED}
+
+    def can_mark_delivered(self):
+        return self.status == self.Status.CONFIRMED
+
+    def _transition(self, status, user=None):
+        from .credit import CreditLimitExceeded
+        from .transitions import transition_orders
+
+        result = transition_orders(SalesOrder.objects.filter(pk=self.pk), status, user=user)
+        if result.over_limit:
+            raise CreditLimitExceeded('Order exceeds the customer credit limit.')
+        if not result.moved:
+            raise ValueError('Order status changed concurrently; reload and try again.')
+        self.refresh_from_db()
+
+    def confirm(self, user=None):
         if not self.can_confirm():
             raise ValueError('Cannot confirm order in current state.')
-        self.status = self.Status.CONFIRMED
-        self.save()
+        self._transition(self.Status.CONFIRMED, user)
 
-    def cancel(self):
-        if self.status in {self.Status.DELIVERED, self.Status.CANCELLED}:
+    def cancel(self, user=None):
+        if not self.can_cancel():
             raise ValueError('Cannot cancel delivered or already cancelled order.')
-        self.status = self.Status.CANCELLED
-        self.save()
+        self._transition(self.Status.CANCELLED, user)
 
-    def mark_delivered(self):
-        if self.status != self.Status.CONFIRMED:
+    def mark_delivered(self, user=None):
+        if not self.can_mark_delivered():
             raise ValueError('Only confirmed orders can be marked delivered.')
-        if not self.delivery_date:
-            self.delivery_date = timezone.now().date()
-        self.status = self.Status.DELIVERED
-        self.save()
+        # The transition fills in today's date when no delivery date is set
+        self._transition(self.Status.DELIVERED, user)
 
 
 class SalesOrderLine(BaseModel):
@@ -263,8 +332,15 @@ class SalesOrderLine(BaseModel):
         self.amount = line_base.quantize(Decimal('0.01'))
         self.tax_amount = (self.amount * (self.tax_rate / Decimal('100'))).quantize(Decimal('0.01'))
 
+    @transaction.atomic
     def save(self, *args, **kwargs):
+        from .credit import recommit_order
+        from .reservations import sync_reservations
+
         self.recalc()
+        # Lock the order first, so its stored total is the exposure share this edit moves
+        order = SalesOrder.objects.select_for_update().only('status', 'customer', 'total_amount').get(pk=self.order_id)
+        before = (order.customer_id, order.total_amount) if order.status == SalesOrder.Status.CONFIRMED else None
         super().save(*args, **kwargs)
         # After saving a line, update parent totals
         self.order.recalc_totals()
@@ -273,3 +349,52 @@ class SalesOrderLine(BaseModel):
             tax_amount=self.order.tax_amount,
             total_amount=self.order.total_amount,
         )
+        # A confirmed order's exposure (credit-checked) and reservations follow the new total
+        if before:
+            recommit_order(self.order_id, before, (before[0], self.order.total_amount))
+            sync_reservations([self.order_id], user=self.updated_by)
+
+
+class StockReservation(models.Model):
+    """
+    Quantity of a product held for a confirmed sales order.
+
+    One row per (order, product) while the order is confirmed, held at the
+    order's warehouse; the total per (product, warehouse) is mirrored in
+    Inventory.reserved_qty by sales.reservations.
+    """
+
+    order = models.ForeignKey(SalesOrder, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='stock_reservations')
+    warehouse = models.ForeignKey(Warehouse, null=True, blank=True, on_delete=models.PROTECT, related_name='stock_reservations')
+    quantity = models.DecimalField(max_digits=16, decimal_places=3, default=Decimal('0.000'))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'product'], name='uniq_stock_reservation_order_product'),
+        ]
+        indexes = [models.Index(fields=['product'])]
+
+    def __str__(self):  # pragma: no cover simple
+        return f"{self.order_id}: {self.quantity} x {self.product_id}"
+
+
+class SalesOrderTransition(models.Model):
+    """One status change of a sales order, appended by sales.transitions."""
+
+    order = models.ForeignKey(SalesOrder, on_delete=models.CASCADE, related_name='transitions')
+    from_status = models.CharField(max_length=20, choices=SalesOrder.Status.choices)
+    to_status = models.CharField(max_length=20, choices=SalesOrder.Status.choices)
+    changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='sales_order_transitions',
+    )
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ('id',)
+        indexes = [models.Index(fields=['order', 'changed_at'])]
+
+    def __str__(self):  # pragma: no cover simple
+        return f"{self.order_id}: {self.from_status} -> {self.to_status}"
@@ -0,0 +1,77 @@
+"""Stock reservations for confirmed sales orders.
+
+`sync_reservations` makes the StockReservation rows of a set of orders match
+their current status, lines and warehouse (confirmed orders reserve the sum of
+their line quantities per product at the order's warehouse, every other status
+reserves nothing) and applies the net change per (product, warehouse) to
+Inventory.reserved_qty, so the available quantity of a site is a read of its
+Inventory row. Its query count does not depend on the number of orders, so
+single transitions and bulk runs over thousands of orders share the same path.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from decimal import Decimal
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Sum
+
+from inventory.posting import Key, adjust_reserved
+
+from .models import SalesOrder, SalesOrderLine, StockReservation
+
+
+@transaction.atomic
+def sync_reservations(order_ids: Iterable[int], *, user=None) -> dict[Key, Decimal]:
+    """Reconcile reservations for `order_ids`; returns the reserved_qty change per (product, warehouse)."""
+    order_ids = list(order_ids)
+    if not order_ids:
+        return {}
+    lines = (
+        SalesOrderLine.objects.filter(order_id__in=order_ids, order__status=SalesOrder.Status.CONFIRMED)
+        .order_by()
+        .values('order', 'product', 'order__warehouse')
+        .annotate(qty=Sum('quantity'))
+    )
+    wanted = {(row['order'], row['product']): (row['order__warehouse'], row['qty']) for row in lines if row['qty']}
+    existing = {
+        (res.order_id, res.product_id): res
+        for res in StockReservation.objects.filter(order_id__in=order_ids)
+    }
+
+    changes: dict[Key, Decimal] = defaultdict(Decimal)
+    new, changed, stale = [], [], []
+    for key in wanted.keys() | existing.keys():
+        warehouse_id, qty = wanted.get(key, (None, Decimal('0')))
+        res = existing.get(key)
+        if res is not None and qty and res.warehouse_id != warehouse_id:
+            # The order now ships from another site: the reservation moves with it
+            changes[(key[1], res.warehouse_id)] -= res.quantity
+            changes[(key[1], warehouse_id)] += qty
+            res.warehouse_id, res.quantity = warehouse_id, qty
+            changed.append(res)
+            continue
+        delta = qty - (res.quantity if res else Decimal('0'))
+        if not delta:
+            continue
+        if res is None:
+            changes[(key[1], warehouse_id)] += delta
+            new.append(StockReservation(order_id=key[0], product_id=key[1], warehouse_id=warehouse_id, quantity=qty))
+        elif qty:
+            changes[(key[1], res.warehouse_id)] += delta
+            res.quantity = qty
+            changed.append(res)
+        else:
+            changes[(key[1], res.warehouse_id)] += delta
+            stale.append(res.pk)
+
+    if new:
+        StockReservation.objects.bulk_create(new, batch_size=1000)
+    if changed:
+        StockReservation.objects.bulk_update(changed, ['warehouse', 'quantity'], batch_size=1000)
+    if stale:
+        StockReservation.objects.filter(pk__in=stale).delete()
+    changes = {key: qty for key, qty in changes.items() if qty}
+    adjust_reserved(changes, user=user)
+    return changes
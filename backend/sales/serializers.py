@@ -1,8 +1,16 @@
 from rest_framework import serializers
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from decimal import Decimal
 
-from .models import Customer, SalesOrder, SalesOrderLine
+from core.serializers import PrefetchedPrimaryKeyRelatedField, prefetch_line_relations
+from inventory.models import Product
+
+from .credit import CreditLimitExceeded, recommit_order
+from .lines import upsert_lines, write_lines
+from .models import ADDRESS_PART_FIELDS, Customer, SalesOrder, SalesOrderLine, validate_gstin
+from .reservations import sync_reservations
+from .transitions import SOURCES, transition_orders
 
 
 class CustomerSerializer(serializers.ModelSerializer):
@@ -11,14 +19,23 @@ class CustomerSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'customer_code', 'name', 'contact_person', 'phone', 'email',
             'billing_address', 'shipping_address', 'gstin', 'state_code',
-            'credit_limit', 'payment_terms', 'is_active',
+            'credit_limit', 'payment_terms', 'is_active', *ADDRESS_PART_FIELDS,
             'created_at', 'updated_at', 'created_by', 'updated_by'
         ]
-        read_only_fields = ('id', 'created_at', 'updated_at', 'created_by', 'updated_by')
+        read_only_fields = ('id', *ADDRESS_PART_FIELDS, 'created_at', 'updated_at', 'created_by', 'updated_by')
+        # validate_gstin below runs the model validator, skipping an unchanged stored GSTIN
+        extra_kwargs = {'gstin': {'validators': []}}
+
+    def validate_gstin(self, value):
+        if value and value != getattr(self.instance, 'gstin', None):
+            validate_gstin(value)
+        return value
 
 
 class SalesOrderLineSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
+    id = serializers.IntegerField(required=False)
+    product = PrefetchedPrimaryKeyRelatedField(queryset=Product.objects.all())
 
     class Meta:
         model = SalesOrderLine
@@ -26,7 +43,7 @@ class SalesOrderLineSerializer(serializers.ModelSerializer):
             'id', 'product', 'product_name', 'description', 'quantity', 'rate',
             'discount_amount', 'tax_rate', 'amount', 'tax_amount', 'created_at', 'updated_at'
         ]
-        read_only_fields = ('id', 'amount', 'tax_amount', 'created_at', 'updated_at')
+        read_only_fields = ('amount', 'tax_amount', 'created_at', 'updated_at')
 
 
 class SalesOrderSerializer(serializers.ModelSerializer):
@@ -38,11 +55,17 @@ class SalesOrderSerializer(serializers.ModelSerializer):
         model = SalesOrder
         fields = [
             'id', 'order_number', 'customer', 'customer_detail', 'order_date', 'delivery_date', 'status',
-            'notes', 'subtotal', 'tax_amount', 'total_amount', 'lines', 'created_at', 'updated_at',
+            'warehouse', 'notes', 'subtotal', 'tax_amount', 'total_amount', 'lines', 'created_at', 'updated_at',
             'created_by', 'updated_by'
         ]
         read_only_fields = ('id', 'subtotal', 'tax_amount', 'total_amount', 'created_at', 'updated_at', 'created_by', 'updated_by')
 
+    def to_internal_value(self, data):
+        # Resolve every line's product with one query
+        if hasattr(data, 'get'):
+            prefetch_line_relations(self.context, data.get('lines'), {'product': Product})
+        return super().to_internal_value(data)
+
     def validate_order_number(self, value):
         if not value:
             raise serializers.ValidationError('Order number required')
@@ -55,42 +78,63 @@ class SalesOrderSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({'delivery_date': 'Delivery date required when marking delivered.'})
         return attrs
 
-    def _upsert_lines(self, order: SalesOrder, lines_data):
-        existing_ids = {l.id: l for l in order.lines.all()}
-        seen = set()
-        for line in lines_data:
-            line_id = line.get('id')
-            if line_id and line_id in existing_ids:
-                obj = existing_ids[line_id]
-                for f in ['product', 'description', 'quantity', 'rate', 'discount_amount', 'tax_rate']:
-                    if f in line:
-                        setattr(obj, f, line[f])
-                obj.save()
-                seen.add(line_id)
-            else:
-                SalesOrderLine.objects.create(order=order, **line)
-        # delete removed lines
-        for lid, lobj in existing_ids.items():
-            if lid not in seen:
-                lobj.delete()
+    def to_representation(self, instance):
+        # Read the lines with their products in one query unless the queryset prefetched them
+        if 'lines' not in getattr(instance, '_prefetched_objects_cache', {}):
+            prefetch_related_objects([instance], Prefetch('lines', SalesOrderLine.objects.select_related('product')))
+        return super().to_representation(instance)
+
+    @staticmethod
+    def _commitment(order: SalesOrder):
+        """The order's share of its customer's open_orders exposure (None unless confirmed)."""
+        if order.status != SalesOrder.Status.CONFIRMED:
+            return None
+        return order.customer_id, order.total_amount
+
+    def _recommit(self, order: SalesOrder, before) -> None:
+        try:
+            recommit_order(order.pk, before, self._commitment(order))
+        except CreditLimitExceeded as exc:
+            raise serializers.ValidationError({'status': str(exc)}) from exc
 
     @transaction.atomic
     def create(self, validated_data):
         lines_data = validated_data.pop('lines', [])
         order = SalesOrder.objects.create(**validated_data)
-        for line in lines_data:
-            SalesOrderLine.objects.create(order=order, **line)
-        order.recalc_totals()
-        order.save()
+        write_lines(order, lines_data, user=order.created_by)
+        self._recommit(order, None)
+        sync_reservations([order.pk], user=order.updated_by)
         return order
 
+    @staticmethod
+    def _transition(order: SalesOrder, status: str) -> None:
+        """Move `order` to `status` through transition_orders (credit check, reservations, transition log)."""
+        if status not in SOURCES:
+            raise serializers.ValidationError({'status': f'An order cannot be moved to {status!r}.'})
+        result = transition_orders(SalesOrder.objects.filter(pk=order.pk), status, user=order.updated_by)
+        if result.over_limit:
+            raise serializers.ValidationError({'status': 'Order exceeds the customer credit limit.'})
+        if not result.moved:
+            raise serializers.ValidationError({'status': f'A {order.status} order cannot be moved to {status!r}.'})
+
     @transaction.atomic
     def update(self, instance: SalesOrder, validated_data):
         lines_data = validated_data.pop('lines', None)
+        status = validated_data.pop('status', None)
+        # Lock the order before reading its commitment, so a concurrent confirm of it waits for this edit
+        SalesOrder.objects.select_for_update().only('pk').get(pk=instance.pk)
+        instance.refresh_from_db()
+        before = self._commitment(instance)
         for attr, val in validated_data.items():
             setattr(instance, attr, val)
         instance.save()
         if lines_data is not None:
-            self._upsert_lines(instance, lines_data)
+            upsert_lines(instance, lines_data, user=instance.updated_by)
+        # Line edits on a confirmed order move its exposure and reservations too
+        self._recommit(instance, before)
+        if status is not None and status != instance.status:
+            self._transition(instance, status)
+        else:
+            sync_reservations([instance.pk], user=instance.updated_by)
         instance.refresh_from_db()
         return instance
@@ -0,0 +1,174 @@
+import threading
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from accounting.models import ARInvoice, CustomerExposure
+from inventory.models import Product
+from sales.credit import CreditLimitExceeded
+from sales.models import Customer, SalesOrder, SalesOrderLine, SalesOrderTransition
+
+
+@pytest.fixture
+def client(db):
+    User = get_user_model()
+    api = APIClient()
+    api.force_authenticate(User.objects.create_user(username='credit-controller', password='x', role=User.Roles.ADMIN))
+    return api
+
+
+def _orders(prefix, customer, count, rate='30.00'):
+    product = Product.objects.create(sku=f'{prefix}-P', name='Goods')
+    orders = SalesOrder.objects.bulk_create([
+        SalesOrder(order_number=f'{prefix}-{i}', customer=customer, subtotal=Decimal(rate), total_amount=Decimal(rate))
+        for i in range(count)
+    ])
+    SalesOrderLine.objects.bulk_create([
+        SalesOrderLine(order=order, product=product, quantity=Decimal('1'), rate=Decimal(rate), amount=Decimal(rate))
+        for order in orders
+    ])
+    return [order.id for order in orders]
+
+
+def _exposure(customer):
+    row = CustomerExposure.objects.get(customer=customer)
+    return row.outstanding, row.open_orders
+
+
+@pytest.mark.django_db
+def test_confirm_is_blocked_past_the_credit_limit(client):
+    shop = Customer.objects.create(customer_code='CR-1', name='Shop', credit_limit=Decimal('100.00'))
+    ARInvoice.objects.create(customer=shop, grand_total=Decimal('30.00'), status=ARInvoice.Status.ISSUED)
+    first, second = _orders('CR1', shop, 2, rate='40.00')
+
+    assert client.post(reverse('sales-order-confirm', args=[first])).status_code == 200
+    assert _exposure(shop) == (Decimal('30.00'), Decimal('40.00'))
+    blocked = client.post(reverse('sales-order-confirm', args=[second]))
+    assert blocked.status_code == 400 and 'credit limit' in blocked.data['detail']
+    assert SalesOrder.objects.get(pk=second).status == SalesOrder.Status.DRAFT
+
+    # Cancelling releases the order's share; delivering moves it out of open orders
+    assert client.post(reverse('sales-order-cancel', args=[first])).status_code == 200
+    assert client.post(reverse('sales-order-confirm', args=[second])).status_code == 200
+    assert client.post(reverse('sales-order-deliver', args=[second])).status_code == 200
+    assert _exposure(shop) == (Decimal('30.00'), Decimal('0.00'))
+
+    # Editing a confirmed order over the limit is refused and rolled back
+    order = SalesOrder.objects.get(pk=_orders('CR1E', shop, 1)[0])
+    order.confirm()
+    response = client.patch(reverse('sales-order-detail', args=[order.id]), {
+        'lines': [{'product': order.lines.get().product_id, 'quantity': '5', 'rate': '30.00'}],
+    }, format='json')
+    assert response.status_code == 400
+    assert _exposure(shop) == (Decimal('30.00'), Decimal('30.00'))
+
+
+@pytest.mark.django_db
+def test_status_edits_go_through_the_order_workflow(client):
+    shop = Customer.objects.create(customer_code='CR-4', name='Shop', credit_limit=Decimal('50.00'))
+    first, second = _orders('CR4', shop, 2, rate='40.00')
+
+    def patch(order_id, status):
+        return client.patch(reverse('sales-order-detail', args=[order_id]), {'status': status}, format='json')
+
+    assert patch(first, 'confirmed').status_code == 200
+    assert _exposure(shop) == (Decimal('0.00'), Decimal('40.00'))
+    transition = SalesOrderTransition.objects.get(order_id=first)
+    assert (transition.from_status, transition.to_status) == ('draft', 'confirmed')
+
+    # Confirming twice does not count the order twice; over the limit is refused
+    assert patch(first, 'confirmed').status_code == 200
+    assert patch(second, 'confirmed').status_code == 400
+    assert patch(first, 'draft').status_code == 400
+    assert _exposure(shop) == (Decimal('0.00'), Decimal('40.00'))
+    assert SalesOrder.objects.get(pk=second).status == SalesOrder.Status.DRAFT
+
+    assert patch(first, 'cancelled').status_code == 200
+    assert _exposure(shop) == (Decimal('0.00'), Decimal('0.00'))
+    assert SalesOrderTransition.objects.filter(order_id=first).count() == 2
+
+
+@pytest.mark.django_db
+def test_line_saves_and_customer_changes_move_a_confirmed_orders_exposure(client):
+    shop = Customer.objects.create(customer_code='CR-5', name='Shop', credit_limit=Decimal('100.00'))
+    other = Customer.objects.create(customer_code='CR-6', name='Other shop')
+    order = SalesOrder.objects.get(pk=_orders('CR5', shop, 1)[0])
+    order.confirm()
+
+    line = order.lines.get()
+    line.quantity = Decimal('2')
+    line.save()
+    assert _exposure(shop) == (Decimal('0.00'), Decimal('60.00'))
+    line.quantity = Decimal('4')
+    with pytest.raises(CreditLimitExceeded):
+        line.save()
+    assert _exposure(shop) == (Decimal('0.00'), Decimal('60.00'))
+    assert SalesOrder.objects.get(pk=order.pk).total_amount == Decimal('60.00')
+
+    response = client.patch(reverse('sales-order-detail', args=[order.id]), {'customer': other.id}, format='json')
+    assert response.status_code == 200
+    assert _exposure(shop) == (Decimal('0.00'), Decimal('0.00'))
+    assert _exposure(other) == (Decimal('0.00'), Decimal('60.00'))
+
+
+@pytest.mark.django_db
+def test_bulk_confirm_admits_orders_until_the_limit(client):
+    shop = Customer.objects.create(customer_code='CR-2', name='Shop', credit_limit=Decimal('100.00'))
+    unlimited = Customer.objects.create(customer_code='CR-3', name='Open account')
+    limited = _orders('CR2', shop, 5)
+    free = _orders('CR3', unlimited, 5)
+
+    data = client.post(reverse('sales-order-bulk-confirm'), {'ids': limited + free}, format='json').data
+    assert data['updated'] == sorted(limited[:3] + free)
+    assert data['over_credit_limit'] == limited[3:]
+    assert _exposure(shop) == (Decimal('0.00'), Decimal('90.00'))
+    assert _exposure(unlimited) == (Decimal('0.00'), Decimal('150.00'))
+
+
+@pytest.mark.django_db
+def test_confirm_cost_does_not_grow_with_customer_history():
+    counts = {}
+    for history in (0, 200):
+        customer = Customer.objects.create(customer_code=f'CRH-{history}', name='Regular', credit_limit=Decimal('1000000'))
+        for _ in range(history):
+            ARInvoice.objects.create(customer=customer, grand_total=Decimal('10.00'), status=ARInvoice.Status.ISSUED)
+        SalesOrder.objects.filter(pk__in=_orders(f'CRH{history}', customer, history or 1)).update(status='delivered')
+        order = SalesOrder.objects.get(pk=_orders(f'CRH{history}N', customer, 1)[0])
+        with CaptureQueriesContext(connection) as ctx:
+            order.confirm()
+        counts[history] = len(ctx)
+    assert counts[0] == counts[200]
+
+
+def _confirm(order_id, barrier, outcomes):
+    try:
+        barrier.wait()
+        SalesOrder.objects.get(pk=order_id).confirm()
+        outcomes.append('confirmed')
+    except CreditLimitExceeded:
+        outcomes.append('blocked')
+    except Exception as exc:  # pragma: no cover - surfaced by the assertion below
+        outcomes.append(exc)
+    finally:
+        connection.close()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_confirms_cannot_overshoot_the_limit():
+    shop = Customer.objects.create(customer_code='CR-4', name='Busy shop', credit_limit=Decimal('100.00'))
+    ids = _orders('CR4', shop, 6)
+    barrier = threading.Barrier(len(ids))
+    outcomes = []
+    threads = [threading.Thread(target=_confirm, args=(pk, barrier, outcomes)) for pk in ids]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(outcomes) == ['blocked'] * 3 + ['confirmed'] * 3
+    assert SalesOrder.objects.filter(pk__in=ids, status=SalesOrder.Status.CONFIRMED).count() == 3
+    assert _exposure(shop) == (Decimal('0.00'), Decimal('90.00'))
@@ -0,0 +1,57 @@
+import io
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from sales.models import Customer
+from utils.address import parse_address
+
+
+def test_parse_address_finds_city_state_and_pincode():
+    parsed = parse_address('12 MG Road, Indiranagar, Bengaluru, Karnataka 560 038, India')
+    assert (parsed.city, parsed.state, parsed.pincode) == ('Bengaluru', 'Karnataka', '560038')
+    parsed = parse_address('Flat 3\nAndheri East\nmumbai\nMaharashtra - 400069')
+    assert (parsed.city, parsed.state, parsed.pincode) == ('Mumbai', 'Maharashtra', '400069')
+    assert parse_address('Plot 9, Sector 5, New Delhi 110001').city == 'New Delhi'
+    assert parse_address('Shop 4, Jammu & Kashmir').city == ''  # a street line is not a city
+
+
+@pytest.mark.django_db
+def test_city_and_pincode_filters_use_the_parsed_columns():
+    User = get_user_model()
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username='address-admin', password='x', role=User.Roles.ADMIN))
+    Customer.objects.create(customer_code='AD-1', name='Billing Pune', billing_address='1 FC Road, Pune, Maharashtra 411004')
+    Customer.objects.create(
+        customer_code='AD-2', name='Ships Pune', billing_address='2 Park St, Kolkata 700016',
+        shipping_address='Dock 3, Pune, Maharashtra 411001',
+    )
+    # Pune appears only as a street name here
+    Customer.objects.create(customer_code='AD-3', name='Street', billing_address='Pune Road, Nashik, Maharashtra 422001')
+
+    url = reverse('customer-list')
+    with CaptureQueriesContext(connection) as ctx:
+        data = client.get(url, {'city': ' pune '}).data
+    assert {row['customer_code'] for row in data['results']} == {'AD-1', 'AD-2'}
+    assert not any('LIKE' in q['sql'] for q in ctx.captured_queries)
+    assert [row['customer_code'] for row in client.get(url, {'pincode': '700 016'}).data['results']] == ['AD-2']
+    assert data['results'][0]['billing_state'] == 'Maharashtra'
+
+
+@pytest.mark.django_db
+def test_backfill_fills_rows_written_without_save():
+    Customer.objects.bulk_create([
+        Customer(customer_code=f'BF-{i}', name=f'Old {i}', billing_address=f'{i} Main Road, Chennai, Tamil Nadu 600001')
+        for i in range(5)
+    ])
+    out = io.StringIO()
+    call_command('backfill_customer_addresses', '--chunk-size', '2', stdout=out)
+    assert 'updated 5' in out.getvalue()
+    assert set(Customer.objects.values_list('billing_city', 'billing_state', 'billing_pincode')) == {
+        ('Chennai', 'Tamil Nadu', '600001'),
+    }
@@ -0,0 +1,128 @@
+import csv
+import io
+import json
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from sales.imports import _json_array, import_customers, read_rows
+from sales.models import Customer
+from utils.gst_utils import gstin_check_char, gstin_error
+
+HEADER = 'customer_code,name,phone,gstin,state_code,credit_limit,payment_terms,is_active\n'
+
+
+def test_gstin_check_character():
+    assert gstin_check_char('27AAPFU0939F1Z') == 'V'
+    assert gstin_error('27AAPFU0939F1ZV') is None
+    assert gstin_error('27AAPFU0939F1ZA') == 'GSTIN check character does not match.'
+    assert 'unknown state code' in gstin_error('60AAPFU0939F1ZV')
+    assert gstin_error('27AAPFU0939F1Z') is not None
+
+    # The model runs the same check, so the API and admin agree with the import
+    customer = Customer(customer_code='GST-1', name='Checked', gstin='27AAPFU0939F1ZA')
+    with pytest.raises(ValidationError) as excinfo:
+        customer.clean_fields()
+    assert excinfo.value.message_dict['gstin'] == ['GSTIN check character does not match.']
+    customer.gstin = '27AAPFU0939F1ZV'
+    customer.clean_fields()
+
+
+def _errors(out):
+    out.seek(0)
+    return {int(row['row']): row['errors'] for row in csv.DictReader(out)}
+
+
+@pytest.mark.django_db
+def test_csv_import_reports_bad_rows_and_inserts_the_rest():
+    Customer.objects.create(customer_code='IMP-OLD', name='Existing')
+    source = io.StringIO(HEADER + '\n'.join([
+        'IMP-1, Acme Traders ,+91 98450 12345,27aapfu0939f1zv,,15000,30,yes',
+        'IMP-2,Beta,12,,,0,0,',
+        'IMP-3,Gamma,,27AAPFU0939F1ZA,,,,',
+        'IMP-OLD,Clash,,,,,,',
+        'IMP-1,Again,,,,,,',
+        'IMP-4,,,,99x,-5,9999,maybe',
+        'IMP-5,Delta,,27AAPFU0939F1ZV,29,,,false',
+    ]))
+    out = io.StringIO()
+    result = import_customers(read_rows(source, 'csv'), out)
+    assert (result.total, result.created, result.failed) == (7, 1, 6)
+
+    acme = Customer.objects.get(customer_code='IMP-1')
+    assert (acme.name, acme.gstin, acme.state_code) == ('Acme Traders', '27AAPFU0939F1ZV', '27')
+    assert (acme.credit_limit, acme.payment_terms, acme.is_active) == (Decimal('15000.00'), 30, True)
+    errors = _errors(out)
+    assert sorted(errors) == [2, 3, 4, 5, 6, 7]
+    assert errors[2].startswith('phone:')
+    assert errors[3] == 'gstin: GSTIN check character does not match.'
+    assert errors[4] == 'customer_code: Customer with this code already exists.'
+    assert errors[5] == 'customer_code: Duplicate customer code in the import file.'
+    assert [part.split(':')[0] for part in errors[6].split('; ')] == [
+        'name', 'state_code', 'credit_limit', 'payment_terms', 'is_active',
+    ]
+    assert errors[7] == 'state_code: State code does not match the GSTIN.'
+
+
+@pytest.mark.django_db
+def test_import_issues_a_fixed_number_of_queries_per_chunk():
+    counts = {}
+    for size in (50, 500):
+        rows = [{'customer_code': f'IQ{size}-{i}', 'name': f'Buyer {i}'} for i in range(size)]
+        with CaptureQueriesContext(connection) as ctx:
+            result = import_customers(rows, io.StringIO(), chunk_size=50)
+        assert result.created == size
+        counts[size] = len(ctx)
+    # Per chunk: the IN lookup, a savepoint pair and the insert
+    assert counts[500] == counts[50] * 10
+
+
+@pytest.mark.django_db
+def test_import_command_reads_json_streams(tmp_path):
+    records = [{'customer_code': f'IJ-{i}', 'name': f'Json {i}', 'state_code': '29'} for i in range(5)]
+    records.append({'customer_code': 'IJ-BAD', 'name': 'Bad', 'state_code': '00'})
+    array = tmp_path / 'customers.json'
+    array.write_text(json.dumps(records, indent=2))
+    lines = tmp_path / 'more.jsonl'
+    lines.write_text('\n'.join(json.dumps({**record, 'customer_code': 'L' + record['customer_code']}) for record in records))
+
+    call_command('import_customers', str(array), '--chunk-size', '2', stdout=io.StringIO())
+    call_command('import_customers', str(lines), stdout=io.StringIO())
+    assert Customer.objects.filter(customer_code__startswith='IJ-').count() == 5
+    assert Customer.objects.filter(customer_code__startswith='LIJ-').count() == 5
+    result = (tmp_path / 'customers.json.errors.csv').read_text().splitlines()
+    assert result == ['row,customer_code,errors', "6,IJ-BAD,state_code: Unknown GST state code '00'."]
+
+
+def test_json_array_reader_handles_elements_split_across_reads():
+    records = [{'customer_code': f'S-{i}', 'name': 'x' * (i * 7)} for i in range(40)]
+    assert list(_json_array(io.StringIO(json.dumps(records)), read_size=16)) == records
+
+
+@pytest.mark.django_db
+def test_a_stored_gstin_from_before_the_checksum_stays_editable():
+    legacy = Customer.objects.create(customer_code='GST-OLD', name='Legacy')
+    Customer.objects.filter(pk=legacy.pk).update(gstin='27AAPFU0939F1ZA')  # predates the check
+    legacy = Customer.objects.get(pk=legacy.pk)
+    legacy.name = 'Legacy Traders'
+    legacy.save()
+
+    User = get_user_model()
+    client = APIClient()
+    client.force_authenticate(User.objects.create_user(username='gst-clerk', password='x', role=User.Roles.ADMIN))
+    url = reverse('customer-detail', args=[legacy.pk])
+    response = client.patch(url, {'name': 'Legacy Co', 'gstin': '27AAPFU0939F1ZA'}, format='json')
+    assert response.status_code == 200
+    # A new value gets the full check
+    response = client.patch(url, {'gstin': '29AAPFU0939F1ZA'}, format='json')
+    assert response.status_code == 400 and 'check character' in str(response.data)
+    legacy.gstin = '29AAPFU0939F1ZA'
+    with pytest.raises(ValidationError):
+        legacy.save()
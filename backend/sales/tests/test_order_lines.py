@@ -0,0 +1,134 @@
+import time
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from inventory.models import Product
+from sales.models import Customer, SalesOrder, SalesOrderLine
+
+
+@pytest.fixture
+def client(db):
+    User = get_user_model()
+    api = APIClient()
+    api.force_authenticate(User.objects.create_user(username='order-writer', password='x', role=User.Roles.ADMIN))
+    return api
+
+
+def _legacy_create(number, customer, lines):
+    """Per-line create as it was done before the batch writer (benchmark baseline)."""
+    order = SalesOrder.objects.create(order_number=number, customer=customer)
+    for line in lines:
+        SalesOrderLine.objects.create(order=order, **line)
+    order.recalc_totals()
+    order.save()
+    return order
+
+
+@pytest.mark.django_db
+def test_batch_line_writer_benchmark(client):
+    """Benchmark: order create with 1, 100 and 1,000 lines vs the per-line baseline."""
+    customer = Customer.objects.create(customer_code='BW-1', name='Bulk buyer')
+    products = Product.objects.bulk_create([Product(sku=f'BW-{i}', name=f'Item {i}') for i in range(1000)])
+    results = {}
+    for size in (1, 100, 1000):
+        lines = [
+            {'product': p.id, 'quantity': '2', 'rate': '10.50', 'discount_amount': '1.00', 'tax_rate': '18'}
+            for p in products[:size]
+        ]
+        with CaptureQueriesContext(connection) as batch:
+            started = time.perf_counter()
+            response = client.post(reverse('sales-order-list'), {
+                'order_number': f'BW-{size}', 'customer': customer.id, 'status': 'draft', 'lines': lines,
+            }, format='json')
+            batch_time = time.perf_counter() - started
+        assert response.status_code == 201
+        assert len(response.data['lines']) == size
+
+        order = SalesOrder.objects.get(pk=response.data['id'])
+        assert order.subtotal == Decimal('20.00') * size
+        assert order.total_amount == Decimal('23.60') * size
+        if size > 100:
+            # The per-line baseline takes tens of seconds at 1,000 lines; it is only run up to 100
+            results[size] = (len(batch), None, batch_time, None)
+            continue
+
+        legacy_lines = [
+            {'product': p, 'quantity': Decimal('2'), 'rate': Decimal('10.50'), 'discount_amount': Decimal('1.00'),
+             'tax_rate': Decimal('18')}
+            for p in products[:size]
+        ]
+        with CaptureQueriesContext(connection) as legacy:
+            started = time.perf_counter()
+            baseline = _legacy_create(f'BL-{size}', customer, legacy_lines)
+            legacy_time = time.perf_counter() - started
+        results[size] = (len(batch), len(legacy), batch_time, legacy_time)
+        assert (order.subtotal, order.tax_amount, order.total_amount) == (
+            baseline.subtotal, baseline.tax_amount, baseline.total_amount,
+        )
+
+    for size, (batch_queries, legacy_queries, batch_time, legacy_time) in results.items():
+        baseline = f'per-line={legacy_queries:5d} queries {legacy_time * 1000:8.1f}ms' if legacy_queries else ''
+        print(f'lines={size:5d} batch={batch_queries:3d} queries {batch_time * 1000:8.1f}ms {baseline}')
+
+    # SQLite splits the 1,000-row insert into parameter-limited batches; nothing is issued per line.
+    assert results[100][0] <= results[1][0] + 2
+    assert results[1000][0] <= results[1][0] + 20
+    assert results[100][1] >= 100 * 3
+
+
+@pytest.mark.django_db
+def test_order_edit_upserts_lines_in_bulk(client):
+    customer = Customer.objects.create(customer_code='UP-1', name='Editor')
+    products = Product.objects.bulk_create([Product(sku=f'UP-{i}', name=f'Item {i}') for i in range(401)])
+    counts = {}
+    for size in (10, 200):
+        created = client.post(reverse('sales-order-list'), {
+            'order_number': f'UP-{size}', 'customer': customer.id, 'status': 'draft',
+            'lines': [{'product': p.id, 'quantity': '1', 'rate': '10.00'} for p in products[:size]],
+        }, format='json').data
+        first, *rest = created['lines']
+        # Change one line, keep the others but the last, and add one
+        lines = [{'id': first['id'], 'product': first['product'], 'quantity': '3', 'rate': '10.00'}]
+        lines += [{'id': line['id'], 'product': line['product'], 'quantity': '1', 'rate': '10.00'} for line in rest[:-1]]
+        lines.append({'product': products[400].id, 'quantity': '2', 'rate': '5.00'})
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.patch(reverse('sales-order-detail', args=[created['id']]), {'lines': lines}, format='json')
+        assert response.status_code == 200
+        line_updates = sum(q['sql'].startswith('UPDATE "sales_salesorderline"') for q in ctx.captured_queries)
+        counts[size] = (len(ctx) - line_updates, line_updates)
+
+        order = SalesOrder.objects.get(pk=created['id'])
+        kept = list(order.lines.values_list('id', 'quantity'))
+        assert kept[0] == (first['id'], Decimal('3'))
+        assert [line_id for line_id, _ in kept[1:-1]] == [line['id'] for line in rest[:-1]]
+        assert rest[-1]['id'] not in {line_id for line_id, _ in kept}
+        assert order.subtotal == Decimal('10.00') * (size + 2)
+        assert response.data['subtotal'] == '%.2f' % order.subtotal
+    # Only bulk_update's CASE statement is split, because SQLite caps it at 999 parameters
+    assert counts[200][0] == counts[10][0]
+    assert counts[10][1] == 1 and counts[200][1] <= 5
+
+
+@pytest.mark.django_db
+def test_order_create_ignores_client_line_ids(client):
+    customer = Customer.objects.create(customer_code='ID-1', name='Chooser')
+    product = Product.objects.create(sku='ID-P', name='Item')
+    taken = client.post(reverse('sales-order-list'), {
+        'order_number': 'ID-1', 'customer': customer.id, 'status': 'draft', 'lines': [{'product': product.id, 'quantity': '1', 'rate': '1.00'}],
+    }, format='json').data['lines'][0]['id']
+
+    response = client.post(reverse('sales-order-list'), {
+        'order_number': 'ID-2', 'customer': customer.id, 'status': 'draft',
+        'lines': [{'id': taken, 'product': product.id, 'quantity': '2', 'rate': '1.00'},
+                  {'id': 999999, 'product': product.id, 'quantity': '3', 'rate': '1.00'}],
+    }, format='json')
+    assert response.status_code == 201
+    ids = {line['id'] for line in response.data['lines']}
+    assert taken not in ids and 999999 not in ids
+    assert SalesOrderLine.objects.get(pk=taken).quantity == Decimal('1')
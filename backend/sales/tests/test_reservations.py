@@ -0,0 +1,105 @@
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from inventory.models import Inventory, Product, Warehouse
+from inventory.posting import Movement, post_movements
+from sales.models import Customer, SalesOrder, SalesOrderLine, StockReservation
+from sales.reservations import sync_reservations
+
+
+@pytest.fixture
+def client(db):
+    User = get_user_model()
+    api = APIClient()
+    api.force_authenticate(User.objects.create_user(username='approver', password='x', role=User.Roles.ADMIN))
+    return api
+
+
+def _order(number, customer, lines):
+    order = SalesOrder.objects.create(order_number=number, customer=customer)
+    for product, qty in lines:
+        SalesOrderLine.objects.create(order=order, product=product, quantity=Decimal(qty), rate=Decimal('1.00'))
+    return order
+
+
+def _reserved(product):
+    inv = Inventory.objects.get(product=product, warehouse__isnull=True)
+    return inv.reserved_qty, inv.available_qty
+
+
+@pytest.mark.django_db
+def test_confirm_reserves_and_cancel_or_deliver_release(client):
+    customer = Customer.objects.create(customer_code='RES-1', name='Reserver')
+    widget = Product.objects.create(sku='RS-W', name='Widget')
+    Inventory.objects.create(product=widget, on_hand=Decimal('10'))
+    first = _order('SO-R1', customer, [(widget, '3'), (widget, '1')])
+    second = _order('SO-R2', customer, [(widget, '2')])
+
+    assert client.post(reverse('sales-order-confirm', args=[first.id])).status_code == 200
+    assert client.post(reverse('sales-order-confirm', args=[second.id])).status_code == 200
+    assert _reserved(widget) == (Decimal('6'), Decimal('4'))
+    assert StockReservation.objects.get(order=first).quantity == Decimal('4')
+
+    assert client.post(reverse('sales-order-cancel', args=[first.id])).status_code == 200
+    assert _reserved(widget) == (Decimal('2'), Decimal('8'))
+    assert not StockReservation.objects.filter(order=first).exists()
+
+    assert client.post(reverse('sales-order-deliver', args=[second.id])).status_code == 200
+    assert _reserved(widget) == (Decimal('0'), Decimal('10'))
+
+
+@pytest.mark.django_db
+def test_sync_reservations_cost_does_not_grow_with_order_count():
+    customer = Customer.objects.create(customer_code='RES-2', name='Bulk')
+    products = Product.objects.bulk_create([Product(sku=f'RS-{i}', name=f'Item {i}') for i in range(5)])
+    Inventory.objects.bulk_create([Inventory(product=p) for p in products])
+
+    def confirm_batch(prefix, count):
+        orders = [_order(f'{prefix}-{i}', customer, [(products[i % 5], '2')]) for i in range(count)]
+        SalesOrder.objects.filter(id__in=[o.id for o in orders]).update(status=SalesOrder.Status.CONFIRMED)
+        with CaptureQueriesContext(connection) as ctx:
+            sync_reservations([o.id for o in orders])
+        return len(ctx)
+
+    small, large = confirm_batch('SO-S', 5), confirm_batch('SO-L', 100)
+    assert small == large
+    assert _reserved(products[0])[0] == Decimal('2') * 21
+
+
+@pytest.mark.django_db
+def test_reservations_are_held_at_the_order_warehouse(client):
+    customer = Customer.objects.create(customer_code='RES-3', name='Multi-site')
+    north = Warehouse.objects.create(code='RS-N', name='North')
+    south = Warehouse.objects.create(code='RS-S', name='South')
+    bolt = Product.objects.create(sku='RS-B', name='Bolt')
+    post_movements([Movement(bolt.id, Decimal('10'), warehouse_id=north.id),
+                    Movement(bolt.id, Decimal('5'), warehouse_id=south.id)])
+    order = _order('SO-R3', customer, [(bolt, '4')])
+    SalesOrder.objects.filter(pk=order.pk).update(warehouse=north)
+
+    assert client.post(reverse('sales-order-confirm', args=[order.id])).status_code == 200
+
+    def site(warehouse):
+        inv = Inventory.objects.get(product=bolt, warehouse=warehouse)
+        return inv.reserved_qty, inv.available_qty
+
+    assert site(north) == (Decimal('4'), Decimal('6'))
+    assert site(south) == (Decimal('0'), Decimal('5'))
+    assert not Inventory.objects.filter(product=bolt, warehouse__isnull=True).exists()
+    assert StockReservation.objects.get(order=order).warehouse == north
+
+    # Switching the confirmed order to another site moves its reservation
+    response = client.patch(reverse('sales-order-detail', args=[order.id]), {'warehouse': south.id}, format='json')
+    assert response.status_code == 200
+    assert site(north) == (Decimal('0'), Decimal('10'))
+    assert site(south) == (Decimal('4'), Decimal('1'))
+    assert sum(inv.available_qty for inv in Inventory.objects.filter(product=bolt)) == Decimal('11')
+
+    response = client.get(reverse('sales-order-pick-list', args=[order.id]))
+    assert response.data['warehouse'] == south.id
@@ -0,0 +1,72 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from inventory.models import Inventory, Product
+from sales.models import Customer, SalesOrder, SalesOrderLine, SalesOrderTransition, StockReservation
+
+
+@pytest.fixture
+def client(db):
+    User = get_user_model()
+    api = APIClient()
+    api.force_authenticate(User.objects.create_user(username='bulk-approver', password='x', role=User.Roles.ADMIN))
+    return api
+
+
+def _orders(prefix, customer, product, count, status=SalesOrder.Status.DRAFT):
+    orders = SalesOrder.objects.bulk_create([
+        SalesOrder(order_number=f'{prefix}-{i}', customer=customer, status=status) for i in range(count)
+    ])
+    SalesOrderLine.objects.bulk_create([
+        SalesOrderLine(order=order, product=product, quantity=Decimal('2'), rate=Decimal('1.00')) for order in orders
+    ])
+    return [order.id for order in orders]
+
+
+@pytest.mark.django_db
+def test_bulk_transitions_skip_ineligible_orders_and_log_changes(client):
+    customer = Customer.objects.create(customer_code='TX-1', name='Transitions')
+    pen = Product.objects.create(sku='TX-PEN', name='Pen')
+    drafts = _orders('TX-D', customer, pen, 3)
+    empty = SalesOrder.objects.create(order_number='TX-EMPTY', customer=customer)
+    cancelled = _orders('TX-C', customer, pen, 1, status=SalesOrder.Status.CANCELLED)
+
+    response = client.post(reverse('sales-order-bulk-confirm'), {'ids': drafts + [empty.id] + cancelled}, format='json')
+    assert response.data['updated'] == drafts
+    assert Inventory.objects.get(product=pen, warehouse__isnull=True).reserved_qty == Decimal('6')
+    log = SalesOrderTransition.objects.filter(order_id__in=drafts)
+    assert {(t.from_status, t.to_status, t.changed_by.username) for t in log} == {('draft', 'confirmed', 'bulk-approver')}
+
+    response = client.post(reverse('sales-order-bulk-status'), {'ids': drafts[:1], 'status': 'delivered'}, format='json')
+    assert response.data['updated'] == drafts[:1]
+    assert SalesOrder.objects.get(pk=drafts[0]).delivery_date == date.today()
+
+    response = client.post(reverse('sales-order-bulk-cancel'), {'ids': drafts + [empty.id]}, format='json')
+    assert response.data['updated'] == sorted(drafts[1:] + [empty.id])
+    assert not StockReservation.objects.filter(order_id__in=drafts).exists()
+    assert Inventory.objects.get(product=pen, warehouse__isnull=True).reserved_qty == Decimal('0')
+    assert client.post(reverse('sales-order-bulk-status'), {'ids': drafts, 'status': 'bogus'}, format='json').data == {'updated': []}
+
+
+@pytest.mark.django_db
+def test_bulk_confirm_statement_count_does_not_grow_with_orders(client):
+    customer = Customer.objects.create(customer_code='TX-2', name='Volume')
+    pen = Product.objects.create(sku='TX-VOL', name='Pen')
+    counts = {}
+    for size in (10, 5000):
+        ids = _orders(f'TV{size}', customer, pen, size)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post(reverse('sales-order-bulk-confirm'), {'ids': ids}, format='json')
+        assert len(response.data['updated']) == size
+        counts[size] = len(ctx)
+    assert SalesOrderTransition.objects.count() == 5010
+    # Only the bulk inserts of log and reservation rows are split on SQLite (999-parameter batches)
+    assert counts[10] <= 20
+    assert counts[5000] <= counts[10] + 50
@@ -0,0 +1,98 @@
+"""Set-based status transitions for sales orders.
+
+`transition_orders` moves every eligible order of a queryset to a new status
+with a fixed number of statements. Eligibility is read once, with row locks,
+for the whole set. Each source status gets one conditional
+`UPDATE ... WHERE status = <from>`, and one bulk insert appends the
+transition log. Reservations are then synced for all moved orders together.
+Confirmation is checked against the customers' credit limits (sales.credit)
+and orders leaving the confirmed state release their share of the exposure.
+Single-order workflow methods on SalesOrder go through the same path.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, QuerySet, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .credit import admit_orders, release_orders
+from .models import SalesOrder, SalesOrderLine, SalesOrderTransition
+from .reservations import sync_reservations
+
+Status = SalesOrder.Status
+
+# Target status -> statuses an order may move to it from
+SOURCES = {
+    Status.CONFIRMED: (Status.DRAFT,),
+    Status.CANCELLED: (Status.DRAFT, Status.CONFIRMED),
+    Status.DELIVERED: (Status.CONFIRMED,),
+}
+
+
+@dataclass(frozen=True)
+class TransitionResult:
+    moved: list[int] = field(default_factory=list)
+    # Eligible for confirmation but over the customer's credit limit
+    over_limit: list[int] = field(default_factory=list)
+
+
+def eligible_orders(orders: QuerySet, status: str) -> QuerySet:
+    """The orders of `orders` that may move to `status` (confirmation needs at least one line)."""
+    eligible = SalesOrder.objects.filter(pk__in=orders.values('pk'), status__in=SOURCES[status])
+    if status == Status.CONFIRMED:
+        eligible = eligible.filter(Exists(SalesOrderLine.objects.filter(order=OuterRef('pk'))))
+    return eligible.order_by()
+
+
+@transaction.atomic
+def transition_orders(orders: QuerySet, status: str, *, user=None) -> TransitionResult:
+    """Move every eligible order of `orders` to `status`; the moved ids are ascending.
+
+    Ineligible orders are left alone, as are orders whose confirmation would
+    exceed their customer's credit limit (reported in `over_limit`). Raises
+    ValueError for an unknown target status.
+    """
+    if status not in SOURCES:
+        raise ValueError(f'Unknown target status {status!r}.')
+    locked = eligible_orders(orders, status).select_for_update(of=('self',)).order_by('pk')
+    rows = list(locked.values_list('pk', 'status', 'customer_id', 'total_amount'))
+
+    over_limit = []
+    if status == Status.CONFIRMED:
+        admitted, over_limit = admit_orders((pk, customer_id, total) for pk, _, customer_id, total in rows)
+        admitted = set(admitted)
+        rows = [row for row in rows if row[0] in admitted]
+    else:
+        released = defaultdict(Decimal)
+        for _, current, customer_id, total in rows:
+            if current == Status.CONFIRMED:
+                released[customer_id] += total
+        release_orders(released)
+
+    by_source = defaultdict(list)
+    for pk, current, _, _ in rows:
+        by_source[current].append(pk)
+
+    now = timezone.now()
+    changes = {'status': status, 'updated_at': now}
+    if user is not None:
+        changes['updated_by'] = user
+    if status == Status.DELIVERED:
+        changes['delivery_date'] = Coalesce('delivery_date', Value(now.date()))
+
+    moved, log = [], []
+    for source, ids in by_source.items():
+        SalesOrder.objects.filter(pk__in=ids, status=source).update(**changes)
+        moved.extend(ids)
+        log.extend(
+            SalesOrderTransition(order_id=pk, from_status=source, to_status=status, changed_by=user, changed_at=now)
+            for pk in ids
+        )
+    SalesOrderTransition.objects.bulk_create(log, batch_size=1000)
+    sync_reservations(moved, user=user)
+    return TransitionResult(sorted(moved), over_limit)
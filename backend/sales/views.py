@@ -15,11 +15,12 @@ from rest_framework import viewsets, filters, status
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db import models
 from django.db.models import Q
 from decimal import Decimal
 
-from accounting.models import ARInvoice, ARPaymentAllocation
+from accounting.models import CustomerExposure
+from inventory.posting import fefo_picks
+from utils.address import normalize_city
 
 from authentication.mixins import RoleScopedQuerysetMixin
 from authentication.permissions import (
@@ -28,10 +29,24 @@ from authentication.permissions import (
     CanApproveOrders,
 )
 
+from .credit import CreditLimitExceeded
 from .models import Customer
 from .models import SalesOrder
 from .serializers import CustomerSerializer
 from .serializers import SalesOrderSerializer
+from .transitions import SOURCES, transition_orders
+
+
+MAX_BALANCE_IDS = 1000
+
+
+def _balance_row(customer_id, customer_code, outstanding):
+    return {
+        'customer_id': customer_id,
+        'customer_code': customer_code,
+        'balance': outstanding if outstanding is not None else Decimal('0.00'),
+        'currency': 'INR',
+    }
 
 
 class DefaultPagination(PageNumberPagination):
@@ -48,7 +63,8 @@ class CustomerViewSet(RoleScopedQuerysetMixin, viewsets.ModelViewSet):
 
     Query params supported on list endpoint:
     - name: case-insensitive contains filter on customer name
-    - city: case-insensitive contains filter on billing or shipping address
+    - city: billing or shipping city (any capitalisation; indexed lookup on the parsed address)
+    - pincode: billing or shipping PIN code (indexed)
     - search: fuzzy search across code/name/phone/email/gstin (DRF SearchFilter)
     - ordering: e.g., ?ordering=name or ?ordering=-name
     """
@@ -64,16 +80,21 @@ class CustomerViewSet(RoleScopedQuerysetMixin, viewsets.ModelViewSet):
     ordering = ['name']
 
     def get_queryset(self):
-        """Apply simple filters by name and city using query params."""
+        """Apply simple filters by name, city and PIN code using query params."""
         qs = super().get_queryset()
         params = self.request.query_params
         name = params.get('name')
         city = params.get('city')
+        pincode = params.get('pincode')
         if name:
             qs = qs.filter(name__icontains=name)
         if city:
-            # We don't have an explicit city field; search within addresses
-            qs = qs.filter(Q(billing_address__icontains=city) | Q(shipping_address__icontains=city))
+            # Cities are stored normalised, so this is an equality match on the indexed columns
+            city = normalize_city(city)
+            qs = qs.filter(Q(billing_city=city) | Q(shipping_city=city))
+        if pincode:
+            pincode = ''.join(pincode.split())
+            qs = qs.filter(Q(billing_pincode=pincode) | Q(shipping_pincode=pincode))
         return qs
 
     # --- Audit helpers to auto-populate created_by/updated_by ---
@@ -88,24 +109,26 @@ class CustomerViewSet(RoleScopedQuerysetMixin, viewsets.ModelViewSet):
     def balance(self, request, pk=None):
         """
         Return the customer's current outstanding balance:
-        sum(issued/partial invoices grand_total) - sum(payment allocations applied to those invoices).
+        sum(issued/partial invoices grand_total) - sum(payment allocations applied to those invoices),
+        as maintained in CustomerExposure.
         """
         customer = self.get_object()
-        invoices_qs = ARInvoice.objects.filter(
-            customer=customer,
-            status__in=[ARInvoice.Status.ISSUED, ARInvoice.Status.PARTIAL]
+        outstanding = CustomerExposure.objects.filter(customer=customer).values_list('outstanding', flat=True).first()
+        return Response(_balance_row(customer.id, customer.customer_code, outstanding), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='balances', permission_classes=[RoleScopedPermission])
+    def balances(self, request):
+        """Outstanding balances for ?ids=1,2,3 (up to MAX_BALANCE_IDS customers) in one read."""
+        raw = [part for part in request.query_params.get('ids', '').split(',') if part.strip()]
+        if not all(part.strip().isdigit() for part in raw):
+            return Response({'detail': 'ids must be a comma-separated list of customer ids.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(raw) > MAX_BALANCE_IDS:
+            return Response({'detail': f'At most {MAX_BALANCE_IDS} ids per request.'}, status=status.HTTP_400_BAD_REQUEST)
+        rows = (
+            self.get_queryset().filter(id__in=[int(part) for part in raw]).order_by('id')
+            .values_list('id', 'customer_code', 'exposure__outstanding')
         )
-        total_invoiced = invoices_qs.aggregate(total=models.Sum('grand_total'))['total'] or Decimal('0')
-        allocations_qs = ARPaymentAllocation.objects.filter(invoice__in=invoices_qs)
-        total_allocated = allocations_qs.aggregate(total=models.Sum('amount_applied'))['total'] or Decimal('0')
-        balance_amount = (total_invoiced - total_allocated).quantize(Decimal('0.01'))
-        data = {
-            'customer_id': customer.id,
-            'customer_code': customer.customer_code,
-            'balance': balance_amount,
-            'currency': 'INR',
-        }
-        return Response(data, status=status.HTTP_200_OK)
+        return Response([_balance_row(*row) for row in rows], status=status.HTTP_200_OK)
 
     # --- Bulk operations ---
     @action(detail=False, methods=['post'], url_path='bulk-activate', permission_classes=[RoleScopedPermission, IsManagerOrAdmin])
@@ -163,7 +186,10 @@ class SalesOrderViewSet(RoleScopedQuerysetMixin, viewsets.ModelViewSet):
         order = self.get_object()
         if not order.can_confirm():
             return Response({'detail': 'Cannot confirm order in its current state.'}, status=status.HTTP_400_BAD_REQUEST)
-        order.confirm(user=request.user)
+        try:
+            order.confirm(user=request.user)
+        except CreditLimitExceeded as exc:
+            return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
         return Response(self.get_serializer(order).data, status=status.HTTP_200_OK)
 
     @action(detail=True, methods=['post'], permission_classes=[RoleScopedPermission, CanApproveOrders])
@@ -182,45 +208,53 @@ class SalesOrderViewSet(RoleScopedQuerysetMixin, viewsets.ModelViewSet):
         order.mark_delivered(user=request.user)
         return Response(self.get_serializer(order).data, status=status.HTTP_200_OK)
 
+    @action(detail=True, methods=['get'], url_path='pick-list')
+    def pick_list(self, request, pk=None):
+        """FEFO lot picks for the order's lines (?warehouse= to pick at another site, default the order's)."""
+        order = self.get_object()
+        warehouse = request.query_params.get('warehouse')
+        if warehouse and not warehouse.isdigit():
+            return Response({'detail': 'warehouse must be an id.'}, status=status.HTTP_400_BAD_REQUEST)
+        warehouse_id = int(warehouse) if warehouse else order.warehouse_id
+        demand = {}
+        for product_id, qty in order.lines.values_list('product_id', 'quantity'):
+            key = (product_id, warehouse_id)
+            demand[key] = demand.get(key, Decimal('0')) + qty
+        picks = fefo_picks(demand)
+        rows = []
+        for key, wanted in sorted(demand.items()):
+            lots = picks.get(key, [])
+            picked = sum((take for _, take in lots), Decimal('0'))
+            rows.append({
+                'product': key[0],
+                'quantity': wanted,
+                'lots': [
+                    {'lot': lot.id, 'lot_number': lot.lot_number, 'expiry_date': lot.expiry_date, 'quantity': take}
+                    for lot, take in lots
+                ],
+                'short': wanted - picked,
+            })
+        return Response({'order': order.id, 'warehouse': warehouse_id, 'lines': rows}, status=status.HTTP_200_OK)
+
+    # Bulk transitions run set-based through sales.transitions; the role-scoped
+    # queryset limits them to the orders the user may act on.
     @action(detail=False, methods=['post'], url_path='bulk-confirm', permission_classes=[RoleScopedPermission, CanApproveOrders])
     def bulk_confirm(self, request):
         ids = request.data.get('ids', [])
-        updated = []
-        for order in self.get_queryset().filter(id__in=ids):
-            self.check_object_permissions(request, order)
-            if order.can_confirm():
-                order.confirm(user=request.user)
-                updated.append(order.id)
-        return Response({'updated': updated}, status=status.HTTP_200_OK)
+        result = transition_orders(self.get_queryset().filter(id__in=ids), SalesOrder.Status.CONFIRMED, user=request.user)
+        return Response({'updated': result.moved, 'over_credit_limit': result.over_limit}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['post'], url_path='bulk-cancel', permission_classes=[RoleScopedPermission, CanApproveOrders])
     def bulk_cancel(self, request):
         ids = request.data.get('ids', [])
-        updated = []
-        for order in self.get_queryset().filter(id__in=ids):
-            self.check_object_permissions(request, order)
-            if hasattr(order, 'can_cancel') and order.can_cancel():
-                order.cancel(user=request.user)
-                updated.append(order.id)
-        return Response({'updated': updated}, status=status.HTTP_200_OK)
+        result = transition_orders(self.get_queryset().filter(id__in=ids), SalesOrder.Status.CANCELLED, user=request.user)
+        return Response({'updated': result.moved}, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['post'], url_path='bulk-status', permission_classes=[RoleScopedPermission, CanApproveOrders])
     def bulk_status(self, request):
         ids = request.data.get('ids', [])
         status_val = request.data.get('status')
-        changed = []
-        for order in self.get_queryset().filter(id__in=ids):
-            try:
-                self.check_object_permissions(request, order)
-                if status_val == SalesOrder.Status.CONFIRMED and order.can_confirm():
-                    order.confirm(user=request.user)
-                    changed.append(order.id)
-                elif status_val == SalesOrder.Status.CANCELLED and hasattr(order, 'can_cancel') and order.can_cancel():
-                    order.cancel(user=request.user)
-                    changed.append(order.id)
-                elif status_val == SalesOrder.Status.DELIVERED and hasattr(order, 'can_mark_delivered') and order.can_mark_delivered():
-                    order.mark_delivered(user=request.user)
-                    changed.append(order.id)
-            except Exception:
-                continue
-        return Response({'updated': changed}, status=status.HTTP_200_OK)
+        if status_val not in SOURCES:
+            return Response({'updated': []}, status=status.HTTP_200_OK)
+        result = transition_orders(self.get_queryset().filter(id__in=ids), status_val, user=request.user)
+        return Response({'updated': result.moved, 'over_credit_limit': result.over_limit}, status=status.HTTP_200_OK)
@@ -0,0 +1,72 @@
+"""
+Address helpers: pull city, state and PIN code out of free-text Indian addresses.
+
+Addresses are typed as comma-separated parts, e.g.
+"12 MG Road, Indiranagar, Bengaluru, Karnataka 560038, India". The PIN code
+is the last six-digit group, the state is the part naming a known GST state
+and the city is the part just before it (or the last remaining part when no
+state is named). Values are normalised so equal cities compare equal.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from .gst_utils import STATE_CODE_MAP
+
+PINCODE_PATTERN = re.compile(r'(?<!\d)([1-9][0-9]{2})\s?([0-9]{3})(?!\d)')
+COUNTRY_NAMES = {'india', 'bharat'}
+
+
+def _state_key(name: str) -> str:
+    return ' '.join(re.sub(r'\(.*?\)', ' ', name).replace('&', ' and ').lower().split())
+
+
+# Normalised state name -> display name; legacy codes do not claim the modern names
+STATE_NAMES: dict[str, str] = {}
+for _code, _name in sorted(STATE_CODE_MAP.items(), key=lambda item: '(Old)' in item[1]):
+    STATE_NAMES.setdefault(_state_key(_name), re.sub(r'\s*\(.*?\)', '', _name))
+STATE_NAMES.update({'new delhi': 'Delhi', 'nct of delhi': 'Delhi', 'orissa': 'Odisha', 'pondicherry': 'Puducherry'})
+# Names that are both a state/UT and its city, used as the city when no other line names one
+CITY_STATES = {'new delhi', 'delhi', 'chandigarh', 'puducherry', 'pondicherry'}
+
+
+@dataclass(frozen=True)
+class ParsedAddress:
+    city: str = ''
+    state: str = ''
+    pincode: str = ''
+
+
+def normalize_city(value: str) -> str:
+    """Canonical form of a city name used for storage and lookups ("  new  DELHI" -> "New Delhi")."""
+    return ' '.join(value.split()).title()[:100]
+
+
+def parse_address(text: str | None) -> ParsedAddress:
+    """City, state and PIN code found in `text` (empty strings for what is missing)."""
+    if not text:
+        return ParsedAddress()
+    pincode = ''
+    matches = PINCODE_PATTERN.findall(text)
+    if matches:
+        pincode = ''.join(matches[-1])
+        text = PINCODE_PATTERN.sub(' ', text)
+    parts = [' '.join(part.split()) for part in re.split(r'[,\n]', text)]
+    parts = [part.strip(' .-') for part in parts]
+    parts = [part for part in parts if part and part.lower() not in COUNTRY_NAMES]
+
+    state, city = '', ''
+    for index in range(len(parts) - 1, -1, -1):
+        found = STATE_NAMES.get(_state_key(parts[index]))
+        if found:
+            state = found
+            city = parts[index - 1] if index else ''
+            if _state_key(parts[index]) in CITY_STATES and (not city or any(char.isdigit() for char in city)):
+                city = parts[index]
+            break
+    else:
+        city = parts[-1] if len(parts) > 1 else ''
+    if any(char.isdigit() for char in city):
+        city = ''  # a street or building line, not a city
+    return ParsedAddress(city=normalize_city(city), state=state, pincode=pincode)
@@ -1,11 +1,13 @@
 """
-GST helpers: state code map and GST type (intra/inter-state) resolution.
+GST helpers: state code map, GST type (intra/inter-state) resolution and
+GSTIN / state-code validation.
 
 Authoritative GST state codes (first two digits of GSTIN) as per Indian Census
 coding conventions. Includes Union Territories and special codes.
 """
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
 
 # Complete GST state code map (two-digit strings)
@@ -111,10 +113,53 @@ def determine_gst_type(company_state_code: int | str, customer_state_code: int |
     return 'intra_state' if comp == cust else 'inter_state'
 
 
+# --- Validation ---
+# Compiled once; the Customer model validator and the bulk customer import both use it.
+GSTIN_PATTERN = re.compile(r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z][1-9A-Z]Z[0-9A-Z]$')
+GSTIN_CHARSET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_GSTIN_VALUES = {char: value for value, char in enumerate(GSTIN_CHARSET)}
+
+
+def gstin_check_char(first14: str) -> str:
+    """Check character for the first 14 characters of a GSTIN (base-36 Luhn mod N).
+
+    Every second character's value is doubled; products are folded as
+    quotient + remainder of 36 and the check value makes the sum a multiple of 36.
+
+    Examples:
+        >>> gstin_check_char('27AAPFU0939F1Z')
+        'V'
+    """
+    total = 0
+    for position, char in enumerate(first14):
+        product = _GSTIN_VALUES[char] * (2 if position % 2 else 1)
+        total += product // 36 + product % 36
+    return GSTIN_CHARSET[(36 - total % 36) % 36]
+
+
+def gstin_error(value: str) -> str | None:
+    """Why `value` (uppercase, stripped) is not a valid GSTIN, or None when it is."""
+    if not GSTIN_PATTERN.match(value):
+        return 'Enter a valid GSTIN (15 characters), e.g., 27AAPFU0939F1ZV.'
+    if value[:2] not in STATE_CODE_MAP:
+        return f"GSTIN starts with unknown state code '{value[:2]}'."
+    if gstin_check_char(value[:14]) != value[14]:
+        return 'GSTIN check character does not match.'
+    return None
+
+
+def is_valid_state_code(value: str) -> bool:
+    """A known two-digit GST state code."""
+    return len(value) == 2 and value in STATE_CODE_MAP
+
+
 __all__ = [
     'STATE_CODE_MAP',
     'UT_CODES',
     'determine_gst_type',
+    'gstin_check_char',
+    'gstin_error',
+    'is_valid_state_code',
 ]
 
 